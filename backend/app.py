@@ -2,9 +2,20 @@ import sqlite3
 import os
 from flask import Flask, jsonify, request 
 from flask_cors import CORS
-from flask_mail import Mail, Message
 from config import Config
 from models.database import init_db
+from services.attendance_rollup import AttendanceRollupService, RollupCompactor
+from services.response_cache import response_cache
+from services.pagination import Page
+from services.outbox import OutboxDispatcher
+from services.notification_retention import RetentionJob
+from services.low_attendance import low_attendance_job
+from services.ttl_store import TTLSweeper
+from services.schedule_import import ScheduleImport, parse_csv
+from services.schedule_conflicts import conflict_index
+from services.notification_bus import notification_bus
+from services.notification_service import NotificationService
+from services.session import sessions
 # Import face recognition service if available. If OpenCV / numpy are incompatible
 # (common on Windows when binary wheels mismatch), fall back to a lightweight stub
 # that provides the same interface but returns informative errors or empty results.
@@ -47,7 +58,7 @@ except Exception as _import_err:
     face_service = _StubFaceService(_import_err)
 
 # Import blueprints
-from routes.auth import auth_bp
+from routes.auth import auth_bp, verification_codes
 from routes.users import users_bp
 from routes.classes import classes_bp
 from routes.attendance import attendance_bp
@@ -65,12 +76,10 @@ from routes.student_attendance_routes import student_attendance_bp
 from routes.contact_routes import contact_bp
 
 from routes.teacher_subjects import teacher_subjects_bp
+from routes.export_routes import export_bp
 app = Flask(__name__)
 app.config.from_object(Config)
-CORS(app)
-
-# Initialize Flask-Mail
-mail = Mail(app)
+CORS(app, expose_headers=['X-Next-After-Id'])
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -90,6 +99,7 @@ app.register_blueprint(student_bp, url_prefix='/api/student')
 app.register_blueprint(student_attendance_bp, url_prefix='/api')
 app.register_blueprint(contact_bp, url_prefix="/api/contact")
 app.register_blueprint(teacher_subjects_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api/export')
 @app.route('/')
 def api_info():
     return jsonify({
@@ -209,21 +219,26 @@ def debug_recent_attendance():
 
 @app.route('/api/debug/face-data', methods=['GET'])
 def debug_face_data():
-    """Debug endpoint to check stored face data"""
+    """Debug endpoint to check stored face data (newest first, paged)"""
+    page = Page()
+    where, params = page.filter('face_encodings', 'fe', ['fe.created_at'], descending=True)
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # Get all face encodings
-        cursor.execute('''
+        # Get one page of face encodings
+        cursor.execute(f'''
             SELECT fe.id, fe.student_id, u.name, s.enrollment_no, fe.created_at
             FROM face_encodings fe
             JOIN students s ON fe.student_id = s.id
             JOIN users u ON s.user_id = u.id
-            ORDER BY fe.created_at DESC
-        ''')
+            WHERE 1 = 1 {where}
+            {page.order_by('fe', ['fe.created_at'], descending=True)}
+            {page.limit_clause()}
+        ''', params)
         
-        face_data = cursor.fetchall()
+        face_data = page.rows(cursor.fetchall())
 
          # Get total counts
         cursor.execute('SELECT COUNT(*) as total FROM face_encodings')
@@ -231,10 +246,10 @@ def debug_face_data():
         
         conn.close()
         
-        return jsonify({
+        return page.response({
             'success': True,
             'total_registered_faces': total_count,
-            'face_data': [dict(row) for row in face_data],
+            'face_data': face_data,
             'service_known_faces': len(face_service.known_faces),
             'service_status': face_service.get_service_status()
         })
@@ -909,18 +924,14 @@ def create_sample_requests():
                         notification_title = "New Attendance Request"
                         notification_message = f"{student_name} from {request_data['department']} - {request_data['subject']} requests attendance for {request_data['request_date']}"
                         
-                        cursor.execute('''
-                            INSERT INTO notifications 
-                            (user_id, title, message, type, related_id, is_read)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        ''', (
+                        NotificationService.create_notification(
                             teacher_user_id,
                             notification_title,
                             notification_message,
                             'attendance_request',
                             request_id,
-                            False
-                        ))
+                            conn=conn
+                        )
                         print(f"✅ Notification created for teacher user_id: {teacher_user_id}")
                 except Exception as notification_error:
                     print(f"⚠️ Failed to create notification: {notification_error}")
@@ -929,6 +940,7 @@ def create_sample_requests():
                 created_count += 1
         
         conn.commit()
+        notification_bus.flush(conn)
         
         return jsonify({
             'message': f'Created {created_count} sample attendance requests',
@@ -940,6 +952,7 @@ def create_sample_requests():
         conn.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
+        notification_bus.discard(conn)
         conn.close()
 
 # Add these routes to your app.py
@@ -1088,24 +1101,21 @@ def create_attendance_request():
                 notification_title = "New Attendance Request"
                 notification_message = f"{student_name} from {data['department']} - {data['subject']} requests attendance for {data['request_date']}"
                 
-                cursor.execute('''
-                    INSERT INTO notifications 
-                    (user_id, title, message, type, related_id, is_read)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
+                NotificationService.create_notification(
                     teacher_user_id,
                     notification_title,
                     notification_message,
                     'attendance_request',
                     request_id,
-                    False
-                ))
+                    conn=conn
+                )
                 print(f"✅ Notification created for teacher user_id: {teacher_user_id}")
         except Exception as notification_error:
             print(f"⚠️ Failed to create notification: {notification_error}")
             # Don't fail the whole request if notification fails
         
         conn.commit()
+        notification_bus.flush(conn)
         conn.close()
         
         print(f"✅ Attendance request created successfully with ID: {request_id}")
@@ -1303,6 +1313,17 @@ def create_class_schedule():
             conn.close()
             return jsonify({'success': False, 'error': 'Subject not found'}), 404
         
+        # Reject teacher / room double-bookings
+        slot = dict(data, teacher_id=teacher['id'])
+        conflicts = conflict_index.engine().conflicts_for(slot)
+        if conflicts:
+            conn.close()
+            return jsonify({
+                'success': False,
+                'error': 'Schedule conflict: teacher or room already booked at this time',
+                'conflicts': conflicts
+            }), 400
+        
         # Insert new schedule
         cursor.execute('''
             INSERT INTO class_schedules 
@@ -1330,25 +1351,24 @@ def create_class_schedule():
             notification_title = "New Class Scheduled"
             notification_message = f"Class scheduled for {data['day_of_week']} at {data['start_time']} - {subject_name} ({department_name})"
             
-            cursor.execute('''
-                INSERT INTO notifications 
-                (user_id, title, message, type, related_id, is_read)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
+            NotificationService.create_notification(
                 teacher_user_id,
                 notification_title,
                 notification_message,
                 'class_scheduled',
                 schedule_id,
-                False
-            ))
+                conn=conn
+            )
             print(f"✅ Class schedule notification created for teacher user_id: {teacher_user_id}")
         except Exception as notification_error:
             print(f"⚠️ Failed to create class schedule notification: {notification_error}")
             # Don't fail the whole request if notification fails
         
         conn.commit()
+        notification_bus.flush(conn)
         conn.close()
+        response_cache.invalidate('schedules')
+        conflict_index.add([dict(slot, id=schedule_id)])
         
         print(f"✅ Class schedule created successfully with ID: {schedule_id}")
         
@@ -1366,133 +1386,67 @@ def create_class_schedule():
 
 @app.route('/api/schedules/bulk', methods=['POST'])
 def create_bulk_class_schedules():
-    """Create multiple class schedules with notifications"""
+    """Create many class schedules with notifications (JSON or CSV upload).
+
+    JSON: { schedules: [...], mode: 'partial' | 'atomic' }. CSV: a text/csv
+    body or a multipart 'file', with ?mode= in the query string. In atomic
+    mode any invalid row rejects the whole upload.
+    """
     from models.database import get_db_connection
     
     try:
-        data = request.get_json()
-        print(f"📅 Creating bulk class schedules with data: {data}")
-        
-        if not data or 'schedules' not in data:
-            return jsonify({'success': False, 'error': 'No schedules data provided'}), 400
+        if request.files.get('file') or (request.content_type or '').startswith('text/csv'):
+            upload = request.files.get('file')
+            text = upload.read().decode('utf-8-sig') if upload else request.get_data(as_text=True)
+            schedules = parse_csv(text)
+            mode = request.args.get('mode', 'partial')
+        else:
+            data = request.get_json(silent=True)
+            if not data or 'schedules' not in data:
+                return jsonify({'success': False, 'error': 'No schedules data provided'}), 400
+            schedules = data['schedules']
+            mode = data.get('mode', request.args.get('mode', 'partial'))
         
-        schedules = data['schedules']
         if not isinstance(schedules, list) or len(schedules) == 0:
             return jsonify({'success': False, 'error': 'Schedules must be a non-empty list'}), 400
+        if mode not in ('partial', 'atomic'):
+            return jsonify({'success': False, 'error': "mode must be 'partial' or 'atomic'"}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        created_schedules = []
-        errors = []
+        print(f"📅 Importing {len(schedules)} class schedules ({mode})")
         
-        for schedule_data in schedules:
-            try:
-                # Validate required fields for each schedule
-                required_fields = ['teacher_id', 'department_id', 'subject_id', 'day_of_week', 'start_time', 'end_time', 'created_by']
-                missing_fields = []
-                for field in required_fields:
-                    if field not in schedule_data or not schedule_data[field]:
-                        missing_fields.append(field)
-                
-                if missing_fields:
-                    errors.append(f"Schedule missing fields: {', '.join(missing_fields)}")
-                    continue
-                
-                # Check if teacher exists
-                cursor.execute('SELECT id, user_id FROM teacher_profiles WHERE id = ?', (schedule_data['teacher_id'],))
-                teacher = cursor.fetchone()
-                
-                if not teacher:
-                    errors.append(f"Teacher not found for ID: {schedule_data['teacher_id']}")
-                    continue
-                
-                # Check if department exists
-                cursor.execute('SELECT name FROM departments WHERE id = ?', (schedule_data['department_id'],))
-                department = cursor.fetchone()
-                
-                if not department:
-                    errors.append(f"Department not found for ID: {schedule_data['department_id']}")
-                    continue
-                
-                # Check if subject exists
-                cursor.execute('SELECT name FROM subjects WHERE id = ?', (schedule_data['subject_id'],))
-                subject = cursor.fetchone()
-                
-                if not subject:
-                    errors.append(f"Subject not found for ID: {schedule_data['subject_id']}")
-                    continue
-                
-                # Insert new schedule
-                cursor.execute('''
-                    INSERT INTO class_schedules 
-                    (teacher_id, department_id, subject_id, day_of_week, start_time, end_time, room_number, created_by)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    schedule_data['teacher_id'],
-                    schedule_data['department_id'],
-                    schedule_data['subject_id'],
-                    schedule_data['day_of_week'],
-                    schedule_data['start_time'],
-                    schedule_data['end_time'],
-                    schedule_data.get('room_number', ''),
-                    schedule_data['created_by']
-                ))
-                
-                schedule_id = cursor.lastrowid
-                
-                # CREATE NOTIFICATION FOR THE TEACHER
-                try:
-                    teacher_user_id = teacher['user_id']
-                    department_name = department['name']
-                    subject_name = subject['name']
-                    
-                    notification_title = "New Class Scheduled"
-                    notification_message = f"Class scheduled for {schedule_data['day_of_week']} at {schedule_data['start_time']} - {subject_name} ({department_name})"
-                    
-                    cursor.execute('''
-                        INSERT INTO notifications 
-                        (user_id, title, message, type, related_id, is_read)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (
-                        teacher_user_id,
-                        notification_title,
-                        notification_message,
-                        'class_scheduled',
-                        schedule_id,
-                        False
-                    ))
-                    print(f"✅ Class schedule notification created for teacher user_id: {teacher_user_id}")
-                except Exception as notification_error:
-                    print(f"⚠️ Failed to create class schedule notification: {notification_error}")
-                    # Don't fail the whole request if notification fails
-                
-                created_schedules.append({
-                    'schedule_id': schedule_id,
-                    'teacher_id': schedule_data['teacher_id'],
-                    'subject': subject_name,
-                    'department': department_name,
-                    'day': schedule_data['day_of_week'],
-                    'time': f"{schedule_data['start_time']} - {schedule_data['end_time']}"
-                })
-                
-            except Exception as e:
-                errors.append(f"Error creating schedule: {str(e)}")
-                continue
+        conn = get_db_connection()
+        try:
+            schedule_import = ScheduleImport(schedules, atomic=(mode == 'atomic'))
+            created_schedules = schedule_import.run(conn)
+            conn.commit()
+            conflict_index.add(schedule_import.slots)
+            notification_bus.flush(conn)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            notification_bus.discard(conn)
+            conn.close()
         
-        conn.commit()
-        conn.close()
+        if created_schedules:
+            response_cache.invalidate('schedules')
         
+        errors = schedule_import.errors
         response = {
-            'success': True,
+            'success': not (schedule_import.atomic and errors),
+            'mode': mode,
             'message': f'Created {len(created_schedules)} class schedules',
             'created_schedules': created_schedules,
             'total_created': len(created_schedules)
         }
         
         if errors:
-            response['errors'] = errors
+            response['errors'] = [f"Row {e['row']}: {e['error']}" for e in errors]
+            response['row_errors'] = errors
             response['message'] = f'Created {len(created_schedules)} schedules with {len(errors)} errors'
+            if schedule_import.atomic:
+                response['message'] = f'Import rejected: {len(errors)} invalid rows'
+                return jsonify(response), 400
         
         return jsonify(response)
         
@@ -1609,18 +1563,14 @@ def create_sample_schedules():
                 notification_title = "New Class Scheduled"
                 notification_message = f"Class scheduled for {schedule_data['day_of_week']} at {schedule_data['start_time']} - {subject_name} (Computer Science)"
                 
-                cursor.execute('''
-                    INSERT INTO notifications 
-                    (user_id, title, message, type, related_id, is_read)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
+                NotificationService.create_notification(
                     teacher_user_id,
                     notification_title,
                     notification_message,
                     'class_scheduled',
                     schedule_id,
-                    False
-                ))
+                    conn=conn
+                )
                 
                 created_count += 1
                 created_schedules.append({
@@ -1631,6 +1581,7 @@ def create_sample_schedules():
                 })
         
         conn.commit()
+        notification_bus.flush(conn)
         
         return jsonify({
             'message': f'Created {created_count} sample class schedules with notifications',
@@ -1642,10 +1593,30 @@ def create_sample_schedules():
         conn.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
+        notification_bus.discard(conn)
         conn.close()
 
-if __name__ == '__main__':
+def start_background_workers():
+    """Schema, rollups and the background jobs the API relies on.
+
+    Notifications and verification mails are only written to the outbox, so
+    every server process (python app.py, flask run, gunicorn workers) runs
+    these unless BACKGROUND_WORKERS is off; the jobs coordinate through the
+    database and are safe to run in several processes.
+    """
     init_db()
+    AttendanceRollupService.ensure_built()
+    RollupCompactor().start()
+    OutboxDispatcher().start()
+    RetentionJob().start()
+    low_attendance_job.start()
+    TTLSweeper([verification_codes, sessions.revoked]).start()
+
+
+if Config.BACKGROUND_WORKERS:
+    start_background_workers()
+
+if __name__ == '__main__':
     print("🚀 SmartAttend Backend Starting...")
     print("📍 API Running on: http://127.0.0.1:5000")
     print("🔑 Default Admin: admin@smartattend.com / admin123")
@@ -0,0 +1,85 @@
+"""Login throughput benchmark.
+
+Runs /api/auth/login concurrently against a temporary copy of the database
+and prints logins per second for:
+
+  * legacy   - unsalted SHA-256 hashes (first login also upgrades them)
+  * kdf      - the configured KDF, cold (every login runs the KDF)
+  * cached   - the same logins repeated within the verification cache window
+
+Usage: python benchmark_login.py [--users 200] [--threads 16]
+Tune with PASSWORD_HASHER, SCRYPT_N, PBKDF2_ITERATIONS, PASSWORD_HASH_WORKERS.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import models.database as database
+from models.database import get_db_connection, hash_password
+from services.passwords import passwords
+
+PASSWORD = 'benchmark-pass'
+
+
+def seed(count):
+    conn = get_db_connection()
+    conn.executemany(
+        "INSERT INTO users (name, email, password_hash, role) VALUES (?, ?, ?, 'student')",
+        [(f'Bench {i}', f'bench{i}@bench.local', hash_password(PASSWORD)) for i in range(count)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(client, count, threads):
+    def login(i):
+        r = client.post('/api/auth/login', json={
+            'email': f'bench{i}@bench.local', 'password': PASSWORD, 'role': 'student'
+        })
+        return r.status_code == 200
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        ok = sum(pool.map(login, range(count)))
+    elapsed = time.perf_counter() - started
+    return ok, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    database.DB_PATH = os.path.join(workdir, 'smartattend.db')
+    shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'smartattend.db'), database.DB_PATH)
+    database.init_db()
+    seed(args.users)
+
+    from app import app
+    client = app.test_client()
+
+    print(f"Hasher: {passwords.default.scheme}, hash workers: {passwords.pool._max_workers}, "
+          f"request threads: {args.threads}, users: {args.users}")
+
+    # First pass verifies the legacy hashes and upgrades them to the KDF
+    phases = [('legacy (+upgrade)', None)]
+    # Second pass: forget cached verifications so every login runs the KDF
+    phases.append(('kdf', lambda: passwords._cache.clear()))
+    phases.append(('cached', None))
+
+    for name, before in phases:
+        if before:
+            before()
+        ok, elapsed = run(client, args.users, args.threads)
+        print(f"{name:18} {ok}/{args.users} ok  {elapsed:7.2f}s  {args.users / elapsed:8.1f} logins/s")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,5 +2,42 @@ import os
 
 class Config:
     DB_NAME = 'smartattend.db'
-    SECRET_KEY = 'your-secret-key-here'
-    DEBUG = True
\ No newline at end of file
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+    DEBUG = True
+
+    # Response cache for polled dashboard endpoints. Set RESPONSE_CACHE_PATH
+    # to a file shared by all workers when running more than one process.
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH')
+
+    # Notification retention: read notifications older than this many days
+    # are moved to notifications_archive, a batch at a time.
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 90))
+    NOTIFICATION_RETENTION_BATCH = int(os.environ.get('NOTIFICATION_RETENTION_BATCH', 500))
+
+    # Verification codes and other short-lived state: 'sqlite' shares it
+    # between workers through the database, 'memory' keeps it per process.
+    TTL_STORE_BACKEND = os.environ.get('TTL_STORE_BACKEND', 'sqlite')
+    TTL_SWEEP_INTERVAL = int(os.environ.get('TTL_SWEEP_INTERVAL', 300))
+
+    # Start the outbox dispatcher and other background jobs when the app is
+    # imported (see app.start_background_workers); tests turn this off
+    BACKGROUND_WORKERS = os.environ.get('BACKGROUND_WORKERS', '1') not in ('0', 'false', 'False')
+
+    # Signed session tokens issued at login (services/session.py)
+    SESSION_TOKEN_MAX_AGE = int(os.environ.get('SESSION_TOKEN_MAX_AGE', 12 * 3600))
+
+    # Password hashing (services/passwords.py): 'scrypt' or 'pbkdf2'. Legacy
+    # SHA-256 hashes are upgraded to this on the next successful login.
+    PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+    SCRYPT_N = int(os.environ.get('SCRYPT_N', 2 ** 14))
+    PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 260000))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 4))
+
+    # Attendance percentage below which students are flagged and warned
+    LOW_ATTENDANCE_THRESHOLD = float(os.environ.get('LOW_ATTENDANCE_THRESHOLD', 75))
+    # Low-attendance scan (services/low_attendance.py): seconds between runs
+    # and how often a student may be warned ('day' or 'week')
+    LOW_ATTENDANCE_SCAN_INTERVAL = int(os.environ.get('LOW_ATTENDANCE_SCAN_INTERVAL', 300))
+    LOW_ATTENDANCE_WARNING_PERIOD = os.environ.get('LOW_ATTENDANCE_WARNING_PERIOD', 'day')
@@ -1,14 +1,32 @@
 """email_service.py
 
-Provides a small helper to send verification emails for password reset.
-This version explicitly loads the `.env` file located next to this module,
-trims credentials, and returns clear True/False for callers. If credentials
-are missing it will return False so the caller can handle the fallback.
+Mail subsystem for SmartAttend.
+
+Messages are rendered from templates compiled once at import time and
+handed to a ``Mailer``: a queued sender whose worker thread drains the
+queue in batches over one reusable, authenticated SMTP connection. The
+connection is kept alive between batches (checked with NOOP when idle) and
+re-established transparently when the server drops it.
+
+Set ``MAIL_BACKEND=memory`` to swap SMTP for ``MemorySMTP``, an in-memory
+stand-in that records messages and can inject failures, so throughput and
+retry behaviour can be exercised offline. ``start_local_smtpd`` runs a real
+local SMTP server instead when the optional ``aiosmtpd`` package is
+installed.
+
+``send_verification_email`` keeps its original contract: True on success,
+False on failure. The `.env` file next to this module is loaded for the
+SMTP credentials.
 """
 import os
+import queue
 import smtplib
+import threading
+import time
+from concurrent.futures import Future
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from string import Template
 from dotenv import load_dotenv
 import logging
 
@@ -20,40 +38,20 @@ load_dotenv(env_path)
 logger = logging.getLogger(__name__)
 
 
-def send_verification_email(email, verification_code):
-    """Send verification code via SMTP.
-
-    Returns True on success, False on failure.
-    """
-    try:
-        SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com').strip()
-        SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
-        EMAIL_USER = os.environ.get('EMAIL_USER', '').strip()
-        EMAIL_PASSWORD = os.environ.get('EMAIL_PASS', '')
-
-        logger.info('Attempting to send email with server: %s:%s, from: %s', SMTP_SERVER, SMTP_PORT, EMAIL_USER)
-
-        if not EMAIL_USER or not EMAIL_PASSWORD:
-            logger.error('Email credentials are not set in .env (EMAIL_USER/EMAIL_PASS).')
-            return False
-
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_USER
-        msg['To'] = email
-        msg['Subject'] = 'SmartAttend - Password Reset Verification Code'
-
-        html = f"""
+# ========== TEMPLATES ==========
+# Compiled once; rendering is a single substitute() per message.
+VERIFICATION_SUBJECT = 'SmartAttend - Password Reset Verification Code'
+VERIFICATION_TEMPLATE = Template("""
         <!DOCTYPE html>
         <html>
         <head>
             <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #2563eb; color: white; padding: 20px; text-align: center; }}
-                .code {{ font-size: 32px; font-weight: bold; text-align: center; color: #2563eb; 
-                        padding: 15px; background: #f3f4f6; margin: 20px 0; letter-spacing: 5px; }}
-                .footer {{ margin-top: 20px; font-size: 12px; color: #666; text-align: center; }}
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background: #2563eb; color: white; padding: 20px; text-align: center; }
+                .code { font-size: 32px; font-weight: bold; text-align: center; color: #2563eb;
+                        padding: 15px; background: #f3f4f6; margin: 20px 0; letter-spacing: 5px; }
+                .footer { margin-top: 20px; font-size: 12px; color: #666; text-align: center; }
             </style>
         </head>
         <body>
@@ -66,7 +64,7 @@ def send_verification_email(email, verification_code):
                 <p>Hello,</p>
                 <p>You requested to reset your password for your SmartAttend account. Use the verification code below:</p>
 
-                <div class="code">{verification_code}</div>
+                <div class="code">$code</div>
 
                 <p>This code will expire in <strong>10 minutes</strong>.</p>
                 <p>If you didn't request this password reset, please ignore this email.</p>
@@ -78,20 +76,240 @@ def send_verification_email(email, verification_code):
             </div>
         </body>
         </html>
-        """
+        """)
+
+
+def smtp_settings():
+    return {
+        'server': os.environ.get('SMTP_SERVER', 'smtp.gmail.com').strip(),
+        'port': int(os.environ.get('SMTP_PORT', '587')),
+        'user': os.environ.get('EMAIL_USER', '').strip(),
+        'password': os.environ.get('EMAIL_PASS', '')
+    }
+
+
+def build_verification_message(email, verification_code, sender=None):
+    msg = MIMEMultipart()
+    msg['From'] = sender or smtp_settings()['user']
+    msg['To'] = email
+    msg['Subject'] = VERIFICATION_SUBJECT
+    msg.attach(MIMEText(VERIFICATION_TEMPLATE.substitute(code=verification_code), 'html'))
+    return msg
+
+
+# ========== CONNECTIONS ==========
+def smtp_connect():
+    """Open an authenticated SMTP connection from the environment settings"""
+    settings = smtp_settings()
+    if not settings['user'] or not settings['password']:
+        raise smtplib.SMTPAuthenticationError(535, b'EMAIL_USER/EMAIL_PASS are not set in .env')
+
+    logger.info('Connecting to SMTP server %s:%s as %s', settings['server'], settings['port'], settings['user'])
+    server = smtplib.SMTP(settings['server'], settings['port'], timeout=30)
+    server.starttls()
+    server.login(settings['user'], settings['password'])
+    return server
+
+
+class MemorySMTP:
+    """In-memory stand-in for an authenticated ``smtplib.SMTP`` connection.
+
+    Use ``MemorySMTP.factory()`` as the Mailer's ``connect``. Delivered
+    messages are appended to ``factory.sent``; ``factory.fail_next`` makes the
+    next N sends drop the connection, as a real server would.
+    """
+
+    class Factory:
+        def __init__(self):
+            self.sent = []
+            self.connections = 0
+            self.fail_next = 0
+            self.lock = threading.Lock()
+
+        def __call__(self):
+            with self.lock:
+                self.connections += 1
+            return MemorySMTP(self)
+
+    @staticmethod
+    def factory():
+        return MemorySMTP.Factory()
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._open = True
+
+    def send_message(self, msg):
+        if not self._open:
+            raise smtplib.SMTPServerDisconnected('Connection closed')
+        with self._factory.lock:
+            if self._factory.fail_next:
+                self._factory.fail_next -= 1
+                self._open = False
+                raise smtplib.SMTPServerDisconnected('Connection dropped by stand-in')
+            self._factory.sent.append(msg)
+        return {}
+
+    def noop(self):
+        if not self._open:
+            raise smtplib.SMTPServerDisconnected('Connection closed')
+        return (250, b'OK')
+
+    def quit(self):
+        self._open = False
+
+
+def start_local_smtpd(host='127.0.0.1', port=8025):
+    """Run a local SMTP sink (needs the optional ``aiosmtpd`` package).
 
-        msg.attach(MIMEText(html, 'html'))
+    Returns (controller, messages): call ``controller.stop()`` when done;
+    ``messages`` collects the raw envelopes received.
+    """
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise RuntimeError('aiosmtpd is not installed; use MemorySMTP instead')
+
+    messages = []
+
+    class Sink:
+        async def handle_DATA(self, server, session, envelope):
+            messages.append(envelope)
+            return '250 Message accepted for delivery'
+
+    controller = Controller(Sink(), hostname=host, port=port)
+    controller.start()
+    return controller, messages
+
+
+# ========== QUEUED SENDER ==========
+# Failures worth a reconnect and another attempt; refused senders or
+# recipients, rejected data and failed logins are permanent
+RETRYABLE_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+class Mailer:
+    """Queued sender reusing one SMTP connection across batches.
+
+    ``submit`` returns a Future resolved with True once the message is
+    accepted by the server, or with the exception that made it fail.
+    Dropped connections (``RETRYABLE_ERRORS``) are retried up to
+    ``max_retries`` times; 5xx replies and other SMTP errors fail at once.
+    """
+
+    def __init__(self, connect=smtp_connect, batch_size=20, keepalive_seconds=60, max_retries=2):
+        self.connect = connect
+        self.batch_size = batch_size
+        self.keepalive_seconds = keepalive_seconds
+        self.max_retries = max_retries
+        self._queue = queue.Queue()
+        self._server = None
+        self._last_used = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'sent': 0, 'failed': 0, 'batches': 0, 'reconnects': 0}
+
+    def submit(self, msg):
+        future = Future()
+        self._queue.put((msg, future))
+        self._ensure_worker()
+        return future
+
+    def send(self, msg, timeout=60):
+        return self.submit(msg).result(timeout=timeout)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='mailer', daemon=True)
+                self._thread.start()
+
+    def _connection(self):
+        """Live connection: reuse, probe with NOOP after idling, else reconnect"""
+        if self._server is not None and time.time() - self._last_used > self.keepalive_seconds:
+            try:
+                self._server.noop()
+            except smtplib.SMTPException:
+                self._drop()
+        if self._server is None:
+            self._server = self.connect()
+            self._count('reconnects')
+        return self._server
 
-        # Send email via SMTP
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            logger.info('Connecting to SMTP server...')
-            server.starttls()
-            logger.info('STARTTLS enabled, attempting login...')
-            server.login(EMAIL_USER, EMAIL_PASSWORD)
-            logger.info('Login successful, sending message...')
-            server.send_message(msg)
-            logger.info('Message sent successfully')
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
 
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _drop(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+        self._server = None
+
+    def _deliver(self, msg):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._connection().send_message(msg)
+                self._last_used = time.time()
+                return
+            except RETRYABLE_ERRORS as e:
+                self._drop()
+                permanent = isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500
+                if permanent or attempt == self.max_retries:
+                    raise
+            except smtplib.SMTPException:
+                # The server answered; the session is still usable
+                raise
+            except OSError:
+                self._drop()
+                raise
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.keepalive_seconds)]
+            except queue.Empty:
+                self._drop()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._count('batches')
+            for msg, future in batch:
+                try:
+                    self._deliver(msg)
+                    self._count('sent')
+                    future.set_result(True)
+                except Exception as e:
+                    self._count('failed')
+                    future.set_exception(e)
+
+
+def _default_mailer():
+    if os.environ.get('MAIL_BACKEND', 'smtp').strip().lower() == 'memory':
+        return Mailer(connect=MemorySMTP.factory())
+    return Mailer()
+
+
+mailer = _default_mailer()
+
+
+def send_verification_email(email, verification_code):
+    """Send verification code via the pooled mailer.
+
+    Returns True on success, False on failure.
+    """
+    try:
+        mailer.send(build_verification_message(email, verification_code))
         logger.info('Verification code sent to %s', email)
         return True
 
@@ -106,4 +324,4 @@ def send_verification_email(email, verification_code):
         return False
     except Exception as e:
         logger.exception('Unexpected error sending verification email to %s: %s', email, str(e))
-        return False
\ No newline at end of file
+        return False
@@ -3,11 +3,20 @@ import os
 import hashlib
 
 def hash_password(password):
+    """Legacy unsalted hash; new passwords use services.passwords"""
     return hashlib.sha256(password.encode()).hexdigest()
 
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'smartattend.db')
+
+# Tables whose writes bump a counter in table_versions (used for ETags)
+VERSIONED_TABLES = (
+    'users', 'students', 'teacher_profiles', 'departments', 'subjects',
+    'classes', 'enrollment', 'attendance', 'attendance_requests',
+    'notifications', 'class_schedules', 'teacher_subjects'
+)
+
 def get_db_connection():
-    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'smartattend.db')
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -235,6 +244,235 @@ def init_db():
         );
     ''')
 
+    # ========== ATTENDANCE ROLLUPS ==========
+    # Derived counters maintained by services/attendance_rollup.py so the admin
+    # dashboards never have to scan the raw attendance table.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_daily_rollup (
+            attendance_date DATE NOT NULL,
+            class_id INTEGER NOT NULL,
+            subject_id INTEGER,
+            department_id INTEGER,
+            present_count INTEGER NOT NULL DEFAULT 0,
+            absent_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(attendance_date, class_id)
+        );
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_rollup_department
+        ON attendance_daily_rollup(department_id, attendance_date);
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_student_rollup (
+            student_id INTEGER NOT NULL,
+            class_id INTEGER NOT NULL,
+            present_count INTEGER NOT NULL DEFAULT 0,
+            absent_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(student_id, class_id)
+        );
+    ''')
+
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS attendance_weekly_rollup AS
+        SELECT
+            DATE(attendance_date, '-' || ((CAST(strftime('%w', attendance_date) AS INTEGER) + 6) % 7) || ' days') AS week_start,
+            class_id,
+            subject_id,
+            department_id,
+            SUM(present_count) AS present_count,
+            SUM(absent_count) AS absent_count
+        FROM attendance_daily_rollup
+        GROUP BY week_start, class_id;
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_attendance_date
+        ON attendance(attendance_date);
+    ''')
+
+    # ========== LIST INDEXES ==========
+    # Back the keyset-paginated list endpoints (sort columns + id)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_attendance_student_date
+        ON attendance(student_id, attendance_date, id);
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_requests_responded
+        ON attendance_requests(COALESCE(responded_at, ''), id);
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_face_encodings_created
+        ON face_encodings(created_at, id);
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notifications_user
+        ON notifications(user_id, id);
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_class_schedules_day_time
+        ON class_schedules(day_of_week, start_time);
+    ''')
+
+    # ========== OUTBOX ==========
+    # Notifications / emails queued in the same transaction as the change that
+    # triggers them and delivered by services/outbox.py's dispatcher.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            dedupe_key TEXT UNIQUE,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending','sending','sent','dead')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            claim_token TEXT,
+            next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            processed_at TIMESTAMP
+        );
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_outbox_due
+        ON outbox(status, next_attempt_at);
+    ''')
+
+    # ========== NOTIFICATION COUNTERS ==========
+    # Per-user unread counts by type, kept in step with notifications by
+    # triggers so the notification badge is a primary-key lookup.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_unread_counts (
+            user_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            unread_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(user_id, type)
+        );
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_insert
+        AFTER INSERT ON notifications
+        WHEN COALESCE(NEW.is_read, 0) = 0
+        BEGIN
+            INSERT INTO notification_unread_counts (user_id, type, unread_count)
+            VALUES (NEW.user_id, NEW.type, 1)
+            ON CONFLICT(user_id, type) DO UPDATE SET unread_count = unread_count + 1;
+        END;
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_delete
+        AFTER DELETE ON notifications
+        WHEN COALESCE(OLD.is_read, 0) = 0
+        BEGIN
+            UPDATE notification_unread_counts SET unread_count = unread_count - 1
+            WHERE user_id = OLD.user_id AND type = OLD.type;
+        END;
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_update
+        AFTER UPDATE OF is_read, user_id, type ON notifications
+        BEGIN
+            UPDATE notification_unread_counts SET unread_count = unread_count - 1
+            WHERE user_id = OLD.user_id AND type = OLD.type
+              AND COALESCE(OLD.is_read, 0) = 0;
+            INSERT INTO notification_unread_counts (user_id, type, unread_count)
+            SELECT NEW.user_id, NEW.type, 1
+            WHERE COALESCE(NEW.is_read, 0) = 0
+            ON CONFLICT(user_id, type) DO UPDATE SET unread_count = unread_count + 1;
+        END;
+    ''')
+    # Re-derive on startup in case rows were changed with triggers absent
+    cursor.execute('DELETE FROM notification_unread_counts')
+    cursor.execute('''
+        INSERT INTO notification_unread_counts (user_id, type, unread_count)
+        SELECT user_id, type, COUNT(*)
+        FROM notifications
+        WHERE COALESCE(is_read, 0) = 0
+        GROUP BY user_id, type
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notifications_user_created
+        ON notifications(user_id, created_at);
+    ''')
+
+    # ========== NOTIFICATION ARCHIVE ==========
+    # Old read notifications, one zlib-compressed JSON batch per user per row
+    # (services/notification_retention.py).
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notifications_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            first_id INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notifications_archive_user
+        ON notifications_archive(user_id, last_id);
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notifications_type_user
+        ON notifications(type, user_id);
+    ''')
+
+    # ========== TTL STORE ==========
+    # Short-lived keyed state shared by all workers (services/ttl_store.py),
+    # e.g. password-reset verification codes.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ttl_store (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        );
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ttl_store_expires
+        ON ttl_store(expires_at);
+    ''')
+
+    # ========== TIMETABLES ==========
+    # Materialized weekly timetables (services/timetables.py), valid while
+    # ``stamp`` matches the change counters of their source tables.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS timetables (
+            kind TEXT NOT NULL,
+            owner_id INTEGER NOT NULL,
+            document TEXT NOT NULL,
+            stamp TEXT,
+            built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (kind, owner_id)
+        );
+    ''')
+
+    # ========== CHANGE COUNTERS ==========
+    # One counter per table, bumped by triggers on every write, so list
+    # endpoints can answer If-None-Match without running their queries.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+    ''')
+    for table in VERSIONED_TABLES:
+        cursor.execute(
+            'INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)',
+            (table,)
+        )
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1
+                    WHERE table_name = '{table}';
+                END;
+            ''')
+
     conn.commit()
     conn.close()
     print("Database schema created successfully (all tables included).")
@@ -1,6 +1,10 @@
 import hashlib
 from datetime import datetime, timedelta
-from models.database import get_db_connection, hash_password
+from models.database import get_db_connection
+from services.passwords import passwords
+from services.response_cache import response_cache
+from services.identity import identity
+from services.catalogue import catalogue
 
 def admin_exists():
     """Check if an admin already exists"""
@@ -22,7 +26,7 @@ def create_user(name, email, password, role, course=None, department=None, domai
             raise Exception("Admin already exists. Only one admin is allowed.")
         
         # Create user account
-        hashed_pwd = hash_password(password)
+        hashed_pwd = passwords.hash(password)
         cursor.execute(
             'INSERT INTO users (name, email, password_hash, role) VALUES (?, ?, ?, ?)',
             (name, email, hashed_pwd, role)
@@ -69,6 +73,9 @@ def create_user(name, email, password, role, course=None, department=None, domai
             print(f"Teacher profile created with faculty_id: {faculty_id}")
         
         conn.commit()
+        response_cache.invalidate('admin')
+        identity.invalidate()
+        catalogue.invalidate()
         return user_id
         
     except Exception as e:
@@ -83,15 +90,23 @@ def get_user_by_credentials(email, password, role):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    hashed_pwd = hash_password(password)
     cursor.execute(
-        'SELECT id, name, email, role FROM users WHERE email = ? AND password_hash = ? AND role = ?',
-        (email, hashed_pwd, role)
+        'SELECT id, name, email, role, password_hash FROM users WHERE email = ? AND role = ?',
+        (email, role)
     )
     user = cursor.fetchone()
     
-    if user:
+    if user and passwords.verify(password, user['password_hash']):
         user_data = dict(user)
+        stored_hash = user_data.pop('password_hash')
+
+        # Upgrade legacy / outdated hashes now that we know the password
+        if passwords.needs_rehash(stored_hash):
+            cursor.execute(
+                'UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?',
+                (passwords.hash(password), user_data['id'], stored_hash)
+            )
+            conn.commit()
         
         # Get additional profile data
         if role == 'student':
@@ -1,5 +1,10 @@
 from flask import Blueprint, jsonify, request
 from models.database import get_db_connection
+from services.etag import conditional
+from services.pagination import Page
+from services.response_cache import response_cache
+from services.identity import identity
+from services.catalogue import catalogue
 
 admin_list_bp = Blueprint('admin_list_bp', __name__)
 
@@ -7,11 +12,15 @@ admin_list_bp = Blueprint('admin_list_bp', __name__)
 # 1️⃣ GET ALL STUDENTS (NEW SCHEMA COMPATIBLE)
 # ================================================================
 @admin_list_bp.route('/students', methods=['GET'])
+@conditional('students', 'users')
 def get_students():
+    page = Page()
+    where, params = page.filter('students', 's')
+
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT 
             s.id,
             u.name,
@@ -26,35 +35,22 @@ def get_students():
             s.created_at
         FROM students s
         JOIN users u ON s.user_id = u.id
-        ORDER BY s.id ASC
-    """)
+        WHERE 1 = 1 {where}
+        {page.order_by('s')}
+        {page.limit_clause()}
+    """, params)
 
-    rows = cursor.fetchall()
+    students = page.rows(cursor.fetchall())
     conn.close()
 
-    students = []
-    for r in rows:
-        students.append({
-            "id": r[0],
-            "name": r[1],
-            "email": r[2],
-            "enrollment_no": r[3],
-            "course": r[4],
-            "semester": r[5],
-            "phone": r[6],
-            "address": r[7],
-            "emergency_contact_name": r[8],
-            "emergency_contact_phone": r[9],
-            "created_at": r[10]
-        })
-
-    return jsonify(students)
+    return page.response(students)
 
 
 # ================================================================
 # 2️⃣ GET ALL TEACHERS (USING teacher_profiles)
 # ================================================================
 @admin_list_bp.route('/teachers', methods=['GET'])
+@conditional('teacher_profiles', 'users', 'departments')
 def get_teachers():
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -101,35 +97,7 @@ def get_teachers():
 # ================================================================
 @admin_list_bp.route('/departments', methods=['GET'])
 def get_departments():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT 
-            d.id,
-            d.name,
-            d.created_at,
-            COUNT(s.id) AS total_subjects
-        FROM departments d
-        LEFT JOIN subjects s ON s.department_id = d.id
-        GROUP BY d.id
-        ORDER BY d.name ASC
-    """)
-
-    rows = cursor.fetchall()
-
-    departments = [
-        {
-            "id": r[0],
-            "name": r[1],
-            "created_at": r[2],
-            "total_subjects": r[3]
-        }
-        for r in rows
-    ]
-
-    conn.close()
-    return jsonify(departments)
+    return jsonify(catalogue.department_summaries())
 
 
 
@@ -138,34 +106,15 @@ def get_departments():
 # ================================================================
 @admin_list_bp.route('/courses', methods=['GET'])
 def get_courses():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    SELECT 
-        s.id,
-        s.name,
-        COALESCE(d.name, 'Unknown') AS department,
-        s.created_at
-    FROM subjects s
-    LEFT JOIN departments d ON s.department_id = d.id
-    ORDER BY s.id ASC
-""")
-
-
-    rows = cursor.fetchall()
-    conn.close()
-
-    courses = []
-    for r in rows:
-        courses.append({
-            "id": r[0],
-            "name": r[1],
-            "department": r[2],
-            "created_at": r[3]
-        })
-
-    return jsonify(courses)
+    return jsonify([
+        {
+            "id": c["id"],
+            "name": c["name"],
+            "department": c["department"],
+            "created_at": c["created_at"]
+        }
+        for c in catalogue.subjects()
+    ])
 
 
 # ================================================================
@@ -210,6 +159,7 @@ def update_student(student_id):
         ))
         
         conn.commit()
+        response_cache.invalidate('admin')
         conn.close()
         return jsonify({"success": True, "message": "Student updated successfully"})
     except Exception as e:
@@ -236,6 +186,11 @@ def delete_student(student_id):
         
         user_id = result[0]
         
+        # Unenroll first so class rosters (and their cached views) drop the student
+        cursor.execute("SELECT class_id FROM enrollment WHERE student_id = ?", (student_id,))
+        class_ids = [r[0] for r in cursor.fetchall()]
+        cursor.execute("DELETE FROM enrollment WHERE student_id = ?", (student_id,))
+        
         # Delete student record
         cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
         
@@ -243,6 +198,9 @@ def delete_student(student_id):
         cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
         
         conn.commit()
+        response_cache.invalidate_classes(cursor, class_ids)
+        response_cache.invalidate('admin')
+        identity.invalidate()
         conn.close()
         return jsonify({"success": True, "message": "Student deleted successfully"})
     except Exception as e:
@@ -276,6 +234,7 @@ def update_teacher(teacher_id):
         ))
         
         conn.commit()
+        response_cache.invalidate('admin')
         conn.close()
         return jsonify({"success": True, "message": "Teacher updated successfully"})
     except Exception as e:
@@ -309,6 +268,8 @@ def delete_teacher(teacher_id):
         cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
         
         conn.commit()
+        response_cache.invalidate('admin')
+        identity.invalidate()
         conn.close()
         return jsonify({"success": True, "message": "Teacher deleted successfully"})
     except Exception as e:
@@ -335,6 +296,8 @@ def update_department(department_id):
         """, (data.get('name'), department_id))
         
         conn.commit()
+        catalogue.invalidate()
+        response_cache.invalidate('admin')
         conn.close()
         return jsonify({"success": True, "message": "Department updated successfully"})
     except Exception as e:
@@ -354,6 +317,8 @@ def delete_department(department_id):
     try:
         cursor.execute("DELETE FROM departments WHERE id = ?", (department_id,))
         conn.commit()
+        catalogue.invalidate()
+        response_cache.invalidate('admin')
         conn.close()
         return jsonify({"success": True, "message": "Department deleted successfully"})
     except Exception as e:
@@ -386,6 +351,8 @@ def update_course(course_id):
         """, (data.get('name'), dept_id, course_id))
         
         conn.commit()
+        catalogue.invalidate()
+        response_cache.invalidate('admin')
         conn.close()
         return jsonify({"success": True, "message": "Course updated successfully"})
     except Exception as e:
@@ -393,6 +360,7 @@ def update_course(course_id):
         return jsonify({"error": str(e)}), 400
         
         conn.commit()
+        response_cache.invalidate('admin')
         conn.close()
         return jsonify({"success": True, "message": "Course updated successfully"})
     except Exception as e:
@@ -412,6 +380,8 @@ def delete_course(course_id):
     try:
         cursor.execute("DELETE FROM subjects WHERE id = ?", (course_id,))
         conn.commit()
+        catalogue.invalidate()
+        response_cache.invalidate('admin')
         conn.close()
         return jsonify({"success": True, "message": "Course deleted successfully"})
     except Exception as e:
@@ -1,5 +1,12 @@
 from flask import Blueprint, jsonify, request
 from models.database import get_db_connection
+from services.attendance_rollup import AttendanceRollupService
+from services.response_cache import response_cache
+from services.outbox import Outbox
+from services.notification_retention import NotificationRetention
+from services.catalogue import catalogue
+from services.low_attendance import LowAttendanceService, low_attendance_job
+from services.analytics import analytics
 
 admin_bp = Blueprint('admin_bp', __name__)
 
@@ -7,6 +14,7 @@ admin_bp = Blueprint('admin_bp', __name__)
 # 1️⃣ ADMIN DASHBOARD STATS
 # ==========================================================
 @admin_bp.route('/admin/stats', methods=['GET'])
+@response_cache.cached(['admin', 'attendance'])
 def admin_stats():
     """
     Returns overall statistics for the Admin Dashboard.
@@ -31,15 +39,12 @@ def admin_stats():
     cursor.execute("SELECT COUNT(*) FROM subjects")
     total_courses = cursor.fetchone()[0]
 
-    # Average attendance (from attendance table)
-    cursor.execute("""
-        SELECT ROUND(
-            (SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) * 100.0) / COUNT(*),
-            1
-        )
-        FROM attendance
-    """)
-    avg_attendance = cursor.fetchone()[0] or 0
+    # Average attendance (from the daily rollup, optionally for a date range)
+    avg_attendance = AttendanceRollupService.overall_percent(
+        cursor,
+        request.args.get('start_date'),
+        request.args.get('end_date')
+    )
 
     conn.close()
     return jsonify({
@@ -58,30 +63,16 @@ def department_attendance():
     """
     Returns average attendance percentage grouped by department.
     Joins with departments table to show all departments even with 0 attendance.
+    Optional start_date / end_date (YYYY-MM-DD) restrict the range.
     """
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT 
-          d.name AS department,
-          ROUND(
-            COALESCE(
-              (SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) * 100.0) /
-              NULLIF(COUNT(a.id), 0),
-              0
-            ),
-            1
-          ) AS percent
-        FROM departments d
-        LEFT JOIN subjects s ON s.department_id = d.id
-        LEFT JOIN classes c ON c.subject_id = s.id
-        LEFT JOIN attendance a ON a.class_id = c.id
-        GROUP BY d.id, d.name
-        ORDER BY d.name
-    """)
-
-    data = [{"department": dept, "percent": percent} for dept, percent in cursor.fetchall()]
+    data = AttendanceRollupService.department_percentages(
+        cursor,
+        request.args.get('start_date'),
+        request.args.get('end_date')
+    )
     conn.close()
     return jsonify(data)
 
@@ -91,36 +82,17 @@ def department_attendance():
 @admin_bp.route('/admin/attendance-distribution', methods=['GET'])
 def attendance_distribution():
     """
-    Returns the percentage of students above and below 75% attendance.
+    Returns the percentage of students above and below 75% attendance,
+    plus a 10-point histogram, percentiles and the mean student rate.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Compute per-student attendance percentage
-    cursor.execute("""
-        SELECT 
-            s.id,
-            ROUND(
-                (SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) * 100.0) / COUNT(*),
-                1
-            ) AS attendance_percent
-        FROM attendance a
-        JOIN students s ON a.student_id = s.id
-        GROUP BY s.id
-    """)
-    student_attendance = cursor.fetchall()
-
-    if not student_attendance:
-        return jsonify({"above_75": 0, "below_75": 0})
-
-    total_students = len(student_attendance)
-    above_75 = sum(1 for _, percent in student_attendance if percent >= 75)
-    below_75 = total_students - above_75
-
-    conn.close()
+    data = analytics.distribution(75)
     return jsonify({
-        "above_75": round((above_75 / total_students) * 100, 1),
-        "below_75": round((below_75 / total_students) * 100, 1)
+        "above_75": data["above"],
+        "below_75": data["below"],
+        "students": data["students"],
+        "mean": data["mean"],
+        "percentiles": data["percentiles"],
+        "histogram": data["histogram"]
     })
 
 # ==========================================================
@@ -131,22 +103,8 @@ def active_departments():
     """
     Returns list of departments and number of subjects in each.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT 
-            d.name AS department,
-            COUNT(s.id) AS total_subjects
-        FROM departments d
-        LEFT JOIN subjects s ON d.id = s.department_id
-        GROUP BY d.id
-        ORDER BY d.name ASC
-    """)
-
-    rows = cursor.fetchall()
-    conn.close()
-    return jsonify([{"department": r[0], "total_subjects": r[1]} for r in rows])
+    return jsonify([{"department": d["name"], "total_subjects": d["total_subjects"]}
+                    for d in catalogue.department_summaries()])
 
 # ==========================================================
 # 5️⃣ TEST ENDPOINT TO VERIFY ADMIN ROUTES
@@ -205,56 +163,155 @@ def attendance_summary():
     conn = get_db_connection()
     cur = conn.cursor()
 
-    # 1️⃣ Summary by Department — derive department via class → subject → department
-    cur.execute("""
-        SELECT 
-            COALESCE(d.name, 'Unassigned') AS department,
-            COUNT(*) AS total_classes,
-            SUM(CASE WHEN a.status='present' THEN 1 ELSE 0 END) AS present_classes,
-            SUM(CASE WHEN a.status='absent' THEN 1 ELSE 0 END) AS absent_classes
-        FROM attendance a
-        LEFT JOIN classes c ON a.class_id = c.id
-        LEFT JOIN subjects s ON c.subject_id = s.id
-        LEFT JOIN departments d ON s.department_id = d.id
-        GROUP BY d.name
-    """)
-    dept_rows = [dict(r) for r in cur.fetchall()]
+    summary = AttendanceRollupService.summary(
+        cur,
+        request.args.get('start_date'),
+        request.args.get('end_date')
+    )
+    conn.close()
+    return jsonify(summary)
 
-    # 2️⃣ Summary by Subject — derive subject from subject table or fallback to class_name
-    cur.execute("""
-        SELECT 
-            COALESCE(s.name, c.class_name, 'Unassigned') AS subject,
-            COUNT(*) AS total_classes,
-            SUM(CASE WHEN a.status='present' THEN 1 ELSE 0 END) AS present_classes,
-            SUM(CASE WHEN a.status='absent' THEN 1 ELSE 0 END) AS absent_classes
-        FROM attendance a
-        LEFT JOIN classes c ON a.class_id = c.id
-        LEFT JOIN subjects s ON c.subject_id = s.id
-        GROUP BY COALESCE(s.name, c.class_name)
-    """)
-    subject_rows = [dict(r) for r in cur.fetchall()]
 
-    # 3️⃣ Summary by Student
+# --------------------------------------------------------
+# 📈 ADMIN — WEEKLY ATTENDANCE TREND (from rollups)
+# --------------------------------------------------------
+@admin_bp.route('/admin/attendance/weekly', methods=['GET'])
+def attendance_weekly():
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    weeks = AttendanceRollupService.weekly(
+        cur,
+        request.args.get('start_date'),
+        request.args.get('end_date'),
+        request.args.get('department_id')
+    )
+    conn.close()
+
+    for w in weeks:
+        total = (w['present_count'] or 0) + (w['absent_count'] or 0)
+        w['percent'] = round(w['present_count'] * 100.0 / total, 1) if total else 0
+    return jsonify(weeks)
+
+
+# --------------------------------------------------------
+# 🔁 ADMIN — REBUILD ATTENDANCE ROLLUPS (back-fills / repairs)
+# --------------------------------------------------------
+@admin_bp.route('/admin/rollups/rebuild', methods=['POST'])
+def rebuild_rollups():
+    data = request.get_json(silent=True) or {}
+    try:
+        written = AttendanceRollupService.rebuild(
+            start_date=data.get('start_date'),
+            end_date=data.get('end_date')
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"message": "Rollups rebuilt", "daily_rows": written})
+
+
+# --------------------------------------------------------
+# 🧮 ADMIN — RESPONSE CACHE METRICS
+# --------------------------------------------------------
+@admin_bp.route('/admin/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+
+# --------------------------------------------------------
+# 📮 ADMIN — OUTBOX STATUS / DEAD LETTERS
+# --------------------------------------------------------
+@admin_bp.route('/admin/outbox', methods=['GET'])
+def outbox_status():
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    counts = Outbox.stats(cur)
     cur.execute("""
-        SELECT 
-            u.name AS student_name,
-            s.enrollment_no,
-            COUNT(*) AS total_classes,
-            SUM(CASE WHEN a.status='present' THEN 1 ELSE 0 END) AS present_classes,
-            SUM(CASE WHEN a.status='absent' THEN 1 ELSE 0 END) AS absent_classes
-        FROM attendance a
-        JOIN students s ON a.student_id = s.id
-        JOIN users u ON s.user_id = u.id
-        GROUP BY s.id
-        ORDER BY u.name ASC
+        SELECT id, kind, attempts, last_error, created_at, processed_at
+        FROM outbox
+        WHERE status = 'dead'
+        ORDER BY id DESC
+        LIMIT 50
     """)
-    student_rows = [dict(r) for r in cur.fetchall()]
+    dead = [dict(r) for r in cur.fetchall()]
+    conn.close()
+
+    return jsonify({"counts": counts, "dead": dead})
 
+
+@admin_bp.route('/admin/outbox/<int:outbox_id>/retry', methods=['POST'])
+def retry_outbox(outbox_id):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE outbox
+        SET status = 'pending', attempts = 0, next_attempt_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND status = 'dead'
+    """, (outbox_id,))
+    conn.commit()
+    retried = cur.rowcount
     conn.close()
 
-    return jsonify({
-        "by_department": dept_rows,
-        "by_subject": subject_rows,
-        "by_student": student_rows
-    })
+    if not retried:
+        return jsonify({"error": "Dead outbox entry not found"}), 404
+    return jsonify({"message": "Entry re-queued"})
+
+
+# --------------------------------------------------------
+# 🗄️ ADMIN — NOTIFICATION RETENTION (archive + compaction)
+# --------------------------------------------------------
+@admin_bp.route('/admin/notifications/retention', methods=['POST'])
+def run_notification_retention():
+    data = request.get_json(silent=True) or {}
+    try:
+        report = NotificationRetention(
+            days=data.get('days'),
+            batch_size=data.get('batch_size')
+        ).run(max_batches=data.get('max_batches'))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(report)
+
 
+# --------------------------------------------------------
+# ⚠️ ADMIN — LOW ATTENDANCE (below-threshold lists + scan)
+# --------------------------------------------------------
+@admin_bp.route('/admin/low-attendance', methods=['GET'])
+@response_cache.cached(['admin', 'attendance'])
+def low_attendance():
+    threshold = request.args.get('threshold', type=float)
+    conn = get_db_connection()
+    try:
+        report = LowAttendanceService.report(conn.cursor(), threshold=threshold)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+    return jsonify(report)
+
+
+@admin_bp.route('/admin/low-attendance/scan', methods=['POST'])
+def run_low_attendance_scan():
+    """Run the low-attendance scan now instead of waiting for its interval"""
+    try:
+        queued = low_attendance_job.run_once()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"warnings_queued": queued})
+
+
+# --------------------------------------------------------
+# 📈 ADMIN — ATTENDANCE ANALYTICS (departments + daily trend)
+# --------------------------------------------------------
+@admin_bp.route('/admin/attendance/analytics', methods=['GET'])
+def attendance_analytics():
+    window = request.args.get('window', 7, type=int)
+    try:
+        return jsonify({
+            "distribution": analytics.distribution(75),
+            "departments": analytics.departments(),
+            "trend": analytics.trend(max(window, 1))
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
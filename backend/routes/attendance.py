@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from models.database import get_db_connection
-from services.notification_service import NotificationService
+from services.attendance_rollup import AttendanceRollupService
+from services.response_cache import response_cache
+from services.identity import identity
+from services.analytics import analytics
 
 attendance_bp = Blueprint('attendance', __name__)
 
@@ -25,46 +28,12 @@ def mark_attendance():
             (student_id, class_id, attendance_date, status, marked_by)
             VALUES (?, ?, ?, ?, ?)
         ''', (student_id, class_id, attendance_date, status, marked_by))
+        AttendanceRollupService.record(cursor, student_id, class_id, attendance_date, status)
         
-        # --------- CHECK ATTENDANCE PERCENTAGE ----------
-        cursor.execute('''
-            SELECT 
-                SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as present_count,
-                COUNT(*) as total_classes
-            FROM attendance
-            WHERE student_id = ?
-        ''', (student_id,))
+        # Low-attendance warnings are raised by the LowAttendanceJob scan
         
-        stats = cursor.fetchone()
-        present = stats['present_count'] or 0
-        total = stats['total_classes'] or 1
-        percentage = (present / total) * 100.0
-
-        # Find the student's user_id
-        cursor.execute('SELECT user_id FROM students WHERE id = ?', (student_id,))
-        stu = cursor.fetchone()
-        student_user_id = stu['user_id'] if stu else None
-
-        # If attendance < 75%, send warning (max once per day)
-        if student_user_id and percentage < 75:
-            cursor.execute('''
-                SELECT COUNT(*) as c
-                FROM notifications
-                WHERE user_id = ? 
-                  AND type = 'attendance_warning'
-                  AND DATE(created_at) = DATE('now')
-            ''', (student_user_id,))
-            already = cursor.fetchone()['c']
-
-            if already == 0:
-                NotificationService.notify_user(
-                    user_id=student_user_id,
-                    title="Low Attendance Warning",
-                    message=f"Your attendance is now {percentage:.2f}%. Please attend regularly to avoid shortage.",
-                    notification_type='attendance_warning'
-                )
-
         conn.commit()
+        response_cache.invalidate_class(cursor, class_id)
         conn.close()
         
         return jsonify({'message': 'Attendance marked successfully'}), 201
@@ -209,98 +178,16 @@ def get_attendance_analytics():
     if not teacher_id:
         return jsonify({'error': 'Teacher ID is required'}), 400
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if this is a user_id or teacher_profile_id
+    # Accept a user_id or a teacher_profile_id
     try:
-        teacher_id_int = int(teacher_id)
-        
-        # If it's a small number, it might be user_id, check if teacher profile exists
-        cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id_int,))
-        teacher_profile = cursor.fetchone()
-        
-        if teacher_profile:
-            # It was a user_id, use the teacher profile ID instead
-            teacher_profile_id = teacher_profile['id']
-        else:
-            # Check if it's already a teacher profile ID
-            cursor.execute('SELECT id FROM teacher_profiles WHERE id = ?', (teacher_id_int,))
-            if cursor.fetchone():
-                teacher_profile_id = teacher_id_int
-            else:
-                conn.close()
-                return jsonify({'error': 'Teacher profile not found'}), 404
+        teacher_profile_id = identity.resolve_teacher(teacher_id)
+        if teacher_profile_id is None:
+            return jsonify({'error': 'Teacher profile not found'}), 404
     except ValueError:
-        conn.close()
         return jsonify({'error': 'Invalid teacher ID format'}), 400
-    
-    date_filter = ""
-    if period == 'week':
-        date_filter = "AND a.attendance_date >= date('now', '-7 days')"
-    elif period == 'month':
-        date_filter = "AND a.attendance_date >= date('now', '-1 month')"
-    
+
     try:
-        # Get overall statistics - FIXED: Use classes table instead of class_schedules
-        cursor.execute(f'''
-            SELECT 
-                COUNT(*) as total_records,
-                SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) as present_count,
-                SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END) as absent_count
-            FROM attendance a
-            JOIN classes c ON a.class_id = c.id
-            WHERE c.teacher_id = ? {date_filter}
-        ''', (teacher_profile_id,))
-        
-        overall_stats = dict(cursor.fetchone())
-        print(f"Analytics for teacher_profile_id {teacher_profile_id}: {overall_stats}")
-        
-        # Get subject-wise statistics - FIXED: Use classes table
-        cursor.execute(f'''
-            SELECT 
-                COALESCE(s.name, c.class_name) as subject_name,
-                COALESCE(d.name, '') as department_name,
-                COUNT(*) as total,
-                SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) as present_count,
-                SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END) as absent_count
-            FROM attendance a
-            JOIN classes c ON a.class_id = c.id
-            LEFT JOIN subjects s ON c.subject_id = s.id
-            LEFT JOIN departments d ON s.department_id = d.id
-            WHERE c.teacher_id = ? {date_filter}
-            GROUP BY subject_name, department_name
-        ''', (teacher_profile_id,))
-        
-        subject_stats = [dict(row) for row in cursor.fetchall()]
-        print(f"Subject-wise stats: {len(subject_stats)} subjects found")
-        
-        # Get daily statistics - FIXED: Use classes table
-        cursor.execute(f'''
-            SELECT 
-                date(a.attendance_date) as date,
-                COALESCE(s.name, c.class_name) as subject_name,
-                COUNT(*) as total,
-                SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) as present_count,
-                SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END) as absent_count
-            FROM attendance a
-            JOIN classes c ON a.class_id = c.id
-            LEFT JOIN subjects s ON c.subject_id = s.id
-            WHERE c.teacher_id = ? {date_filter}
-            GROUP BY date(a.attendance_date), subject_name
-            ORDER BY a.attendance_date DESC
-        ''', (teacher_profile_id,))
-        
-        daily_stats = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return jsonify({
-            'overall': overall_stats,
-            'subject_wise': subject_stats,
-            'daily': daily_stats
-        })
-        
+        # Subject-wise, daily and trend figures from the cached analytics frame
+        return jsonify(analytics.teacher(teacher_profile_id, period))
     except Exception as e:
-        conn.close()
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
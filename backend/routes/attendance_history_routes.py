@@ -1,6 +1,7 @@
 # attendance_history_routes.py (updated)
 from flask import Blueprint, jsonify, request
 from models.database import get_db_connection
+from services.attendance_rollup import AttendanceRollupService
 
 attendance_history_bp = Blueprint('attendance_history_bp', __name__)
 
@@ -94,69 +95,16 @@ def get_attendance_summary():
     cursor = conn.cursor()
 
     try:
-        # -------------------------
-        # BY DEPARTMENT
-        # -------------------------
-        cursor.execute("""
-            SELECT
-                COALESCE(d.name, 'Unknown') AS department,
-                COUNT(a.id) AS total_classes,
-                SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) AS present_classes,
-                SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END) AS absent_classes
-            FROM attendance a
-            JOIN students s ON a.student_id = s.id
-            JOIN users u ON s.user_id = u.id
-            LEFT JOIN classes c ON a.class_id = c.id
-            LEFT JOIN subjects sub ON c.subject_id = sub.id
-            LEFT JOIN departments d ON sub.department_id = d.id
-            GROUP BY d.name
-            ORDER BY d.name
-        """)
-        by_department = [dict(r) for r in cursor.fetchall()]
-
-        # -------------------------
-        # BY SUBJECT
-        # -------------------------
-        cursor.execute("""
-            SELECT
-                COALESCE(sub.name, 'Unknown') AS subject,
-                COUNT(a.id) AS total_classes,
-                SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) AS present_classes,
-                SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END) AS absent_classes
-            FROM attendance a
-            JOIN classes c ON a.class_id = c.id
-            LEFT JOIN subjects sub ON c.subject_id = sub.id
-            GROUP BY sub.name
-            ORDER BY sub.name
-        """)
-        by_subject = [dict(r) for r in cursor.fetchall()]
-
-        # -------------------------
-        # BY STUDENT
-        # -------------------------
-        cursor.execute("""
-            SELECT
-                u.name AS student_name,
-                s.enrollment_no,
-                COUNT(a.id) AS total_classes,
-                SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) AS present_classes,
-                SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END) AS absent_classes
-            FROM attendance a
-            JOIN students s ON a.student_id = s.id
-            JOIN users u ON s.user_id = u.id
-            GROUP BY s.id
-            ORDER BY u.name
-        """)
-        by_student = [dict(r) for r in cursor.fetchall()]
-
-        return jsonify({
-            "by_department": by_department,
-            "by_subject": by_subject,
-            "by_student": by_student
-        })
+        # Served from the attendance rollups instead of scanning attendance
+        summary = AttendanceRollupService.summary(
+            cursor,
+            request.args.get('start_date'),
+            request.args.get('end_date'),
+            unknown_label='Unknown'
+        )
+        return jsonify(summary)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
         conn.close()
-
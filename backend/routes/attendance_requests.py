@@ -3,14 +3,19 @@ from flask import Blueprint, request, jsonify
 from models.database import get_db_connection
 from datetime import datetime
 from services.notification_service import NotificationService
+from services.outbox import Outbox
+from services.attendance_rollup import AttendanceRollupService
+from services.response_cache import response_cache
+from services.pagination import Page
+from services.identity import identity
+from services.class_resolution import class_resolver
+from services.session import user_id_or_principal
 
 attendance_requests_bp = Blueprint('attendance_requests', __name__)
 
 # Convert students.id → users.id
-def get_student_user_id(student_id, cursor):
-    cursor.execute("SELECT user_id FROM students WHERE id = ?", (student_id,))
-    row = cursor.fetchone()
-    return row["user_id"] if row else None
+def get_student_user_id(student_id, cursor=None):
+    return identity.student_user_id(student_id)
 
 
 # ------------------------------------------------------
@@ -28,23 +33,14 @@ def get_pending_requests():
     
     try:
         # Resolve teacher_profile id (accept user_id or teacher_profile id)
-        cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id,))
-        tp = cursor.fetchone()
-        if tp:
-            teacher_profile_id = tp['id']
-        else:
-            try:
-                # maybe teacher_id is already a profile id
-                tid = int(teacher_id)
-                cursor.execute('SELECT id FROM teacher_profiles WHERE id = ?', (tid,))
-                if cursor.fetchone():
-                    teacher_profile_id = tid
-                else:
-                    conn.close()
-                    return jsonify({'error': 'Teacher profile not found'}), 404
-            except ValueError:
-                conn.close()
-                return jsonify({'error': 'Invalid teacher id'}), 400
+        try:
+            teacher_profile_id = identity.resolve_teacher(teacher_id)
+        except ValueError:
+            conn.close()
+            return jsonify({'error': 'Invalid teacher id'}), 400
+        if teacher_profile_id is None:
+            conn.close()
+            return jsonify({'error': 'Teacher profile not found'}), 404
 
         cursor.execute('''
             SELECT 
@@ -105,44 +101,21 @@ def create_attendance_request():
     try:
         # Resolve class_id from teacher_id + subject if not provided
         if not class_id:
-            # teacher_id from frontend is already the teacher_profiles.id
-            cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id,))
-            tp = cursor.fetchone()
-            if tp:
-                teacher_profile_id = tp['id']
-            else:
-                # fallback: maybe teacher_id already is profile id
-                ...
-
-            if not cursor.fetchone():
+            # teacher_id may be the teacher's user id or teacher_profiles.id
+            try:
+                teacher_profile_id = identity.resolve_teacher(teacher_id)
+            except ValueError:
+                teacher_profile_id = None
+            if teacher_profile_id is None:
                 conn.close()
                 return jsonify({'error': 'Teacher profile not found'}), 404
 
-            # Find class by teacher and subject name
-            cursor.execute('SELECT id FROM classes WHERE teacher_id = ? AND class_name LIKE ? LIMIT 1', (teacher_profile_id, f"%{subject}%"))
-            cls = cursor.fetchone()
-            if cls:
-                class_id = cls['id']
-            else:
-                # If no exact match, try to find any class taught by this teacher with the subject_id
-                cursor.execute('''
-                    SELECT c.id FROM classes c
-                    JOIN subjects s ON c.subject_id = s.id
-                    WHERE c.teacher_id = ? AND s.name LIKE ?
-                    LIMIT 1
-                ''', (teacher_profile_id, f"%{subject}%"))
-                cls = cursor.fetchone()
-                if cls:
-                    class_id = cls['id']
-                else:
-                    # If still no match, get any class for this teacher as a fallback
-                    cursor.execute('SELECT id FROM classes WHERE teacher_id = ? LIMIT 1', (teacher_profile_id,))
-                    cls = cursor.fetchone()
-                    if cls:
-                        class_id = cls['id']
-                    else:
-                        conn.close()
-                        return jsonify({'error': 'No classes found for the selected teacher. Please contact your teacher or administrator'}), 400
+            # Exact teacher/subject lookup, preferring the student's own classes;
+            # any class of the teacher is the last resort
+            class_id = class_resolver.resolve(teacher_profile_id, subject, data['student_id'], fallback=True)
+            if class_id is None:
+                conn.close()
+                return jsonify({'error': 'No classes found for the selected teacher. Please contact your teacher or administrator'}), 400
 
         # Check for duplicate pending request for same student/class/date
         cursor.execute('''
@@ -161,7 +134,6 @@ def create_attendance_request():
                 SET reason = ?, created_at = CURRENT_TIMESTAMP
                 WHERE id = ?
             ''', (data.get('reason', ''), request_id))
-            conn.commit()
         else:
             # Insert new request (store class_id only; subject/department can be derived)
             cursor.execute('''
@@ -174,8 +146,6 @@ def create_attendance_request():
                 data.get('reason', ''),
                 data['request_date']
             ))
-
-            conn.commit()
             request_id = cursor.lastrowid
 
         # Fetch student name
@@ -192,14 +162,13 @@ def create_attendance_request():
         cursor.execute('SELECT COALESCE(s.name, c.class_name) as subject, COALESCE(d.name, "") as department, c.teacher_id FROM classes c LEFT JOIN subjects s ON c.subject_id = s.id LEFT JOIN departments d ON s.department_id = d.id WHERE c.id = ?', (class_id,))
         class_row = cursor.fetchone()
 
-        # Notify teacher of the class
+        # Notify teacher of the class (queued with the request itself)
         if class_row:
-            cursor.execute('SELECT user_id FROM teacher_profiles WHERE id = ?', (class_row['teacher_id'],))
-            teacher_profile = cursor.fetchone()
-            if teacher_profile:
-                NotificationService.notify_attendance_request(
-                    teacher_id=teacher_profile['user_id'],
-                    request_data={
+            teacher_user_id = identity.teacher_user_id(class_row['teacher_id'])
+            if teacher_user_id:
+                Outbox.notify(cursor, *NotificationService.attendance_request_notification(
+                    teacher_user_id,
+                    {
                         "id": request_id,
                         "student_name": student_name,
                         "request_date": data["request_date"],
@@ -207,10 +176,12 @@ def create_attendance_request():
                         "subject": class_row['subject'],
                         "department": class_row['department']
                     }
-                )
+                ))
 
         # Notify all teachers
-        NotificationService.notify_all_teachers(
+        Outbox.notify_role(
+            cursor,
+            'teacher',
             title="New Attendance Request",
             message=f"{student_name} submitted an attendance request for {class_row['subject'] if class_row else 'a class'}.",
             notification_type="attendance_request",
@@ -218,13 +189,18 @@ def create_attendance_request():
         )
 
         # Notify admins
-        NotificationService.notify_admins(
+        Outbox.notify_role(
+            cursor,
+            'admin',
             title="New Attendance Request",
             message=f"{student_name} submitted an attendance request.",
             notification_type="attendance_request",
             related_id=request_id
         )
 
+        conn.commit()
+        response_cache.invalidate_class(cursor, class_id)
+
         return jsonify({'message': 'Request submitted successfully'}), 201
         
     except Exception as e:
@@ -289,9 +265,7 @@ def approve_attendance_request(request_id):
             ''', (req['student_id'], class_id))
         
         # Determine teacher user id for processed_by
-        cursor.execute('SELECT user_id FROM teacher_profiles WHERE id = ?', (class_row['teacher_id'],))
-        teacher_profile = cursor.fetchone()
-        teacher_user_id = teacher_profile['user_id'] if teacher_profile else None
+        teacher_user_id = identity.teacher_user_id(class_row['teacher_id'])
 
         # Mark attendance — append a new attendance record for the approved request
         cursor.execute('''
@@ -299,16 +273,21 @@ def approve_attendance_request(request_id):
             (student_id, class_id, attendance_date, status, marked_by, method, marked_via_request, request_id)
             VALUES (?, ?, ?, 'present', ?, 'attendance_request', TRUE, ?)
         ''', (req['student_id'], class_id, req['request_date'], teacher_user_id, request_id))
+        AttendanceRollupService.record(cursor, req['student_id'], class_id, req['request_date'], 'present')
         
         # Update request
         cursor.execute('''
             UPDATE attendance_requests 
             SET status='approved', responded_at=CURRENT_TIMESTAMP,
                 processed_by_role='teacher', processed_by_user_id=?
-            WHERE id=?
+            WHERE id=? AND status='pending'
         ''', (teacher_user_id, request_id))
+        if cursor.rowcount == 0:
+            # Processed concurrently (e.g. by a batch); undo this attendance
+            conn.rollback()
+            return jsonify({'error': 'Request not found or already processed'}), 409
         
-        conn.commit()
+
         # --------------------------------
         # Notify correct student
         # --------------------------------
@@ -319,7 +298,8 @@ def approve_attendance_request(request_id):
         subj_row = cursor.fetchone()
         subject_name = subj_row['subject_name'] if subj_row else 'the class'
 
-        NotificationService.notify_user(
+        Outbox.notify(
+            cursor,
             user_id=student_user_id,
             title="Attendance Request Approved",
             message=f"Your request for {subject_name} on {req['request_date']} has been approved.",
@@ -327,6 +307,9 @@ def approve_attendance_request(request_id):
             related_id=request_id
         )
 
+        conn.commit()
+        response_cache.invalidate_class(cursor, class_id)
+
         return jsonify({'message': 'Request approved'})
     
     except Exception as e:
@@ -371,9 +354,7 @@ def reject_attendance_request(request_id):
             cursor.execute('SELECT teacher_id FROM classes WHERE id = ?', (class_id,))
             c_row = cursor.fetchone()
             if c_row:
-                cursor.execute('SELECT user_id FROM teacher_profiles WHERE id = ?', (c_row['teacher_id'],))
-                tp = cursor.fetchone()
-                processed_by_user = tp['user_id'] if tp else None
+                processed_by_user = identity.teacher_user_id(c_row['teacher_id'])
 
         # Update request
         cursor.execute('''
@@ -382,10 +363,11 @@ def reject_attendance_request(request_id):
                 responded_at=CURRENT_TIMESTAMP,
                 processed_by_role='teacher',
                 processed_by_user_id=?
-            WHERE id=?
+            WHERE id=? AND status='pending'
         ''', (processed_by_user, request_id))
-        
-        conn.commit()
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return jsonify({'error': 'Request not found or already processed'}), 409
 
         # Ensure this rejection counts as ABSENT in attendance table
         if class_id:
@@ -400,7 +382,7 @@ def reject_attendance_request(request_id):
                 (student_id, class_id, attendance_date, status, marked_by, method)
                 VALUES (?, ?, ?, 'absent', ?, 'attendance_request_rejected')
             """, (req['student_id'], class_id, req['request_date'], processed_by_user))
-            conn.commit()
+            AttendanceRollupService.record(cursor, req['student_id'], class_id, req['request_date'], 'absent')
 
         # --------------------------------
         # Notify correct student
@@ -414,7 +396,8 @@ def reject_attendance_request(request_id):
             subj_row = cursor.fetchone()
             subject_name = subj_row['subject_name'] if subj_row else None
 
-        NotificationService.notify_user(
+        Outbox.notify(
+            cursor,
             user_id=student_user_id,
             title="Attendance Request Rejected",
             message=f"Your attendance request for {subject_name or 'the class'} on {req['request_date']} was rejected.",
@@ -422,6 +405,9 @@ def reject_attendance_request(request_id):
             related_id=request_id
         )
 
+        conn.commit()
+        response_cache.invalidate_class(cursor, class_id)
+
         return jsonify({'message': 'Request rejected'})
     
     except Exception as e:
@@ -431,6 +417,197 @@ def reject_attendance_request(request_id):
         conn.close()
 
 
+# ------------------------------------------------------
+# TEACHER – BATCH APPROVE / REJECT
+# ------------------------------------------------------
+BATCH_LIMIT = 500
+
+
+@attendance_requests_bp.route('/requests/batch', methods=['POST'])
+def batch_process_requests():
+    """Approve or reject many requests in one transaction.
+
+    Body: {"action": "approve" | "reject", "request_ids": [...], "teacher_id"}.
+    teacher_id (or the signed-in teacher) is required; only requests for that
+    teacher's classes are processed and they are recorded as the processor.
+    Requests, their classes and existing attendance are prefetched with one
+    query each. Pending requests are claimed with one conditional UPDATE
+    first, so attendance, enrollment, rollups and student notifications are
+    only written for rows this call moved out of 'pending', even when other
+    approvals run concurrently. Every id gets a result entry.
+    """
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    if action not in ('approve', 'reject'):
+        return jsonify({'error': "action must be 'approve' or 'reject'"}), 400
+
+    request_ids = []
+    for value in data.get('request_ids') or []:
+        try:
+            request_id = int(value)
+        except (TypeError, ValueError):
+            return jsonify({'error': f'Invalid request id: {value}'}), 400
+        if request_id not in request_ids:
+            request_ids.append(request_id)
+    if not request_ids:
+        return jsonify({'error': 'request_ids is required'}), 400
+    if len(request_ids) > BATCH_LIMIT:
+        return jsonify({'error': f'At most {BATCH_LIMIT} requests per batch'}), 400
+
+    teacher_id = user_id_or_principal(data.get('teacher_id'), 'teacher')
+    if not teacher_id:
+        return jsonify({'error': 'teacher_id is required'}), 400
+    try:
+        teacher_profile_id = identity.resolve_teacher(teacher_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid teacher id'}), 400
+    if teacher_profile_id is None:
+        return jsonify({'error': 'Teacher profile not found'}), 404
+    teacher_user_id = identity.teacher_user_id(teacher_profile_id)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        # 1️⃣ Prefetch requests with their class, teacher and subject
+        placeholders = ','.join('?' * len(request_ids))
+        cursor.execute(f'''
+            SELECT
+                ar.id,
+                ar.student_id,
+                ar.class_id,
+                ar.request_date,
+                ar.status,
+                s.user_id AS student_user_id,
+                c.id AS found_class_id,
+                c.teacher_id,
+                COALESCE(subj.name, c.class_name) AS subject_name
+            FROM attendance_requests ar
+            JOIN students s ON ar.student_id = s.id
+            LEFT JOIN classes c ON ar.class_id = c.id
+            LEFT JOIN subjects subj ON c.subject_id = subj.id
+            WHERE ar.id IN ({placeholders})
+        ''', request_ids)
+        requests_by_id = {row['id']: dict(row) for row in cursor.fetchall()}
+
+        # 2️⃣ Decide per request
+        results = {}
+        accepted = []
+        for request_id in request_ids:
+            req = requests_by_id.get(request_id)
+            if not req:
+                results[request_id] = {'id': request_id, 'status': 'error', 'error': 'Request not found'}
+            elif req['status'] != 'pending':
+                results[request_id] = {'id': request_id, 'status': 'error', 'error': 'Request already processed'}
+            elif req['teacher_id'] != teacher_profile_id:
+                results[request_id] = {'id': request_id, 'status': 'error', 'error': 'Request is not for one of your classes'}
+            elif action == 'approve' and not req['class_id']:
+                results[request_id] = {'id': request_id, 'status': 'error',
+                                       'error': 'Request does not reference a class; cannot approve automatically'}
+            elif action == 'approve' and not req['found_class_id']:
+                results[request_id] = {'id': request_id, 'status': 'error', 'error': 'Referenced class not found'}
+            else:
+                accepted.append(req)
+
+        # 3️⃣ Claim the still-pending requests; ones a concurrent approve or
+        # reject got to first are left out of RETURNING and get no writes
+        status = 'approved' if action == 'approve' else 'rejected'
+        claimed = set()
+        if accepted:
+            cursor.execute(f'''
+                UPDATE attendance_requests
+                SET status=?, responded_at=CURRENT_TIMESTAMP,
+                    processed_by_role='teacher', processed_by_user_id=?
+                WHERE id IN ({','.join('?' * len(accepted))}) AND status='pending'
+                RETURNING id
+            ''', [status, teacher_user_id, *(r['id'] for r in accepted)])
+            claimed = {row['id'] for row in cursor.fetchall()}
+        for r in accepted:
+            if r['id'] not in claimed:
+                results[r['id']] = {'id': r['id'], 'status': 'error', 'error': 'Request already processed'}
+        accepted = [r for r in accepted if r['id'] in claimed]
+
+        # 4️⃣ Write attendance and rollups in bulk
+        if action == 'approve':
+            cursor.executemany('''
+                INSERT OR IGNORE INTO enrollment
+                (student_id, class_id, section, semester, academic_year)
+                VALUES (?, ?, 'A', 1, '2024-2025')
+            ''', [(r['student_id'], r['class_id']) for r in accepted])
+            cursor.executemany('''
+                INSERT INTO attendance
+                (student_id, class_id, attendance_date, status, marked_by, method, marked_via_request, request_id)
+                VALUES (?, ?, ?, 'present', ?, 'attendance_request', TRUE, ?)
+            ''', [(r['student_id'], r['class_id'], r['request_date'], teacher_user_id, r['id']) for r in accepted])
+            AttendanceRollupService.record_many(
+                cursor, [(r['student_id'], r['class_id'], r['request_date'], 'present') for r in accepted]
+            )
+        else:
+            # A rejection counts as ABSENT unless the day is already marked
+            marked = set()
+            with_class = [r for r in accepted if r['class_id']]
+            if with_class:
+                keys = ','.join('(?, ?, ?)' for _ in with_class)
+                cursor.execute(f'''
+                    SELECT DISTINCT student_id, class_id, attendance_date FROM attendance
+                    WHERE (student_id, class_id, attendance_date) IN (VALUES {keys})
+                ''', [v for r in with_class for v in (r['student_id'], r['class_id'], r['request_date'])])
+                marked = {(row['student_id'], row['class_id'], row['attendance_date']) for row in cursor.fetchall()}
+
+            absent = []
+            for r in with_class:
+                key = (r['student_id'], r['class_id'], r['request_date'])
+                if key not in marked:
+                    marked.add(key)
+                    absent.append(r)
+            cursor.executemany('''
+                INSERT INTO attendance
+                (student_id, class_id, attendance_date, status, marked_by, method)
+                VALUES (?, ?, ?, 'absent', ?, 'attendance_request_rejected')
+            ''', [(r['student_id'], r['class_id'], r['request_date'], teacher_user_id) for r in absent])
+            AttendanceRollupService.record_many(
+                cursor, [(r['student_id'], r['class_id'], r['request_date'], 'absent') for r in absent]
+            )
+
+        # 5️⃣ Queue student notifications
+        if action == 'approve':
+            notifications = [(
+                r['student_user_id'],
+                "Attendance Request Approved",
+                f"Your request for {r['subject_name'] or 'the class'} on {r['request_date']} has been approved.",
+                "attendance_request",
+                r['id']
+            ) for r in accepted]
+        else:
+            notifications = [(
+                r['student_user_id'],
+                "Attendance Request Rejected",
+                f"Your attendance request for {r['subject_name'] or 'the class'} on {r['request_date']} was rejected.",
+                "attendance_request",
+                r['id']
+            ) for r in accepted]
+        Outbox.notify_many(cursor, notifications)
+
+        conn.commit()
+        response_cache.invalidate_classes(cursor, [r['class_id'] for r in accepted])
+
+        for r in accepted:
+            results[r['id']] = {'id': r['id'], 'status': status}
+        ordered = [results[request_id] for request_id in request_ids]
+        return jsonify({
+            'action': action,
+            'processed': len(accepted),
+            'failed': len(ordered) - len(accepted),
+            'results': ordered
+        })
+
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
+
 
 # ------------------------------------------------------
 # STUDENT – GET THEIR OWN REQUEST HISTORY
@@ -442,15 +619,7 @@ def get_student_requests(student_id):
     
     try:
         # Prefer treating the provided id as a user_id first (avoids numeric collisions)
-        cursor.execute('SELECT id FROM students WHERE user_id = ?', (student_id,))
-        student_row = cursor.fetchone()
-        if student_row:
-            student_id = student_row['id']
-        else:
-            cursor.execute('SELECT id FROM students WHERE id = ?', (student_id,))
-            student_row = cursor.fetchone()
-            if student_row:
-                student_id = student_row['id']
+        student_id = identity.resolve_student(student_id) or student_id
 
         cursor.execute('''
             SELECT 
@@ -598,7 +767,6 @@ def admin_approve_only(request_id):
             WHERE id = ? AND status = 'pending'
         ''', (admin_user_id, request_id))
 
-        conn.commit()
 
         # --------------------------------
         # Notify correct student
@@ -610,7 +778,8 @@ def admin_approve_only(request_id):
         subj_row = cursor.fetchone()
         subject_name = subj_row['subject_name'] if subj_row else 'the class'
 
-        NotificationService.notify_user(
+        Outbox.notify(
+            cursor,
             user_id=student_user_id,
             title="Attendance Request Approved",
             message=f"Your request for {subject_name} on {req['request_date']} has been approved by admin.",
@@ -618,6 +787,9 @@ def admin_approve_only(request_id):
             related_id=request_id
         )
 
+        conn.commit()
+        response_cache.invalidate_class(cursor, req.get('class_id'))
+
         return jsonify({'message': 'Request approved by admin'})
 
     except Exception as e:
@@ -669,8 +841,6 @@ def admin_reject_only(request_id):
             WHERE id = ? AND status = 'pending'
         ''', (admin_user_id, request_id))
 
-        conn.commit()
-
         # Ensure this rejection counts as ABSENT in attendance table
         class_id = req.get('class_id')
         if class_id:
@@ -685,7 +855,7 @@ def admin_reject_only(request_id):
                 (student_id, class_id, attendance_date, status, marked_by, method)
                 VALUES (?, ?, ?, 'absent', ?, 'attendance_request_rejected')
             """, (req['student_id'], class_id, req['request_date'], admin_user_id))
-            conn.commit()
+            AttendanceRollupService.record(cursor, req['student_id'], class_id, req['request_date'], 'absent')
 
         # --------------------------------
         # Notify correct student
@@ -697,7 +867,8 @@ def admin_reject_only(request_id):
         subj_row = cursor.fetchone()
         subject_name = subj_row['subject_name'] if subj_row else 'the class'
 
-        NotificationService.notify_user(
+        Outbox.notify(
+            cursor,
             user_id=student_user_id,
             title="Attendance Request Rejected",
             message=f"Your attendance request for {subject_name} on {req['request_date']} was rejected by admin.",
@@ -705,6 +876,9 @@ def admin_reject_only(request_id):
             related_id=request_id
         )
 
+        conn.commit()
+        response_cache.invalidate_class(cursor, class_id)
+
         return jsonify({'message': 'Request rejected by admin'})
 
     except Exception as e:
@@ -723,6 +897,8 @@ def get_processed_requests():
     role = request.args.get('role')
     teacher_id = request.args.get('teacher_id')
     student_id = request.args.get('student_id')
+    page = Page()
+    order = ['ar.responded_at']
 
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -760,12 +936,12 @@ def get_processed_requests():
         elif role == 'admin':
             pass  # admin sees everything
 
-        query += " ORDER BY ar.responded_at DESC"
+        where, cursor_params = page.filter('attendance_requests', 'ar', order, descending=True)
+        query += where + page.order_by('ar', order, descending=True) + page.limit_clause()
+        params += cursor_params
 
         cursor.execute(query, params)
-        rows = cursor.fetchall()
-
-        return jsonify([dict(row) for row in rows])
+        return page.response(page.rows(cursor.fetchall()))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
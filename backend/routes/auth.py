@@ -1,19 +1,24 @@
 from flask import Blueprint, request, jsonify
 import random
 import string
-from datetime import datetime, timedelta
 import os
 import logging
 from models.users import create_user, get_user_by_credentials, check_email_exists, admin_exists
 from email_service import send_verification_email
+from services.outbox import Outbox
+from services.ttl_store import create_store
+from services.session import current_principal, request_token, sessions
 from models.email_parser import email_parser
-from models.database import get_db_connection, hash_password 
+from models.database import get_db_connection
+from services.passwords import passwords
 
 auth_bp = Blueprint('auth', __name__)
 
 
-# Store verification codes (in production, use database)
-verification_codes = {}
+# Password-reset codes, shared by all workers and swept by TTLSweeper
+verification_codes = create_store('verification_codes')
+CODE_TTL_SECONDS = 600
+MAX_CODE_ATTEMPTS = 3
 
 @auth_bp.route('/forgot-password', methods=['POST'])
 def forgot_password():
@@ -36,30 +41,25 @@ def forgot_password():
             verification_code = ''.join(random.choices(string.digits, k=6))
             
             # Store the code with email and expiry (10 minutes)
-            verification_codes[email] = {
+            verification_codes.set(email, {
                 'code': verification_code,
-                'expires_at': datetime.now() + timedelta(minutes=10),
-                'attempts': 0
-            }
+                'verified': False
+            }, CODE_TTL_SECONDS)
             
             logging.info("Generated verification code: %s for email: %s", verification_code, email)
-            logging.info("Verification codes state: %s", verification_codes)
-            
-            logging.info("Attempting to send verification email to: %s", email)
-
-            # Use the centralized email service (returns True/False)
-            email_sent = send_verification_email(email, verification_code)
-
-            logging.info("Email send result for %s: %s", email, email_sent)
             
-            if not email_sent:
-                logging.error("Failed to send email but email_exists check passed. This shouldn't happen.")
+            # Queue the email; the outbox dispatcher does the SMTP round trip
+            conn = get_db_connection()
+            try:
+                Outbox.enqueue(conn.cursor(), 'verification_email', {
+                    'email': email,
+                    'code': verification_code
+                })
+                conn.commit()
+            finally:
+                conn.close()
 
-            if not email_sent:
-                logging.error("Failed to send verification email to: %s", email)
-                return jsonify({
-                    'error': 'Failed to send verification email. Please try again later.'
-                }), 500
+            logging.info("Verification email queued for: %s", email)
             
         else:
             logging.info("Email %s not found in system, skipping email send", email)
@@ -84,29 +84,29 @@ def verify_code():
         if not all([email, code]):
             return jsonify({'error': 'Email and verification code are required'}), 400
         
-        # Check if we have a code for this email
-        if email not in verification_codes:
+        # Check if we have a live (unexpired) code for this email
+        entry = verification_codes.get(email)
+        if entry is None:
             return jsonify({'error': 'No verification code found for this email. Please request a new one.'}), 400
         
-        code_data = verification_codes[email]
+        code_data, _ = entry
         
-        # Check if code is expired
-        if datetime.now() > code_data['expires_at']:
-            del verification_codes[email]
+        # Count the attempt before checking it, so concurrent guesses on
+        # different workers cannot exceed the limit
+        attempts = verification_codes.incr_attempts(email)
+        if attempts is None:
             return jsonify({'error': 'Verification code has expired. Please request a new one.'}), 400
-        
-        # Check if too many attempts
-        if code_data['attempts'] >= 3:
-            del verification_codes[email]
+        if attempts > MAX_CODE_ATTEMPTS:
+            verification_codes.delete(email)
             return jsonify({'error': 'Too many failed attempts. Please request a new verification code.'}), 400
         
         # Verify the code
         if code != code_data['code']:
-            code_data['attempts'] += 1
             return jsonify({'error': 'Invalid verification code'}), 400
         
         # Code is valid - mark email as verified for reset
-        verification_codes[email]['verified'] = True
+        code_data['verified'] = True
+        verification_codes.update(email, code_data)
         
         return jsonify({
             'message': 'Verification successful. You can now reset your password.',
@@ -127,14 +127,15 @@ def reset_password():
             return jsonify({'error': 'Email and new password are required'}), 400
         
         # Check if email is verified for password reset
-        if email not in verification_codes or not verification_codes[email].get('verified'):
+        entry = verification_codes.get(email)
+        if entry is None or not entry[0].get('verified'):
             return jsonify({'error': 'Please verify your email first before resetting password.'}), 400
         
         # Update password in database
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        hashed_pwd = hash_password(new_password)
+        hashed_pwd = passwords.hash(new_password)
         cursor.execute(
             'UPDATE users SET password_hash = ? WHERE email = ?',
             (hashed_pwd, email)
@@ -145,7 +146,7 @@ def reset_password():
             return jsonify({'error': 'User not found'}), 404
         
         # Remove verification data
-        del verification_codes[email]
+        verification_codes.delete(email)
         
         conn.commit()
         conn.close()
@@ -235,12 +236,30 @@ def login():
         
         return jsonify({
             'message': 'Login successful',
-            'user': user
+            'user': user,
+            'token': sessions.issue(user),
+            'token_expires_in': sessions.max_age_seconds
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@auth_bp.route('/logout', methods=['POST'])
+def logout():
+    """Revoke the session token sent with the request"""
+    token = request_token()
+    if not token or not sessions.revoke(token):
+        return jsonify({'error': 'Valid session token required'}), 401
+    return jsonify({'message': 'Logged out'}), 200
+
+@auth_bp.route('/me', methods=['GET'])
+def me():
+    """Identity carried by the session token"""
+    principal = current_principal()
+    if not principal:
+        return jsonify({'error': 'Valid session token required'}), 401
+    return jsonify({k: v for k, v in principal.items() if k != 'jti'}), 200
+
 @auth_bp.route('/admin/exists', methods=['GET'])
 def check_admin_exists():
     """Check if admin already exists (for frontend)"""
@@ -1,9 +1,31 @@
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from models.database import get_db_connection
 from services.notification_service import NotificationService
+from services.notification_bus import notification_bus
+from services.response_cache import response_cache
+from services.pagination import Page
+from services.identity import identity
+from services.schedule_conflicts import DIMENSIONS, conflict_index
+from services.active_slots import active_slots
+from services.timetables import Timetables
 
 class_schedules_bp = Blueprint('class_schedules', __name__)
 
+# Weekday then start time; the row id breaks ties for keyset paging
+SCHEDULE_ORDER = [
+    """CASE cs.day_of_week
+        WHEN 'Monday' THEN 1
+        WHEN 'Tuesday' THEN 2
+        WHEN 'Wednesday' THEN 3
+        WHEN 'Thursday' THEN 4
+        WHEN 'Friday' THEN 5
+        WHEN 'Saturday' THEN 6
+        WHEN 'Sunday' THEN 7
+    END""",
+    'cs.start_time'
+]
+
 
 @class_schedules_bp.route('/schedules/publish', methods=['POST'])
 def publish_schedule_to_teacher():
@@ -30,7 +52,7 @@ def publish_schedule_to_teacher():
 
         teacher_id = user['id']
 
-        created_notifications = 0
+        notifications = []
         for en in entries:
             # parse time if present (format like 'HH:MM - HH:MM')
             time_str = en.get('time') or ''
@@ -45,25 +67,35 @@ def publish_schedule_to_teacher():
                 'department': en.get('dept') or en.get('department') or ''
             }
 
-            NotificationService.notify_class_scheduled(teacher_id=teacher_id, class_schedule_data=class_schedule_data)
-            created_notifications += 1
+            notifications.append(
+                NotificationService.class_scheduled_notification(teacher_id, class_schedule_data)
+            )
+
+        # One transaction for the whole batch instead of a commit per entry
+        created_notifications = NotificationService.create_notifications(notifications, conn=conn)
+        conn.commit()
+        notification_bus.flush(conn)
 
         return jsonify({'message': f'Published {created_notifications} schedule notifications to teacher'}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
+        notification_bus.discard(conn)
         conn.close()
 
 
 @class_schedules_bp.route('/schedules', methods=['GET'])
 def get_all_schedules():
-    """Get all class schedules"""
+    """Get all class schedules (by weekday and start time, paged)"""
+    page = Page()
+    where, params = page.filter('class_schedules', 'cs', SCHEDULE_ORDER)
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT 
                 cs.id,
                 cs.day_of_week,
@@ -76,29 +108,17 @@ def get_all_schedules():
                 s.name as subject_name,
                 admin.name as created_by_name
             FROM class_schedules cs
-            JOIN users u ON cs.teacher_id = u.id
+            JOIN teacher_profiles tp ON cs.teacher_id = tp.id
+            JOIN users u ON tp.user_id = u.id
             JOIN departments d ON cs.department_id = d.id
             JOIN subjects s ON cs.subject_id = s.id
             JOIN users admin ON cs.created_by = admin.id
-            ORDER BY 
-                CASE cs.day_of_week
-                    WHEN 'Monday' THEN 1
-                    WHEN 'Tuesday' THEN 2
-                    WHEN 'Wednesday' THEN 3
-                    WHEN 'Thursday' THEN 4
-                    WHEN 'Friday' THEN 5
-                    WHEN 'Saturday' THEN 6
-                    WHEN 'Sunday' THEN 7
-                END,
-                cs.start_time
-        ''')
+            WHERE 1 = 1 {where}
+            {page.order_by('cs', SCHEDULE_ORDER)}
+            {page.limit_clause()}
+        ''', params)
         
-        schedules = cursor.fetchall()
-        result = []
-        for schedule in schedules:
-            result.append(dict(schedule))
-        
-        return jsonify(result)
+        return page.response(page.rows(cursor.fetchall()))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -125,24 +145,18 @@ def create_schedule():
         if not teacher or teacher['role'] != 'teacher':
             return jsonify({'error': 'Invalid teacher ID or user is not a teacher'}), 400
         
-        # Check for schedule conflicts
-        cursor.execute('''
-            SELECT id FROM class_schedules 
-            WHERE teacher_id = ? AND day_of_week = ? AND (
-                (start_time <= ? AND end_time > ?) OR
-                (start_time < ? AND end_time >= ?) OR
-                (start_time >= ? AND end_time <= ?)
-            )
-        ''', (
-            data['teacher_id'], data['day_of_week'],
-            data['start_time'], data['start_time'],
-            data['end_time'], data['end_time'],
-            data['start_time'], data['end_time']
-        ))
+        # Schedules store the teacher profile id, as the other schedule writers do
+        slot = dict(data, teacher_id=identity.teacher_profile_id(data['teacher_id']), class_id=None)
+        if slot['teacher_id'] is None:
+            return jsonify({'error': 'Teacher profile not found'}), 400
         
-        conflict = cursor.fetchone()
-        if conflict:
-            return jsonify({'error': 'Schedule conflict: Teacher already has a class at this time'}), 400
+        # Check for teacher / room / class conflicts
+        conflicts = conflict_index.engine().conflicts_for(slot)
+        if conflicts:
+            return jsonify({
+                'error': 'Schedule conflict: Teacher already has a class at this time',
+                'conflicts': conflicts
+            }), 400
         
         # Insert new schedule
         cursor.execute('''
@@ -150,7 +164,7 @@ def create_schedule():
             (teacher_id, department_id, subject_id, day_of_week, start_time, end_time, room_number, created_by)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
-            data['teacher_id'],
+            slot['teacher_id'],
             data['department_id'],
             data['subject_id'],
             data['day_of_week'],
@@ -161,7 +175,9 @@ def create_schedule():
         ))
         
         conn.commit()
+        response_cache.invalidate('schedules')
         schedule_id = cursor.lastrowid
+        conflict_index.add([dict(slot, id=schedule_id)])
         
         # Return the created schedule with details
         cursor.execute('''
@@ -176,7 +192,8 @@ def create_schedule():
                 d.name as department_name,
                 s.name as subject_name
             FROM class_schedules cs
-            JOIN users u ON cs.teacher_id = u.id
+            JOIN teacher_profiles tp ON cs.teacher_id = tp.id
+            JOIN users u ON tp.user_id = u.id
             JOIN departments d ON cs.department_id = d.id
             JOIN subjects s ON cs.subject_id = s.id
             WHERE cs.id = ?
@@ -209,10 +226,42 @@ def update_schedule(schedule_id):
     
     try:
         # Check if schedule exists
-        cursor.execute('SELECT * FROM class_schedules WHERE id = ?', (schedule_id,))
-        if not cursor.fetchone():
+        cursor.execute('''
+            SELECT cs.*, COALESCE(cs.teacher_id, c.teacher_id) AS slot_teacher_id
+            FROM class_schedules cs
+            LEFT JOIN classes c ON cs.class_id = c.id
+            WHERE cs.id = ?
+        ''', (schedule_id,))
+        existing = cursor.fetchone()
+        if not existing:
             return jsonify({'error': 'Schedule not found'}), 404
         
+        # Teachers are given by user id and stored by profile id
+        teacher_id = data.get('teacher_id')
+        if teacher_id is not None:
+            teacher_id = identity.teacher_profile_id(teacher_id)
+            if teacher_id is None:
+                return jsonify({'error': 'Teacher profile not found'}), 400
+        
+        # Check the edited slot against every other schedule
+        slot = {
+            field: existing[field] if data.get(field) is None else data[field]
+            for field in ('day_of_week', 'start_time', 'end_time', 'room_number')
+        }
+        stored_teacher = existing['slot_teacher_id']
+        if teacher_id is None and stored_teacher is not None:
+            # Older rows may hold the teacher's users.id, as in load_schedules
+            slot_teacher = identity.resolve_teacher(stored_teacher, prefer_user=False) or stored_teacher
+        else:
+            slot_teacher = teacher_id
+        slot.update(id=schedule_id, teacher_id=slot_teacher, class_id=existing['class_id'])
+        conflicts = conflict_index.engine().conflicts_for(slot)
+        if conflicts:
+            return jsonify({
+                'error': 'Schedule conflict: Teacher already has a class at this time',
+                'conflicts': conflicts
+            }), 400
+        
         # Update schedule
         cursor.execute('''
             UPDATE class_schedules SET
@@ -225,7 +274,7 @@ def update_schedule(schedule_id):
                 room_number = COALESCE(?, room_number)
             WHERE id = ?
         ''', (
-            data.get('teacher_id'),
+            teacher_id,
             data.get('department_id'),
             data.get('subject_id'),
             data.get('day_of_week'),
@@ -236,6 +285,9 @@ def update_schedule(schedule_id):
         ))
         
         conn.commit()
+        response_cache.invalidate('schedules')
+        # The engine only grows by inserts; reload it with the moved slot
+        conflict_index.invalidate()
         return jsonify({'message': 'Schedule updated successfully'})
         
     except Exception as e:
@@ -255,6 +307,7 @@ def delete_schedule(schedule_id):
     try:
         cursor.execute('DELETE FROM class_schedules WHERE id = ?', (schedule_id,))
         conn.commit()
+        response_cache.invalidate('schedules')
         
         if cursor.rowcount == 0:
             return jsonify({'error': 'Schedule not found'}), 404
@@ -269,45 +322,57 @@ def delete_schedule(schedule_id):
 
 @class_schedules_bp.route('/schedules/teacher/<int:teacher_id>', methods=['GET'])
 def get_teacher_schedule(teacher_id):
-    """Get schedule for a specific teacher"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    """Get schedule for a specific teacher (materialized timetable)"""
     try:
-        cursor.execute('''
-            SELECT 
-                cs.id,
-                cs.day_of_week,
-                cs.start_time,
-                cs.end_time,
-                cs.room_number,
-                d.name as department_name,
-                s.name as subject_name
-            FROM class_schedules cs
-            JOIN departments d ON cs.department_id = d.id
-            JOIN subjects s ON cs.subject_id = s.id
-            WHERE cs.teacher_id = ?
-            ORDER BY 
-                CASE cs.day_of_week
-                    WHEN 'Monday' THEN 1
-                    WHEN 'Tuesday' THEN 2
-                    WHEN 'Wednesday' THEN 3
-                    WHEN 'Thursday' THEN 4
-                    WHEN 'Friday' THEN 5
-                    WHEN 'Saturday' THEN 6
-                    WHEN 'Sunday' THEN 7
-                END,
-                cs.start_time
-        ''', (teacher_id,))
-        
-        schedules = cursor.fetchall()
-        result = [dict(schedule) for schedule in schedules]
-        return jsonify(result)
-        
+        return jsonify(Timetables.get('teacher_slots', teacher_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@class_schedules_bp.route('/conflicts', methods=['GET'])
+def get_schedule_conflicts():
+    """Teacher, room and class double-bookings in the current timetable"""
+    day = request.args.get('day')
+    dimension = request.args.get('dimension')
+    if dimension and dimension not in DIMENSIONS:
+        return jsonify({'error': f"dimension must be one of {', '.join(DIMENSIONS)}"}), 400
+
+    try:
+        conflicts = [
+            c for c in conflict_index.engine().sweep()
+            if (not day or c['day_of_week'] == day) and (not dimension or c['dimension'] == dimension)
+        ]
+        return jsonify({'conflicts': conflicts, 'total': len(conflicts)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@class_schedules_bp.route('/active', methods=['GET'])
+def get_active_slots():
+    """Slot running now in a room (or for a teacher), with its enrolled students.
+
+    Query: room or teacher_id; optional at=ISO datetime instead of now.
+    """
+    room = request.args.get('room')
+    teacher_id = request.args.get('teacher_id')
+    if not room and not teacher_id:
+        return jsonify({'error': 'room or teacher_id is required'}), 400
+
+    at = None
+    if request.args.get('at'):
+        try:
+            at = datetime.fromisoformat(request.args['at'])
+        except ValueError:
+            return jsonify({'error': 'at must be an ISO datetime'}), 400
+
+    try:
+        slots = active_slots.active(room=room, teacher_id=teacher_id, at=at)
+        return jsonify({
+            'active': [
+                {k: v for k, v in slot.items() if k not in ('start_minute', 'end_minute')}
+                for slot in slots
+            ]
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @class_schedules_bp.route('/departments', methods=['GET'])
 def get_departments():
@@ -1,5 +1,8 @@
 from flask import Blueprint, jsonify, request
 from models.database import get_db_connection
+from services.etag import conditional
+from services.response_cache import response_cache
+from services.catalogue import catalogue
 
 departments_bp = Blueprint('departments_bp', __name__)
 
@@ -7,42 +10,13 @@ departments_bp = Blueprint('departments_bp', __name__)
 # 1️⃣ Get all departments + subjects
 # ======================================================
 @departments_bp.route('/', methods=['GET'])
+@conditional('departments', 'subjects')
 def get_departments():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     try:
-        cursor.execute("SELECT id, name, created_at FROM departments ORDER BY name ASC")
-        departments = cursor.fetchall()
-
-        result = []
-
-        for dept in departments:
-            dept_id = dept["id"]
-
-            # Fetch subjects for each department
-            cursor.execute("""
-                SELECT id, name
-                FROM subjects
-                WHERE department_id = ?
-            """, (dept_id,))
-            subjects = cursor.fetchall()
-
-            result.append({
-                "id": dept_id,
-                "name": dept["name"],
-                "created_at": dept["created_at"],
-                "subjects": [dict(s) for s in subjects]
-            })
-
-        return jsonify(result), 200
-
+        return jsonify(catalogue.departments()), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        conn.close()
-
 
 # ======================================================
 # 2️⃣ Add a new department
@@ -66,6 +40,8 @@ def add_department():
 
     cursor.execute("INSERT INTO departments (name) VALUES (?)", (dept_name,))
     conn.commit()
+    catalogue.invalidate()
+    response_cache.invalidate('admin')
     conn.close()
 
     return jsonify({"message": f"Department '{dept_name}' added successfully"}), 201
@@ -99,6 +75,8 @@ def remove_department():
     cursor.execute("DELETE FROM departments WHERE id = ?", (dept_id,))
 
     conn.commit()
+    catalogue.invalidate()
+    response_cache.invalidate('admin')
     conn.close()
 
     return jsonify({"message": f"Department '{dept_name}' removed successfully"}), 200
@@ -136,6 +114,8 @@ def add_subject(dept_name):
     # Insert subject
     cursor.execute("INSERT INTO subjects (name, department_id) VALUES (?, ?)", (subject_name, dept_id))
     conn.commit()
+    catalogue.invalidate()
+    response_cache.invalidate('admin')
     conn.close()
 
     return jsonify({"message": f"Subject '{subject_name}' added to '{dept_name}'"}), 201
@@ -166,6 +146,8 @@ def remove_subject(dept_name):
         return jsonify({"error": "Subject not found for this department"}), 404
 
     conn.commit()
+    catalogue.invalidate()
+    response_cache.invalidate('admin')
     conn.close()
 
     return jsonify({"message": f"Subject '{subject_name}' removed from '{dept_name}'"}), 200
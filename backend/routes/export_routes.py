@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from models.database import get_db_connection
+
+export_bp = Blueprint('export_bp', __name__)
+
+CHUNK_SIZE = 500
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def _filters(date_column):
+    """WHERE fragment for department_id / class_id / start_date / end_date"""
+    clauses = []
+    params = []
+    if request.args.get('department_id'):
+        clauses.append(' AND subj.department_id = ?')
+        params.append(request.args.get('department_id'))
+    if request.args.get('class_id'):
+        clauses.append(' AND c.id = ?')
+        params.append(request.args.get('class_id'))
+    if request.args.get('start_date'):
+        clauses.append(f' AND DATE({date_column}) >= DATE(?)')
+        params.append(request.args.get('start_date'))
+    if request.args.get('end_date'):
+        clauses.append(f' AND DATE({date_column}) <= DATE(?)')
+        params.append(request.args.get('end_date'))
+    return ''.join(clauses), params
+
+
+def _stream(sql, params, fmt):
+    """Run ``sql`` and yield it chunk by chunk as NDJSON lines or CSV"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(columns)
+
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                if fmt == 'csv':
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, row)), default=str))
+                    buffer.write('\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        conn.close()
+
+
+def _export(name, sql, params):
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in FORMATS:
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+
+    response = Response(stream_with_context(_stream(sql, params, fmt)), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    return response
+
+
+# ======================================================
+# 1️⃣ Attendance records
+# ======================================================
+@export_bp.route('/attendance', methods=['GET'])
+def export_attendance():
+    where, params = _filters('a.attendance_date')
+    return _export('attendance', f'''
+        SELECT
+            a.id,
+            a.attendance_date,
+            a.status,
+            a.method,
+            s.enrollment_no,
+            su.name AS student_name,
+            c.id AS class_id,
+            COALESCE(subj.name, c.class_name) AS subject,
+            COALESCE(d.name, '') AS department,
+            tu.name AS teacher_name
+        FROM attendance a
+        JOIN students s ON a.student_id = s.id
+        JOIN users su ON s.user_id = su.id
+        JOIN classes c ON a.class_id = c.id
+        LEFT JOIN subjects subj ON c.subject_id = subj.id
+        LEFT JOIN departments d ON subj.department_id = d.id
+        LEFT JOIN teacher_profiles tp ON c.teacher_id = tp.id
+        LEFT JOIN users tu ON tp.user_id = tu.id
+        WHERE 1 = 1 {where}
+        ORDER BY a.attendance_date, a.id
+    ''', params)
+
+
+# ======================================================
+# 2️⃣ Attendance correction requests
+# ======================================================
+@export_bp.route('/requests', methods=['GET'])
+def export_requests():
+    where, params = _filters('ar.request_date')
+    if request.args.get('status'):
+        where += ' AND ar.status = ?'
+        params.append(request.args.get('status'))
+    return _export('attendance_requests', f'''
+        SELECT
+            ar.id,
+            ar.request_date,
+            ar.status,
+            ar.reason,
+            s.enrollment_no,
+            su.name AS student_name,
+            c.id AS class_id,
+            COALESCE(subj.name, c.class_name) AS subject,
+            COALESCE(d.name, '') AS department,
+            ar.created_at,
+            ar.responded_at,
+            ar.processed_by_role,
+            pu.name AS processed_by_name
+        FROM attendance_requests ar
+        JOIN students s ON ar.student_id = s.id
+        JOIN users su ON s.user_id = su.id
+        JOIN classes c ON ar.class_id = c.id
+        LEFT JOIN subjects subj ON c.subject_id = subj.id
+        LEFT JOIN departments d ON subj.department_id = d.id
+        LEFT JOIN users pu ON ar.processed_by_user_id = pu.id
+        WHERE 1 = 1 {where}
+        ORDER BY ar.request_date, ar.id
+    ''', params)
+
+
+# ======================================================
+# 3️⃣ Per-course summaries (from the daily rollup)
+# ======================================================
+@export_bp.route('/course-summary', methods=['GET'])
+def export_course_summary():
+    where, params = _filters('r.attendance_date')
+    return _export('course_summary', f'''
+        SELECT
+            c.id AS class_id,
+            c.class_name,
+            COALESCE(subj.name, c.class_name) AS subject,
+            COALESCE(d.name, '') AS department,
+            tu.name AS teacher_name,
+            SUM(r.present_count) AS present_count,
+            SUM(r.absent_count) AS absent_count,
+            ROUND(SUM(r.present_count) * 100.0 / NULLIF(SUM(r.present_count + r.absent_count), 0), 1) AS attendance_percent
+        FROM attendance_daily_rollup r
+        JOIN classes c ON r.class_id = c.id
+        LEFT JOIN subjects subj ON c.subject_id = subj.id
+        LEFT JOIN departments d ON subj.department_id = d.id
+        LEFT JOIN teacher_profiles tp ON c.teacher_id = tp.id
+        LEFT JOIN users tu ON tp.user_id = tu.id
+        WHERE 1 = 1 {where}
+        GROUP BY c.id
+        ORDER BY c.id
+    ''', params)
@@ -1,10 +1,16 @@
-from flask import Blueprint, request, jsonify
+import json
+import queue
+from flask import Blueprint, Response, request, jsonify
 from models.database import get_db_connection
+from services.notification_bus import notification_bus
+from services.notification_retention import NotificationRetention
+from services.etag import conditional
 from datetime import datetime
 
 notifications_bp = Blueprint('notifications', __name__)
 
 @notifications_bp.route('/notifications', methods=['GET'])
+@conditional('notifications')
 def get_notifications():
     """Get notifications for a user"""
     user_id = request.args.get('user_id')
@@ -124,30 +130,20 @@ def get_notification_stats():
     cursor = conn.cursor()
     
     try:
-        # Get total unread count
+        # Unread counts by type come from the trigger-maintained counters
         cursor.execute('''
-            SELECT COUNT(*) as unread_count 
-            FROM notifications 
-            WHERE user_id = ? AND is_read = FALSE
+            SELECT type, unread_count
+            FROM notification_unread_counts
+            WHERE user_id = ? AND unread_count > 0
         ''', (user_id,))
-        unread_count = cursor.fetchone()['unread_count']
+        type_stats = {row['type']: row['unread_count'] for row in cursor.fetchall()}
+        unread_count = sum(type_stats.values())
         
-        # Get unread count by type
-        cursor.execute('''
-            SELECT type, COUNT(*) as count
-            FROM notifications 
-            WHERE user_id = ? AND is_read = FALSE
-            GROUP BY type
-        ''', (user_id,))
-        
-        type_counts = cursor.fetchall()
-        type_stats = {item['type']: item['count'] for item in type_counts}
-        
-        # Get today's notifications
+        # Today's notifications (range scan on the (user_id, created_at) index)
         cursor.execute('''
             SELECT COUNT(*) as today_count
             FROM notifications 
-            WHERE user_id = ? AND DATE(created_at) = DATE('now')
+            WHERE user_id = ? AND created_at >= DATE('now')
         ''', (user_id,))
         today_count = cursor.fetchone()['today_count']
         
@@ -181,4 +177,92 @@ def delete_notification(notification_id):
         conn.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+@notifications_bp.route('/notifications/archive', methods=['GET'])
+def get_archived_notifications():
+    """Archived (old, read) notifications for a user, newest first"""
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+
+    try:
+        return jsonify(NotificationRetention.archived(user_id, request.args.get('limit', 100, type=int)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Replayed rows per reconnect; older gaps are picked up by the list endpoint
+REPLAY_LIMIT = 200
+
+
+def _sse(event):
+    return f"id: {event['id']}\nevent: notification\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@notifications_bp.route('/notifications/stream', methods=['GET'])
+def stream_notifications():
+    """Server-sent events push channel for a user's new notifications.
+
+    Resumes after ``Last-Event-ID`` (header, or ``last_event_id`` query param
+    for the first EventSource connection) by replaying newer rows once from
+    the database; afterwards events come from the in-process bus only.
+    """
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+
+    # Subscribe before replaying so nothing published in between is lost
+    sub = notification_bus.subscribe(user_id)
+    if sub is None:
+        return jsonify({'error': 'Too many notification streams open'}), 429
+
+    def generate():
+        sent_id = last_id or 0
+        try:
+            yield 'retry: 5000\n\n'
+
+            if last_id is not None:
+                conn = get_db_connection()
+                try:
+                    rows = conn.execute('''
+                        SELECT id, user_id, title, message, type, related_id, is_read, created_at
+                        FROM notifications
+                        WHERE user_id = ? AND id > ?
+                        ORDER BY id
+                        LIMIT ?
+                    ''', (user_id, last_id, REPLAY_LIMIT)).fetchall()
+                finally:
+                    conn.close()
+                for row in rows:
+                    sent_id = row['id']
+                    yield _sse(dict(row))
+
+            while True:
+                try:
+                    event = sub.events.get(timeout=notification_bus.heartbeat_seconds)
+                except queue.Empty:
+                    if sub.overflowed:
+                        break
+                    yield ': keep-alive\n\n'
+                    continue
+                if event['id'] <= sent_id:
+                    continue
+                sent_id = event['id']
+                yield _sse(event)
+        finally:
+            notification_bus.unsubscribe(sub)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    # Also covers clients that disconnect before the generator first runs
+    response.call_on_close(lambda: notification_bus.unsubscribe(sub))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,17 +1,25 @@
 # routes/student_attendance_routes.py
 from flask import Blueprint, request, jsonify
 from models.database import get_db_connection
+from services.etag import conditional
+from services.pagination import Page
+from services.identity import identity
+from services.class_resolution import class_resolver
 
 student_attendance_bp = Blueprint('student_attendance', __name__)
 
 @student_attendance_bp.route('/attendance/student/<int:student_id>', methods=['GET'])
+@conditional('attendance', 'classes', 'subjects', 'departments', 'teacher_profiles', 'users')
 def get_student_attendance(student_id):
-    """Get attendance records for a specific student"""
+    """Get attendance records for a specific student (newest first, paged)"""
+    page = Page()
+    where, params = page.filter('attendance', 'a', ['a.attendance_date'], descending=True)
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT 
                 a.id,
                 a.student_id,
@@ -32,16 +40,16 @@ def get_student_attendance(student_id):
             LEFT JOIN departments d ON subj.department_id = d.id
             LEFT JOIN teacher_profiles tp ON c.teacher_id = tp.id
             LEFT JOIN users tu ON tp.user_id = tu.id
-            WHERE a.student_id = ?
-            ORDER BY a.attendance_date DESC
-        ''', (student_id,))
+            WHERE a.student_id = ? {where}
+            {page.order_by('a', ['a.attendance_date'], descending=True)}
+            {page.limit_clause()}
+        ''', [student_id] + params)
         
-        attendance_records = cursor.fetchall()
-        result = [dict(record) for record in attendance_records]
+        result = page.rows(cursor.fetchall())
         
         conn.close()
         
-        return jsonify({
+        return page.response({
             'success': True,
             'attendances': result,
             'count': len(result)
@@ -70,8 +78,7 @@ def create_attendance_request():
         cursor = conn.cursor()
 
         # Ensure student exists
-        cursor.execute('SELECT id FROM students WHERE id = ?', (data['student_id'],))
-        if not cursor.fetchone():
+        if identity.student_user_id(data['student_id']) is None:
             conn.close()
             return jsonify({'success': False, 'error': 'Student not found'}), 404
 
@@ -85,28 +92,17 @@ def create_attendance_request():
                 return jsonify({'success': False, 'error': 'Either class_id or (teacher_id and subject) must be provided'}), 400
 
             # Resolve teacher_profile id (accept user_id or profile id)
-            cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id,))
-            tp = cursor.fetchone()
-            if tp:
-                teacher_profile_id = tp['id']
-            else:
-                try:
-                    candidate = int(teacher_id)
-                    cursor.execute('SELECT id FROM teacher_profiles WHERE id = ?', (candidate,))
-                    if cursor.fetchone():
-                        teacher_profile_id = candidate
-                    else:
-                        conn.close()
-                        return jsonify({'success': False, 'error': 'Teacher profile not found'}), 404
-                except ValueError:
-                    conn.close()
-                    return jsonify({'success': False, 'error': 'Invalid teacher id'}), 400
+            try:
+                teacher_profile_id = identity.resolve_teacher(teacher_id)
+            except ValueError:
+                conn.close()
+                return jsonify({'success': False, 'error': 'Invalid teacher id'}), 400
+            if teacher_profile_id is None:
+                conn.close()
+                return jsonify({'success': False, 'error': 'Teacher profile not found'}), 404
 
-            cursor.execute('SELECT id FROM classes WHERE teacher_id = ? AND class_name LIKE ? LIMIT 1', (teacher_profile_id, f"%{subject}%"))
-            cls = cursor.fetchone()
-            if cls:
-                class_id = cls['id']
-            else:
+            class_id = class_resolver.resolve(teacher_profile_id, subject, data['student_id'])
+            if class_id is None:
                 conn.close()
                 return jsonify({'success': False, 'error': 'Class not found for given teacher and subject; please select class directly'}), 400
 
@@ -152,13 +148,12 @@ def create_attendance_request():
 
         # Notify teacher
         if class_row:
-            cursor.execute('SELECT user_id FROM teacher_profiles WHERE id = ?', (class_row['teacher_id'],))
-            teacher_profile = cursor.fetchone()
-            if teacher_profile:
+            teacher_user_id = identity.teacher_user_id(class_row['teacher_id'])
+            if teacher_user_id:
                 try:
                     from services.notification_service import NotificationService
                     NotificationService.notify_attendance_request(
-                        teacher_id=teacher_profile['user_id'],
+                        teacher_id=teacher_user_id,
                         request_data={
                             "id": request_id,
                             "student_name": student_name,
@@ -198,13 +193,7 @@ def get_student_attendance_requests(student_id):
     
     try:
         # If the provided id doesn't match a student.id, try treating it as a user_id
-        cursor.execute('SELECT id FROM students WHERE id = ?', (student_id,))
-        student_row = cursor.fetchone()
-        if not student_row:
-            cursor.execute('SELECT id FROM students WHERE user_id = ?', (student_id,))
-            student_row = cursor.fetchone()
-            if student_row:
-                student_id = student_row['id']
+        student_id = identity.resolve_student(student_id, prefer_user=False) or student_id
 
         cursor.execute('''
             SELECT 
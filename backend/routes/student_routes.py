@@ -1,82 +1,122 @@
+import json
 from flask import Blueprint, request, jsonify
 from models.database import get_db_connection
+from services.identity import identity
+from services.timetables import Timetables
+from services.etag import conditional
+from services.catalogue import catalogue
+from config import Config
 
 student_bp = Blueprint('student', __name__)
 
 # --------------------------------------------------------
-# 1️⃣ STUDENT DASHBOARD (PROFILE + ATTENDANCE + REQUESTS)
+# 1️⃣ STUDENT DASHBOARD (PROFILE + ATTENDANCE + REQUESTS + CLASSES)
 # --------------------------------------------------------
 @student_bp.route('/dashboard/<int:user_id>', methods=['GET'])
+@conditional('users', 'students', 'attendance', 'attendance_requests', 'enrollment', 'classes', 'subjects', 'departments')
 def dashboard(user_id):
+    """Profile, per-subject attendance with percentages, requests and classes.
+
+    Everything is assembled by one statement (CTEs folded into a JSON
+    document), so the page needs a single round trip instead of one query
+    per section plus a percentage request per subject.
+    """
     conn = get_db_connection()
     cur = conn.cursor()
 
-    # ---- Student Profile ----
-    cur.execute("""
-        SELECT u.id as user_id, u.name, u.email,
-               s.id as student_id, s.enrollment_no, s.course, s.semester
-        FROM users u
-        JOIN students s ON u.id = s.user_id
-        WHERE u.id = ?
-    """, (user_id,))
-    profile = cur.fetchone()
+    try:
+        cur.execute("""
+            WITH me AS (
+                SELECT u.id AS user_id, u.name, u.email,
+                       s.id AS student_id, s.enrollment_no, s.course, s.semester
+                FROM users u
+                JOIN students s ON u.id = s.user_id
+                WHERE u.id = ?
+            ),
+            subject_stats AS (
+                SELECT
+                    COALESCE(subj.name, c.class_name) AS subject,
+                    COUNT(*) AS total_classes,
+                    SUM(CASE WHEN a.status='present' THEN 1 ELSE 0 END) AS present_classes
+                FROM attendance a
+                JOIN me ON a.student_id = me.student_id
+                JOIN classes c ON a.class_id = c.id
+                LEFT JOIN subjects subj ON c.subject_id = subj.id
+                GROUP BY subject
+            ),
+            requests AS (
+                SELECT
+                    ar.id,
+                    COALESCE(subj.name, c.class_name) AS subject,
+                    COALESCE(d.name, '') AS department,
+                    ar.request_date, ar.reason, ar.status, ar.created_at
+                FROM attendance_requests ar
+                JOIN me ON ar.student_id = me.student_id
+                LEFT JOIN classes c ON ar.class_id = c.id
+                LEFT JOIN subjects subj ON c.subject_id = subj.id
+                LEFT JOIN departments d ON subj.department_id = d.id
+                ORDER BY ar.created_at DESC
+            ),
+            enrolled AS (
+                SELECT e.class_id,
+                       c.teacher_id,
+                       COALESCE(s1.name, s2.name, c.class_name) AS subject,
+                       COALESCE(d.name, '') AS department
+                FROM enrollment e
+                JOIN me ON e.student_id = me.student_id
+                JOIN classes c ON e.class_id = c.id
+                LEFT JOIN subjects s1 ON e.subject_id = s1.id
+                LEFT JOIN subjects s2 ON c.subject_id = s2.id
+                LEFT JOIN departments d ON COALESCE(s1.department_id, s2.department_id) = d.id
+            )
+            SELECT json_object(
+                'profile', json_object(
+                    'user_id', me.user_id, 'name', me.name, 'email', me.email,
+                    'student_id', me.student_id, 'enrollment_no', me.enrollment_no,
+                    'course', me.course, 'semester', me.semester
+                ),
+                'attendance_summary', (
+                    SELECT json_group_array(json_object(
+                        'subject', subject,
+                        'total_classes', total_classes,
+                        'present_classes', present_classes,
+                        'percentage', ROUND(present_classes * 100.0 / total_classes, 1)
+                    )) FROM subject_stats
+                ),
+                'overall', (
+                    SELECT json_object(
+                        'total_classes', COALESCE(SUM(total_classes), 0),
+                        'present_classes', COALESCE(SUM(present_classes), 0),
+                        'percentage', COALESCE(ROUND(SUM(present_classes) * 100.0 / SUM(total_classes), 1), 0)
+                    ) FROM subject_stats
+                ),
+                'leave_requests', (SELECT json_group_array(json_object(
+                    'id', id, 'subject', subject, 'department', department,
+                    'request_date', request_date, 'reason', reason,
+                    'status', status, 'created_at', created_at
+                )) FROM requests),
+                'classes', (SELECT json_group_array(json_object(
+                    'class_id', class_id, 'teacher_id', teacher_id,
+                    'subject', subject, 'department', department
+                )) FROM enrolled)
+            ) AS document
+            FROM me
+        """, (user_id,))
+        row = cur.fetchone()
+    finally:
+        conn.close()
 
-    if not profile:
+    if not row:
         return jsonify({"error": "Student not found"}), 404
 
-    # ---- Attendance Summary (by subject, derived from classes) ----
-    cur.execute("""
-        SELECT
-            COALESCE(subj.name, c.class_name) AS subject,
-            COUNT(*) AS total_classes,
-            SUM(CASE WHEN a.status='present' THEN 1 ELSE 0 END) AS present_classes
-        FROM attendance a
-        JOIN classes c ON a.class_id = c.id
-        LEFT JOIN subjects subj ON c.subject_id = subj.id
-        WHERE a.student_id = ?
-        GROUP BY subject
-    """, (profile["student_id"],))
-    attendance_summary = [dict(r) for r in cur.fetchall()]
-
-    # ---- Leave / Attendance Requests (derive subject & department) ----
-    cur.execute("""
-        SELECT
-            ar.id,
-            COALESCE(subj.name, c.class_name) AS subject,
-            COALESCE(d.name, '') AS department,
-            ar.request_date, ar.reason, ar.status, ar.created_at
-        FROM attendance_requests ar
-        LEFT JOIN classes c ON ar.class_id = c.id
-        LEFT JOIN subjects subj ON c.subject_id = subj.id
-        LEFT JOIN departments d ON subj.department_id = d.id
-        WHERE ar.student_id = ?
-        ORDER BY ar.created_at DESC
-    """, (profile["student_id"],))
-    leave_requests = [dict(r) for r in cur.fetchall()]
-
-    # ---- Enrolled Classes ----
-    cur.execute("""
-        SELECT e.class_id,
-               c.teacher_id,
-               COALESCE(s1.name, s2.name, c.class_name) AS subject,
-               COALESCE(d.name, '') AS department
-        FROM enrollment e
-        JOIN classes c ON e.class_id = c.id
-        LEFT JOIN subjects s1 ON e.subject_id = s1.id
-        LEFT JOIN subjects s2 ON c.subject_id = s2.id
-        LEFT JOIN departments d ON COALESCE(s1.department_id, s2.department_id) = d.id
-        WHERE e.student_id = ?
-    """, (profile["student_id"],))
-    classes = [dict(r) for r in cur.fetchall()]
-
-    conn.close()
-
-    return jsonify({
-        "profile": dict(profile),
-        "attendance_summary": attendance_summary,
-        "leave_requests": leave_requests,
-        "classes": classes
-    })
+    data = json.loads(row["document"])
+    threshold = Config.LOW_ATTENDANCE_THRESHOLD
+    for subject in data["attendance_summary"]:
+        subject["low_attendance"] = subject["percentage"] < threshold
+    data["low_attendance"] = data["overall"]["total_classes"] > 0 and data["overall"]["percentage"] < threshold
+    data["low_attendance_subjects"] = [s["subject"] for s in data["attendance_summary"] if s["low_attendance"]]
+    data["low_attendance_threshold"] = threshold
+    return jsonify(data)
 
 
 # --------------------------------------------------------
@@ -129,33 +169,28 @@ def enrolled_classes(user_id):
     return jsonify({"classes": classes})
 
 
+# --------------------------------------------------------
+# 3️⃣b WEEKLY TIMETABLE (materialized per student)
+# --------------------------------------------------------
+@student_bp.route('/timetable/<int:user_id>', methods=['GET'])
+def timetable(user_id):
+    student_id = identity.student_id(user_id)
+    if student_id is None:
+        return jsonify({"error": "Student not found"}), 404
+    return jsonify(Timetables.get('student_week', student_id))
+
+
 # --------------------------------------------------------
 # 4️⃣ ALL DEPARTMENTS AND SUBJECTS (for form dropdowns)
 # --------------------------------------------------------
 @student_bp.route('/departments-subjects', methods=['GET'])
 def get_departments_subjects():
     """Get all departments and their subjects for attendance request form"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Get all departments with their subjects
-    cur.execute("""
-        SELECT d.id, d.name as department, 
-               GROUP_CONCAT(s.name, ', ') as subjects
-        FROM departments d
-        LEFT JOIN subjects s ON d.id = s.department_id
-        GROUP BY d.id, d.name
-        ORDER BY d.name
-    """)
-    
-    departments = []
-    for row in cur.fetchall():
-        dept_dict = dict(row)
-        # Convert comma-separated subjects back to a list
-        dept_dict['subjects'] = [s.strip() for s in dept_dict['subjects'].split(', ')] if dept_dict['subjects'] else []
-        departments.append(dept_dict)
-    
-    conn.close()
+    departments = [{
+        "id": d["id"],
+        "department": d["name"],
+        "subjects": [s["name"] for s in d["subjects"]]
+    } for d in catalogue.departments()]
     return jsonify({"departments": departments})
 @student_bp.route('/profile/<int:user_id>', methods=['GET'])
 def get_student_profile(user_id):
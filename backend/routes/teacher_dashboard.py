@@ -1,16 +1,22 @@
 from flask import Blueprint, request, jsonify
 from models.database import get_db_connection
+from services.attendance_rollup import AttendanceRollupService
+from services.response_cache import response_cache, teacher_tags
+from services.identity import identity
+from services.session import teacher_profile_for, user_id_or_principal
+from services.timetables import Timetables
 import sqlite3
 from datetime import datetime
 
 teacher_dashboard_bp = Blueprint('teacher_dashboard', __name__)
 
 @teacher_dashboard_bp.route('/my-courses', methods=['GET'])
+@response_cache.cached(teacher_tags)
 def get_teacher_courses():
     """Get all courses for a teacher with proper course and subject info"""
     try:
         # Get teacher ID from query parameter
-        teacher_id = request.args.get('teacher_id')
+        teacher_id = user_id_or_principal(request.args.get('teacher_id'), 'teacher')
         
         if not teacher_id:
             return jsonify({'error': 'Teacher ID is required'}), 400
@@ -19,15 +25,12 @@ def get_teacher_courses():
         cursor = conn.cursor()
         
         # Get teacher profile ID from user ID
-        cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id,))
-        teacher_profile = cursor.fetchone()
+        teacher_profile_id = teacher_profile_for(teacher_id)
         
-        if not teacher_profile:
+        if teacher_profile_id is None:
             conn.close()
             return jsonify({'error': 'Teacher profile not found'}), 404
         
-        teacher_profile_id = teacher_profile['id']
-        
         # Get classes assigned to this teacher with proper course and subject information
         cursor.execute('''
             SELECT 
@@ -96,10 +99,11 @@ def get_teacher_courses():
         return jsonify({'error': str(e)}), 500
 
 @teacher_dashboard_bp.route('/stats', methods=['GET'])
+@response_cache.cached(teacher_tags)
 def get_teacher_stats():
     """Get teacher dashboard statistics"""
     try:
-        teacher_id = request.args.get('teacher_id')
+        teacher_id = user_id_or_principal(request.args.get('teacher_id'), 'teacher')
         
         if not teacher_id:
             return jsonify({'error': 'Teacher ID is required'}), 400
@@ -108,15 +112,12 @@ def get_teacher_stats():
         cursor = conn.cursor()
         
         # Get teacher profile ID
-        cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id,))
-        teacher_profile = cursor.fetchone()
+        teacher_profile_id = teacher_profile_for(teacher_id)
         
-        if not teacher_profile:
+        if teacher_profile_id is None:
             conn.close()
             return jsonify({'error': 'Teacher profile not found'}), 404
         
-        teacher_profile_id = teacher_profile['id']
-        
         # Get total courses count
         cursor.execute('SELECT COUNT(*) as course_count FROM classes WHERE teacher_id = ?', (teacher_profile_id,))
         course_count = cursor.fetchone()['course_count']
@@ -380,7 +381,7 @@ def mark_attendance():
         class_id = data.get('class_id')
         attendance_date = data.get('date')
         attendance_data = data.get('attendance')  # List of {student_id, status}
-        marked_by = data.get('teacher_id')  # Teacher user ID from request
+        marked_by = user_id_or_principal(data.get('teacher_id'), 'teacher')  # Teacher user ID from request or session
         
         print(f"Marking attendance - Class: {class_id}, Date: {attendance_date}, Records: {len(attendance_data)}")
         
@@ -391,17 +392,15 @@ def mark_attendance():
         cursor = conn.cursor()
         
         # Get teacher profile ID (if exists) and ensure we use the teacher's user ID
-        cursor.execute('SELECT id, user_id FROM teacher_profiles WHERE user_id = ?', (marked_by,))
-        teacher_profile = cursor.fetchone()
+        teacher_profile_id = teacher_profile_for(marked_by)
 
-        if not teacher_profile:
+        if teacher_profile_id is None:
             # If no teacher profile exists, still allow marking using the teacher user ID
             teacher_profile_id = None
             teacher_user_id = marked_by
             print(f"No teacher profile found for user_id: {marked_by}")
         else:
-            teacher_profile_id = teacher_profile['id']
-            teacher_user_id = teacher_profile['user_id']
+            teacher_user_id = identity.teacher_user_id(teacher_profile_id)
             print(f"Teacher profile found: {teacher_profile_id}")
         
         # Get class details with course and subject info
@@ -456,10 +455,7 @@ def mark_attendance():
             
             try:
                 # Check if student exists
-                cursor.execute('SELECT id FROM students WHERE id = ?', (student_id,))
-                student = cursor.fetchone()
-                
-                if not student:
+                if identity.student_user_id(student_id) is None:
                     errors.append(f"Student not found: {student_id}")
                     continue
                 
@@ -469,6 +465,7 @@ def mark_attendance():
                     (student_id, class_id, attendance_date, status, marked_by, method)
                     VALUES (?, ?, ?, ?, ?, ?)
                 ''', (student_id, class_id, attendance_date, status, teacher_user_id, method))
+                AttendanceRollupService.record(cursor, student_id, class_id, attendance_date, status)
                 print(f"Appended attendance record for student {student_id}")
 
                 success_count += 1
@@ -508,6 +505,7 @@ def mark_attendance():
                         (student_id, class_id, attendance_date, status, marked_by, method)
                         VALUES (?, ?, ?, ?, ?, ?)
                     ''', (sid, class_id, attendance_date, 'absent', teacher_user_id, 'manual'))
+                    AttendanceRollupService.record(cursor, sid, class_id, attendance_date, 'absent')
             # Include absent_count in response
             if absent_count > 0:
                 response_absent_msg = f' and marked {absent_count} student(s) absent'
@@ -518,6 +516,7 @@ def mark_attendance():
             print(f"Error while marking absentees: {str(e)}")
 
         conn.commit()
+        response_cache.invalidate_class(cursor, class_id)
         conn.close()
         
         response = {
@@ -656,102 +655,22 @@ def get_attendance_summary(class_id):
 # ... (Keep the rest of the functions the same: get_weekly_schedule, get_pending_requests, update_request_status, get_pending_requests_count)
 
 @teacher_dashboard_bp.route('/weekly-schedule', methods=['GET'])
+@response_cache.cached(lambda: teacher_tags() + ['schedules'])
 def get_weekly_schedule():
-    """Get weekly schedule for the teacher"""
+    """Get weekly schedule for the teacher (materialized timetable)"""
     try:
-        teacher_id = request.args.get('teacher_id')
+        teacher_id = user_id_or_principal(request.args.get('teacher_id'), 'teacher')
         
         if not teacher_id:
             return jsonify({'error': 'Teacher ID is required'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Get teacher profile ID
-        cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id,))
-        teacher_profile = cursor.fetchone()
+        teacher_profile_id = teacher_profile_for(teacher_id)
         
-        if not teacher_profile:
-            conn.close()
+        if teacher_profile_id is None:
             return jsonify({'error': 'Teacher profile not found'}), 404
         
-        teacher_profile_id = teacher_profile['id']
-        
-        # Get weekly schedule
-        cursor.execute('''
-            SELECT 
-                cs.day_of_week as day,
-                cs.start_time,
-                cs.end_time,
-                COALESCE(c.room, 'TBA') as room,
-                COALESCE(s.name, '') as subject,
-                COALESCE(d.name, '') as department
-            FROM class_schedules cs
-            JOIN classes c ON cs.class_id = c.id
-            LEFT JOIN subjects s ON c.subject_id = s.id
-            LEFT JOIN departments d ON s.department_id = d.id
-            WHERE c.teacher_id = ?
-            ORDER BY 
-                CASE cs.day_of_week
-                    WHEN 'Monday' THEN 1
-                    WHEN 'Tuesday' THEN 2
-                    WHEN 'Wednesday' THEN 3
-                    WHEN 'Thursday' THEN 4
-                    WHEN 'Friday' THEN 5
-                    WHEN 'Saturday' THEN 6
-                    WHEN 'Sunday' THEN 7
-                END,
-                cs.start_time
-        ''', (teacher_profile_id,))
-        
-        schedules = cursor.fetchall()
-        
-        # Format schedule data for frontend
-        formatted_schedule = []
-        for schedule in schedules:
-            formatted_schedule.append({
-                'id': f"schedule_{schedule['day']}_{schedule['start_time']}",
-                'day': schedule['day'],
-                'time': f"{schedule['start_time']} - {schedule['end_time']}",
-                'subject': schedule['subject'],
-                'room': schedule['room'],
-                'department': schedule['department'],
-                'dept': schedule['department']  # Add dept alias for consistency
-            })
-        
-        # Also get classes without specific schedules
-        cursor.execute('''
-            SELECT 
-                c.id as id,
-                c.class_name as subject,
-                COALESCE(c.room, 'TBA') as room
-            FROM classes c
-            WHERE c.teacher_id = ?
-            AND NOT EXISTS (
-                SELECT 1 FROM class_schedules cs 
-                WHERE cs.class_id = c.id
-            )
-        ''', (teacher_profile_id,))
-        
-        unscheduled_classes = cursor.fetchall()
-        
-        for cls in unscheduled_classes:
-            formatted_schedule.append({
-                'id': f"class_{cls['id']}",
-                'day': 'Not Scheduled',
-                'time': 'TBA',
-                'subject': cls['subject'],
-                'room': cls['room'],
-                'department': 'Computer Science',
-                'dept': 'Computer Science'
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'schedule': formatted_schedule,
-            'count': len(formatted_schedule)
-        }), 200
+        return jsonify(Timetables.get('teacher_week', teacher_profile_id)), 200
         
     except Exception as e:
         print(f"Error in get_weekly_schedule: {str(e)}")
@@ -761,7 +680,7 @@ def get_weekly_schedule():
 def get_pending_requests():
     """Get pending attendance requests for the teacher"""
     try:
-        teacher_id = request.args.get('teacher_id')
+        teacher_id = user_id_or_principal(request.args.get('teacher_id'), 'teacher')
         
         if not teacher_id:
             return jsonify({'error': 'Teacher ID is required'}), 400
@@ -770,15 +689,12 @@ def get_pending_requests():
         cursor = conn.cursor()
         
         # Get teacher profile ID
-        cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id,))
-        teacher_profile = cursor.fetchone()
+        teacher_profile_id = teacher_profile_for(teacher_id)
         
-        if not teacher_profile:
+        if teacher_profile_id is None:
             conn.close()
             return jsonify({'error': 'Teacher profile not found'}), 404
         
-        teacher_profile_id = teacher_profile['id']
-        
         # Get pending attendance requests (join with classes to find teacher)
         cursor.execute('''
             SELECT 
@@ -837,7 +753,7 @@ def update_request_status():
         
         request_id = data.get('request_id')
         status = data.get('status')  # 'approved' or 'rejected'
-        teacher_id = data.get('teacher_id')  # Teacher user ID
+        teacher_id = user_id_or_principal(data.get('teacher_id'), 'teacher')  # Teacher user ID
         
         if not all([request_id, status, teacher_id]) or status not in ['approved', 'rejected']:
             return jsonify({'error': 'Invalid request data'}), 400
@@ -846,15 +762,12 @@ def update_request_status():
         cursor = conn.cursor()
         
         # Get teacher profile ID
-        cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id,))
-        teacher_profile = cursor.fetchone()
+        teacher_profile_id = teacher_profile_for(teacher_id)
         
-        if not teacher_profile:
+        if teacher_profile_id is None:
             conn.close()
             return jsonify({'error': 'Teacher profile not found'}), 404
         
-        teacher_profile_id = teacher_profile['id']
-        
         # Verify the request belongs to this teacher (attendance_requests links to class)
         cursor.execute('''
             SELECT ar.id
@@ -877,6 +790,7 @@ def update_request_status():
         
         conn.commit()
         conn.close()
+        response_cache.invalidate(f'teacher:{teacher_id}')
         
         return jsonify({
             'message': f'Request {status} successfully'
@@ -887,9 +801,10 @@ def update_request_status():
         return jsonify({'error': str(e)}), 500
 
 @teacher_dashboard_bp.route('/pending-requests-count', methods=['GET'])
+@response_cache.cached(teacher_tags)
 def get_pending_requests_count():
     """Get count of pending attendance requests for teacher dashboard"""
-    teacher_id = request.args.get('teacher_id')
+    teacher_id = user_id_or_principal(request.args.get('teacher_id'), 'teacher')
     
     if not teacher_id:
         return jsonify({'error': 'Teacher ID is required'}), 400
@@ -899,15 +814,12 @@ def get_pending_requests_count():
     
     try:
         # Get teacher profile ID
-        cursor.execute('SELECT id FROM teacher_profiles WHERE user_id = ?', (teacher_id,))
-        teacher_profile = cursor.fetchone()
+        teacher_profile_id = teacher_profile_for(teacher_id)
         
-        if not teacher_profile:
+        if teacher_profile_id is None:
             conn.close()
             return jsonify({'error': 'Teacher profile not found'}), 404
         
-        teacher_profile_id = teacher_profile['id']
-        
         # Get count of pending requests (join with classes to find teacher)
         cursor.execute('''
             SELECT COUNT(*) as pending_count 
@@ -6,6 +6,9 @@ import string
 import base64
 import os
 from datetime import datetime
+from services.response_cache import response_cache
+from services.identity import identity
+from services.catalogue import catalogue
 
 teacher_profiles_bp = Blueprint('teacher_profiles', __name__)
 
@@ -305,6 +308,10 @@ def save_teacher_profile():
             print(f"Insert query executed, new profile ID: {profile_id}")
         
         conn.commit()
+        response_cache.invalidate('admin')
+        catalogue.invalidate()
+        if action == "created":
+            identity.invalidate()
         print(f"Profile {action} successfully for user_id: {user_id}, profile_id: {profile_id}")
         
         response_data = {
@@ -370,6 +377,7 @@ def update_profile_photo():
         ''', (processed_photo, user_id))
         
         conn.commit()
+        response_cache.invalidate('admin')
         
         return jsonify({
             'message': 'Profile photo updated successfully',
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from models.database import get_db_connection
 from services.notification_service import NotificationService
+from services.catalogue import catalogue
 from datetime import datetime
 
 teacher_subjects_bp = Blueprint('teacher_subjects', __name__)
@@ -70,6 +71,7 @@ def assign_teacher_to_subject():
         ''', (teacher_id, subject_id, department_id))
         
         conn.commit()
+        catalogue.invalidate()
         assignment_id = cursor.lastrowid
         
         # 🔔 Send notification to teacher
@@ -108,36 +110,10 @@ def assign_teacher_to_subject():
 @teacher_subjects_bp.route('/teacher-subjects/teacher/<int:teacher_id>', methods=['GET'])
 def get_teacher_subjects(teacher_id):
     """Get all subjects assigned to a specific teacher"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            SELECT 
-                ts.id,
-                ts.teacher_id,
-                ts.subject_id,
-                ts.department_id,
-                s.name as subject_name,
-                d.name as department_name,
-                u.name as teacher_name,
-                ts.created_at
-            FROM teacher_subjects ts
-            JOIN subjects s ON ts.subject_id = s.id
-            JOIN departments d ON ts.department_id = d.id
-            JOIN teacher_profiles tp ON ts.teacher_id = tp.id
-            JOIN users u ON tp.user_id = u.id
-            WHERE ts.teacher_id = ?
-            ORDER BY ts.created_at DESC
-        ''', (teacher_id,))
-        
-        assignments = [dict(row) for row in cursor.fetchall()]
-        return jsonify(assignments)
-        
+        return jsonify(catalogue.assignments(teacher_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 
 # ============================================================
@@ -159,6 +135,7 @@ def remove_teacher_from_subject(assignment_id):
         # Delete
         cursor.execute('DELETE FROM teacher_subjects WHERE id = ?', (assignment_id,))
         conn.commit()
+        catalogue.invalidate()
         
         return jsonify({'message': 'Assignment removed successfully'})
         
@@ -175,33 +152,7 @@ def remove_teacher_from_subject(assignment_id):
 @teacher_subjects_bp.route('/teacher-subjects', methods=['GET'])
 def get_all_assignments():
     """Get all teacher-subject assignments"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            SELECT 
-                ts.id,
-                ts.teacher_id,
-                ts.subject_id,
-                ts.department_id,
-                s.name as subject_name,
-                d.name as department_name,
-                u.name as teacher_name,
-                u.email as teacher_email,
-                ts.created_at
-            FROM teacher_subjects ts
-            JOIN subjects s ON ts.subject_id = s.id
-            JOIN departments d ON ts.department_id = d.id
-            JOIN teacher_profiles tp ON ts.teacher_id = tp.id
-            JOIN users u ON tp.user_id = u.id
-            ORDER BY ts.created_at DESC
-        ''')
-        
-        assignments = [dict(row) for row in cursor.fetchall()]
-        return jsonify(assignments)
-        
+        return jsonify(catalogue.assignments())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
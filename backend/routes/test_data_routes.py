@@ -1,6 +1,8 @@
 # routes/test_data_routes.py
 from flask import Blueprint, request, jsonify
 from models.database import get_db_connection
+from services.notification_bus import notification_bus
+from services.notification_service import NotificationService
 
 test_data_bp = Blueprint('test_data', __name__)
 
@@ -94,18 +96,14 @@ def create_sample_requests():
                         notification_title = "New Attendance Request"
                         notification_message = f"{student_name} from {request_data['department']} - {request_data['subject']} requests attendance for {request_data['request_date']}"
                         
-                        cursor.execute('''
-                            INSERT INTO notifications 
-                            (user_id, title, message, type, related_id, is_read)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        ''', (
+                        NotificationService.create_notification(
                             teacher_user_id,
                             notification_title,
                             notification_message,
                             'attendance_request',
                             request_id,
-                            False
-                        ))
+                            conn=conn
+                        )
                         print(f"✅ Notification created for teacher user_id: {teacher_user_id}")
                 except Exception as notification_error:
                     print(f"⚠️ Failed to create notification: {notification_error}")
@@ -113,6 +111,7 @@ def create_sample_requests():
                 created_count += 1
         
         conn.commit()
+        notification_bus.flush(conn)
         
         return jsonify({
             'message': f'Created {created_count} sample attendance requests',
@@ -124,6 +123,7 @@ def create_sample_requests():
         conn.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
+        notification_bus.discard(conn)
         conn.close()
 
 @test_data_bp.route('/test/create-sample-schedules', methods=['POST'])
@@ -224,18 +224,14 @@ def create_sample_schedules():
                 notification_title = "New Class Scheduled"
                 notification_message = f"Class scheduled for {schedule_data['day_of_week']} at {schedule_data['start_time']} - {subject_name} (Computer Science)"
                 
-                cursor.execute('''
-                    INSERT INTO notifications 
-                    (user_id, title, message, type, related_id, is_read)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
+                NotificationService.create_notification(
                     teacher_user_id,
                     notification_title,
                     notification_message,
                     'class_scheduled',
                     schedule_id,
-                    False
-                ))
+                    conn=conn
+                )
                 
                 created_count += 1
                 created_schedules.append({
@@ -246,6 +242,7 @@ def create_sample_schedules():
                 })
         
         conn.commit()
+        notification_bus.flush(conn)
         
         return jsonify({
             'message': f'Created {created_count} sample class schedules with notifications',
@@ -257,6 +254,7 @@ def create_sample_schedules():
         conn.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
+        notification_bus.discard(conn)
         conn.close()
 
 @test_data_bp.route('/test/teacher-info', methods=['GET'])
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from models.database import get_db_connection
+from services.catalogue import catalogue
 
 users_bp = Blueprint('users', __name__)
 
@@ -242,6 +243,8 @@ def update_profile():
         
         conn.commit()
         conn.close()
+        # A department named in the request may have been created above
+        catalogue.invalidate()
         
         return jsonify({'success': True, 'message': 'Profile updated successfully'}), 200
         
@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import datetime
+from models.database import get_db_connection
+from services.etag import table_versions
+from services.schedule_conflicts import to_minutes
+
+BUCKET_MINUTES = 15
+
+
+class ActiveSlotIndex:
+    """Which schedule slot is running right now, by room or teacher.
+
+    Slots are bucketed by (day, 15-minute bucket, resource), so a lookup is
+    two dict reads and a filter over the one or two slots in the bucket.
+    Each slot carries its class's enrolled student ids for pre-warming the
+    recognition gallery. The index is rebuilt when the class_schedules,
+    classes or enrollment change counters move; those are checked at most
+    every ``check_seconds`` so lookups normally never touch the database.
+    """
+
+    TABLES = ('class_schedules', 'classes', 'enrollment')
+
+    def __init__(self, check_seconds=2):
+        self.check_seconds = check_seconds
+        self._buckets = None
+        self._versions = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load():
+        conn = get_db_connection()
+        try:
+            slots = conn.execute('''
+                SELECT
+                    cs.id,
+                    cs.day_of_week,
+                    cs.start_time,
+                    cs.end_time,
+                    cs.room_number,
+                    COALESCE(cs.teacher_id, c.teacher_id) AS teacher_id,
+                    COALESCE(cs.class_id, (
+                        SELECT c2.id FROM classes c2
+                        WHERE c2.teacher_id = cs.teacher_id AND c2.subject_id = cs.subject_id
+                        ORDER BY c2.id LIMIT 1
+                    )) AS class_id,
+                    COALESCE(s.name, c.class_name) AS subject_name
+                FROM class_schedules cs
+                LEFT JOIN classes c ON cs.class_id = c.id
+                LEFT JOIN subjects s ON s.id = COALESCE(cs.subject_id, c.subject_id)
+            ''').fetchall()
+            enrolled = {}
+            for row in conn.execute('SELECT class_id, student_id FROM enrollment ORDER BY student_id'):
+                enrolled.setdefault(row['class_id'], []).append(row['student_id'])
+        finally:
+            conn.close()
+        return [dict(s) for s in slots], enrolled
+
+    def _build(self):
+        slots, enrolled = self._load()
+        buckets = {}
+        for slot in slots:
+            start, end = to_minutes(slot['start_time']), to_minutes(slot['end_time'])
+            if start is None or end is None or end <= start:
+                continue
+            slot['start_minute'] = start
+            slot['end_minute'] = end
+            slot['student_ids'] = enrolled.get(slot['class_id'], [])
+
+            keys = [('teacher', str(slot['teacher_id']))] if slot['teacher_id'] is not None else []
+            room = str(slot['room_number'] or '').strip().lower()
+            if room:
+                keys.append(('room', room))
+
+            for bucket in range(start // BUCKET_MINUTES, (end - 1) // BUCKET_MINUTES + 1):
+                day_bucket = buckets.setdefault((slot['day_of_week'], bucket), {})
+                for key in keys:
+                    day_bucket.setdefault(key, []).append(slot)
+        return buckets
+
+    def _current(self):
+        now = time.time()
+        with self._lock:
+            if self._buckets is not None and now - self._checked_at < self.check_seconds:
+                return self._buckets
+        versions = table_versions(self.TABLES)
+        with self._lock:
+            if self._buckets is not None and versions is not None and versions == self._versions:
+                self._checked_at = now
+                return self._buckets
+        buckets = self._build()
+        with self._lock:
+            self._buckets = buckets
+            self._versions = versions
+            self._checked_at = now
+        return buckets
+
+    def active(self, room=None, teacher_id=None, at=None):
+        """Slots running at ``at`` (default now) in ``room`` or for ``teacher_id``"""
+        at = at or datetime.now()
+        minute = at.hour * 60 + at.minute
+        if room:
+            key = ('room', str(room).strip().lower())
+        else:
+            key = ('teacher', str(teacher_id))
+        candidates = self._current().get((at.strftime('%A'), minute // BUCKET_MINUTES), {}).get(key, ())
+        return [s for s in candidates if s['start_minute'] <= minute < s['end_minute']]
+
+    def invalidate(self):
+        with self._lock:
+            self._buckets = None
+
+
+active_slots = ActiveSlotIndex()
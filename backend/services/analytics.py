@@ -0,0 +1,305 @@
+import calendar
+import threading
+from datetime import date, datetime, timedelta
+import numpy as np
+from models.database import get_db_connection
+from services.etag import table_versions
+
+EPOCH = date(1970, 1, 1)
+# Score bands reported by the distribution histogram
+HISTOGRAM_BINS = np.arange(0, 101, 10)
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def to_day(value):
+    return (value - EPOCH).days
+
+
+def from_day(day):
+    return (EPOCH + timedelta(days=int(day))).isoformat()
+
+
+def _rate(present, total):
+    return round(float(present) * 100.0 / float(total), 1) if total else 0.0
+
+
+class AttendanceFrame:
+    """The attendance table as column arrays.
+
+    One query loads (student, class, day, present, known student) for every
+    row whose class exists; class attributes (teacher, subject label,
+    department) are small lookup arrays indexed by class id, so any grouping
+    is a fancy-index plus ``np.bincount``. Days are counted from 1970-01-01;
+    rows with an unparseable date get -1, keep counting towards totals and
+    are left out of date filters and daily series, as in SQL.
+    """
+
+    def __init__(self, rows, classes):
+        data = np.array(rows, dtype=np.int64).reshape(-1, 5)
+        self.student = data[:, 0].astype(np.int32)
+        self.class_ = data[:, 1].astype(np.int32)
+        self.day = data[:, 2].astype(np.int32)
+        self.present = data[:, 3].astype(np.int8)
+        self.known_student = data[:, 4].astype(bool)
+
+        size = max([c['id'] for c in classes] + [0]) + 1
+        self.class_teacher = np.full(size, -1, dtype=np.int32)
+        self.class_subject = np.full(size, -1, dtype=np.int32)
+        self.class_department = np.full(size, -1, dtype=np.int32)
+        self.subject_labels = []
+        self.department_labels = []
+        subject_codes = {}
+        department_codes = {}
+        for c in classes:
+            subject = (c['subject_name'], c['department_name'])
+            department = (c['department_id'], c['department_name'])
+            if subject not in subject_codes:
+                subject_codes[subject] = len(self.subject_labels)
+                self.subject_labels.append(subject)
+            if department not in department_codes:
+                department_codes[department] = len(self.department_labels)
+                self.department_labels.append(department)
+            self.class_teacher[c['id']] = c['teacher_id']
+            self.class_subject[c['id']] = subject_codes[subject]
+            self.class_department[c['id']] = department_codes[department]
+
+    @staticmethod
+    def load():
+        conn = get_db_connection()
+        try:
+            rows = conn.execute('''
+                SELECT
+                    a.student_id,
+                    a.class_id,
+                    COALESCE(CAST(julianday(date(a.attendance_date)) - 2440587.5 AS INTEGER), -1),
+                    a.status = 'present',
+                    s.id IS NOT NULL
+                FROM attendance a
+                JOIN classes c ON a.class_id = c.id
+                LEFT JOIN students s ON a.student_id = s.id
+            ''').fetchall()
+            classes = conn.execute('''
+                SELECT
+                    c.id,
+                    c.teacher_id,
+                    COALESCE(s.name, c.class_name) AS subject_name,
+                    s.department_id,
+                    COALESCE(d.name, '') AS department_name
+                FROM classes c
+                LEFT JOIN subjects s ON c.subject_id = s.id
+                LEFT JOIN departments d ON s.department_id = d.id
+            ''').fetchall()
+        finally:
+            conn.close()
+        return AttendanceFrame([tuple(r) for r in rows], [dict(c) for c in classes])
+
+    def __len__(self):
+        return len(self.student)
+
+
+class AnalyticsEngine:
+    """Vectorized attendance analytics over a cached ``AttendanceFrame``.
+
+    The frame is rebuilt when the change counters of the tables it is read
+    from move; computed results are memoized per frame, so repeated
+    dashboard loads cost one counter query.
+    """
+
+    TABLES = ('attendance', 'classes', 'subjects', 'departments', 'students')
+
+    def __init__(self):
+        self._frame = None
+        self._versions = None
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def frame(self):
+        versions = table_versions(self.TABLES)
+        with self._lock:
+            if self._frame is not None and versions is not None and versions == self._versions:
+                return self._frame
+        frame = AttendanceFrame.load()
+        with self._lock:
+            self._frame = frame
+            self._versions = versions
+            self._results = {}
+        return frame
+
+    def _memo(self, key, compute):
+        frame = self.frame()
+        with self._lock:
+            if key in self._results and self._frame is frame:
+                return self._results[key]
+        value = compute(frame)
+        with self._lock:
+            if self._frame is frame:
+                self._results[key] = value
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._frame = None
+            self._results = {}
+
+    # ------------------------------------------------------------------
+    # Building blocks
+    # ------------------------------------------------------------------
+    @staticmethod
+    def student_rates(frame, mask=None):
+        """(student ids, attendance percentages) of students with rows under ``mask``"""
+        keep = frame.known_student if mask is None else mask & frame.known_student
+        students = frame.student[keep]
+        if not len(students):
+            return np.array([], dtype=np.int32), np.array([], dtype=np.float64)
+        ids, inverse = np.unique(students, return_inverse=True)
+        totals = np.bincount(inverse)
+        present = np.bincount(inverse, weights=frame.present[keep])
+        return ids, present * 100.0 / totals
+
+    @staticmethod
+    def daily_series(frame, mask, window=7):
+        """Per-day totals, rates and a trailing moving average of the rate"""
+        keep = mask & (frame.day >= 0)
+        days = frame.day[keep]
+        if not len(days):
+            return []
+        ids, inverse = np.unique(days, return_inverse=True)
+        totals = np.bincount(inverse)
+        present = np.bincount(inverse, weights=frame.present[keep]).astype(np.int64)
+        rates = present * 100.0 / totals
+        # Trailing mean over up to ``window`` recorded days
+        sums = np.cumsum(np.insert(rates, 0, 0.0))
+        counts = np.minimum(np.arange(1, len(rates) + 1), window)
+        moving = (sums[1:] - sums[np.arange(len(rates)) + 1 - counts]) / counts
+        return [{
+            'date': from_day(day),
+            'total': int(total),
+            'present_count': int(p),
+            'absent_count': int(total - p),
+            'rate': round(float(rate), 1),
+            'moving_average': round(float(avg), 1)
+        } for day, total, p, rate, avg in zip(ids, totals, present, rates, moving)]
+
+    # ------------------------------------------------------------------
+    # Admin
+    # ------------------------------------------------------------------
+    def distribution(self, threshold=75):
+        """Share of students above/below ``threshold`` with histogram and percentiles"""
+        def compute(frame):
+            _, rates = self.student_rates(frame)
+            if not len(rates):
+                return {'students': 0, 'above': 0, 'below': 0, 'histogram': [], 'percentiles': {}, 'mean': 0}
+            rates = np.round(rates, 1)
+            above = int(np.count_nonzero(rates >= threshold))
+            counts, edges = np.histogram(rates, bins=HISTOGRAM_BINS)
+            return {
+                'students': int(len(rates)),
+                'above': round(above * 100.0 / len(rates), 1),
+                'below': round((len(rates) - above) * 100.0 / len(rates), 1),
+                'mean': round(float(rates.mean()), 1),
+                'percentiles': {str(p): round(float(v), 1)
+                                for p, v in zip(PERCENTILES, np.percentile(rates, PERCENTILES))},
+                'histogram': [{'from': int(lo), 'to': int(hi), 'students': int(n)}
+                              for lo, hi, n in zip(edges[:-1], edges[1:], counts)]
+            }
+        return self._memo(('distribution', threshold), compute)
+
+    def departments(self):
+        """Totals, rate and student percentiles per department"""
+        def compute(frame):
+            result = []
+            department = frame.class_department[frame.class_]
+            totals = np.bincount(department, minlength=len(frame.department_labels))
+            present = np.bincount(department, weights=frame.present, minlength=len(frame.department_labels))
+            for code, (department_id, name) in enumerate(frame.department_labels):
+                if not totals[code]:
+                    continue
+                _, rates = self.student_rates(frame, department == code)
+                result.append({
+                    'department_id': department_id,
+                    'department': name,
+                    'total': int(totals[code]),
+                    'present_count': int(present[code]),
+                    'rate': _rate(present[code], totals[code]),
+                    'students': int(len(rates)),
+                    'median_student_rate': round(float(np.median(rates)), 1) if len(rates) else 0.0
+                })
+            return sorted(result, key=lambda d: d['department'])
+        return self._memo(('departments',), compute)
+
+    def trend(self, window=7):
+        return self._memo(('trend', window), lambda frame: self.daily_series(
+            frame, np.ones(len(frame), dtype=bool), window))
+
+    # ------------------------------------------------------------------
+    # Teacher
+    # ------------------------------------------------------------------
+    def teacher(self, teacher_profile_id, period='all', today=None):
+        """Overall, subject-wise and daily figures for one teacher's classes"""
+        today = today or datetime.utcnow().date()
+        if period == 'week':
+            since = to_day(today - timedelta(days=7))
+        elif period == 'month':
+            month = today.month - 1 or 12
+            year = today.year - (today.month == 1)
+            day = min(today.day, calendar.monthrange(year, month)[1])
+            since = to_day(date(year, month, day))
+        else:
+            since = None
+
+        def compute(frame):
+            mask = frame.class_teacher[frame.class_] == teacher_profile_id
+            if since is not None:
+                mask &= frame.day >= since
+            present = frame.present[mask]
+            total = int(mask.sum())
+            present_count = int(present.sum())
+
+            subject = frame.class_subject[frame.class_[mask]]
+            n = len(frame.subject_labels)
+            subject_totals = np.bincount(subject, minlength=n)
+            subject_present = np.bincount(subject, weights=present, minlength=n).astype(np.int64)
+            subject_wise = sorted(({
+                'subject_name': frame.subject_labels[code][0],
+                'department_name': frame.subject_labels[code][1],
+                'total': int(subject_totals[code]),
+                'present_count': int(subject_present[code]),
+                'absent_count': int(subject_totals[code] - subject_present[code])
+            } for code in np.flatnonzero(subject_totals)), key=lambda s: (s['subject_name'], s['department_name']))
+
+            dated = frame.day[mask] >= 0
+            daily = []
+            if dated.any():
+                names = [label[0] for label in frame.subject_labels]
+                key = frame.day[mask][dated].astype(np.int64) * n + subject[dated]
+                keys, inverse = np.unique(key, return_inverse=True)
+                totals = np.bincount(inverse)
+                hits = np.bincount(inverse, weights=present[dated]).astype(np.int64)
+                merged = {}
+                for k, t, p in zip(keys, totals, hits):
+                    # Subjects sharing a name across departments are one row, as in SQL
+                    entry = merged.setdefault((int(k // n), names[k % n]), [0, 0])
+                    entry[0] += int(t)
+                    entry[1] += int(p)
+                daily = [{
+                    'date': from_day(day),
+                    'subject_name': name,
+                    'total': t,
+                    'present_count': p,
+                    'absent_count': t - p
+                } for (day, name), (t, p) in sorted(merged.items(), key=lambda item: (-item[0][0], item[0][1]))]
+
+            return {
+                'overall': {
+                    'total_records': total,
+                    'present_count': present_count,
+                    'absent_count': total - present_count
+                },
+                'subject_wise': subject_wise,
+                'daily': daily,
+                'trend': self.daily_series(frame, mask)
+            }
+        return self._memo(('teacher', teacher_profile_id, period, since), compute)
+
+
+analytics = AnalyticsEngine()
@@ -0,0 +1,378 @@
+import threading
+from datetime import datetime, timedelta
+from models.database import get_db_connection
+
+
+class AttendanceRollupService:
+    """Per-day x class x department attendance counters.
+
+    Every attendance write calls ``record`` (or ``record_many``) on the same
+    cursor, so the counters commit or roll back together with the attendance
+    row. ``rebuild`` recomputes a date range from the raw table and is used by
+    the compactor for back-fills and to repair drift.
+    """
+
+    @staticmethod
+    def record(cursor, student_id, class_id, attendance_date, status, delta=1):
+        """Apply one attendance row (delta=-1 to retract) to the rollups"""
+        present = delta if status == 'present' else 0
+        absent = delta if status == 'absent' else 0
+        if not present and not absent:
+            return
+
+        cursor.execute('''
+            INSERT INTO attendance_daily_rollup
+            (attendance_date, class_id, subject_id, department_id, present_count, absent_count)
+            VALUES (
+                DATE(?), ?,
+                (SELECT subject_id FROM classes WHERE id = ?),
+                (SELECT s.department_id FROM classes c
+                 JOIN subjects s ON c.subject_id = s.id
+                 WHERE c.id = ?),
+                ?, ?
+            )
+            ON CONFLICT(attendance_date, class_id) DO UPDATE SET
+                present_count = present_count + excluded.present_count,
+                absent_count = absent_count + excluded.absent_count
+        ''', (str(attendance_date), class_id, class_id, class_id, present, absent))
+
+        cursor.execute('''
+            INSERT INTO attendance_student_rollup
+            (student_id, class_id, present_count, absent_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(student_id, class_id) DO UPDATE SET
+                present_count = present_count + excluded.present_count,
+                absent_count = absent_count + excluded.absent_count
+        ''', (student_id, class_id, present, absent))
+
+    @staticmethod
+    def record_many(cursor, rows):
+        """Apply (student_id, class_id, attendance_date, status) tuples.
+
+        Counts are summed per rollup key first and written with executemany,
+        so a batch costs two statements however many rows it contains.
+        """
+        daily = {}
+        per_student = {}
+        for student_id, class_id, attendance_date, status in rows:
+            if status not in ('present', 'absent'):
+                continue
+            present, absent = (1, 0) if status == 'present' else (0, 1)
+            d = daily.setdefault((str(attendance_date), class_id), [0, 0])
+            d[0] += present
+            d[1] += absent
+            s = per_student.setdefault((student_id, class_id), [0, 0])
+            s[0] += present
+            s[1] += absent
+
+        cursor.executemany('''
+            INSERT INTO attendance_daily_rollup
+            (attendance_date, class_id, subject_id, department_id, present_count, absent_count)
+            VALUES (
+                DATE(?), ?,
+                (SELECT subject_id FROM classes WHERE id = ?),
+                (SELECT s.department_id FROM classes c
+                 JOIN subjects s ON c.subject_id = s.id
+                 WHERE c.id = ?),
+                ?, ?
+            )
+            ON CONFLICT(attendance_date, class_id) DO UPDATE SET
+                present_count = present_count + excluded.present_count,
+                absent_count = absent_count + excluded.absent_count
+        ''', [(day, class_id, class_id, class_id, p, a) for (day, class_id), (p, a) in daily.items()])
+
+        cursor.executemany('''
+            INSERT INTO attendance_student_rollup
+            (student_id, class_id, present_count, absent_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(student_id, class_id) DO UPDATE SET
+                present_count = present_count + excluded.present_count,
+                absent_count = absent_count + excluded.absent_count
+        ''', [(student_id, class_id, p, a) for (student_id, class_id), (p, a) in per_student.items()])
+
+    @staticmethod
+    def rebuild(conn=None, start_date=None, end_date=None):
+        """Recompute rollups for a date range (whole history when no range).
+
+        Returns the number of daily rollup rows written.
+        """
+        own_conn = conn is None
+        if own_conn:
+            conn = get_db_connection()
+        cursor = conn.cursor()
+
+        where, params = AttendanceRollupService._range_filter('DATE(a.attendance_date)', start_date, end_date)
+        rollup_where, _ = AttendanceRollupService._range_filter('attendance_date', start_date, end_date)
+
+        try:
+            cursor.execute(f'''
+                DELETE FROM attendance_daily_rollup
+                WHERE 1 = 1 {rollup_where}
+            ''', params)
+
+            cursor.execute(f'''
+                INSERT INTO attendance_daily_rollup
+                (attendance_date, class_id, subject_id, department_id, present_count, absent_count)
+                SELECT
+                    DATE(a.attendance_date),
+                    a.class_id,
+                    c.subject_id,
+                    s.department_id,
+                    SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END)
+                FROM attendance a
+                LEFT JOIN classes c ON a.class_id = c.id
+                LEFT JOIN subjects s ON c.subject_id = s.id
+                WHERE 1 = 1 {where}
+                GROUP BY DATE(a.attendance_date), a.class_id
+            ''', params)
+            written = cursor.rowcount
+
+            # Student totals are all-time, so only the pairs touched by the
+            # range need to be recounted from their full history.
+            if where:
+                cursor.execute('''
+                    CREATE TEMP TABLE IF NOT EXISTS _rollup_pairs (student_id INTEGER, class_id INTEGER)
+                ''')
+                cursor.execute('DELETE FROM _rollup_pairs')
+                cursor.execute(f'''
+                    INSERT INTO _rollup_pairs
+                    SELECT DISTINCT a.student_id, a.class_id FROM attendance a WHERE 1 = 1 {where}
+                ''', params)
+                cursor.execute('''
+                    DELETE FROM attendance_student_rollup
+                    WHERE (student_id, class_id) IN (SELECT student_id, class_id FROM _rollup_pairs)
+                ''')
+                pair_filter = '''
+                    WHERE (a.student_id, a.class_id) IN (SELECT student_id, class_id FROM _rollup_pairs)
+                '''
+            else:
+                cursor.execute('DELETE FROM attendance_student_rollup')
+                pair_filter = ''
+
+            cursor.execute(f'''
+                INSERT INTO attendance_student_rollup
+                (student_id, class_id, present_count, absent_count)
+                SELECT
+                    a.student_id,
+                    a.class_id,
+                    SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END)
+                FROM attendance a
+                {pair_filter}
+                GROUP BY a.student_id, a.class_id
+            ''')
+
+            conn.commit()
+            return written
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if own_conn:
+                conn.close()
+
+    @staticmethod
+    def ensure_built():
+        """Back-fill the rollups once when they are empty but attendance is not"""
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT EXISTS(SELECT 1 FROM attendance_daily_rollup) AS built')
+            if cursor.fetchone()['built']:
+                return False
+            cursor.execute('SELECT EXISTS(SELECT 1 FROM attendance) AS has_rows')
+            if not cursor.fetchone()['has_rows']:
+                return False
+            AttendanceRollupService.rebuild(conn)
+            return True
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Readers used by the admin dashboards
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _range_filter(column, start_date=None, end_date=None):
+        clauses = []
+        params = []
+        if start_date:
+            clauses.append(f' AND {column} >= DATE(?)')
+            params.append(start_date)
+        if end_date:
+            clauses.append(f' AND {column} <= DATE(?)')
+            params.append(end_date)
+        return ''.join(clauses), params
+
+    @staticmethod
+    def overall_percent(cursor, start_date=None, end_date=None):
+        where, params = AttendanceRollupService._range_filter('attendance_date', start_date, end_date)
+        cursor.execute(f'''
+            SELECT ROUND(
+                SUM(present_count) * 100.0 / NULLIF(SUM(present_count + absent_count), 0),
+                1
+            ) AS percent
+            FROM attendance_daily_rollup
+            WHERE 1 = 1 {where}
+        ''', params)
+        return cursor.fetchone()['percent'] or 0
+
+    @staticmethod
+    def department_percentages(cursor, start_date=None, end_date=None):
+        where, params = AttendanceRollupService._range_filter('attendance_date', start_date, end_date)
+        cursor.execute(f'''
+            SELECT
+                d.name AS department,
+                ROUND(
+                    COALESCE(r.present * 100.0 / NULLIF(r.present + r.absent, 0), 0),
+                    1
+                ) AS percent
+            FROM departments d
+            LEFT JOIN (
+                SELECT department_id, SUM(present_count) AS present, SUM(absent_count) AS absent
+                FROM attendance_daily_rollup
+                WHERE 1 = 1 {where}
+                GROUP BY department_id
+            ) r ON r.department_id = d.id
+            ORDER BY d.name
+        ''', params)
+        return [{"department": r['department'], "percent": r['percent']} for r in cursor.fetchall()]
+
+    @staticmethod
+    def student_percentages(cursor):
+        cursor.execute('''
+            SELECT
+                r.student_id,
+                ROUND(SUM(r.present_count) * 100.0 / SUM(r.present_count + r.absent_count), 1) AS attendance_percent
+            FROM attendance_student_rollup r
+            JOIN students s ON r.student_id = s.id
+            GROUP BY r.student_id
+            HAVING SUM(r.present_count + r.absent_count) > 0
+        ''')
+        return cursor.fetchall()
+
+    @staticmethod
+    def summary(cursor, start_date=None, end_date=None, unknown_label='Unassigned'):
+        """by_department / by_subject / by_student totals for the summary pages"""
+        where, params = AttendanceRollupService._range_filter('r.attendance_date', start_date, end_date)
+
+        cursor.execute(f'''
+            SELECT
+                COALESCE(d.name, ?) AS department,
+                SUM(r.present_count + r.absent_count) AS total_classes,
+                SUM(r.present_count) AS present_classes,
+                SUM(r.absent_count) AS absent_classes
+            FROM attendance_daily_rollup r
+            LEFT JOIN departments d ON r.department_id = d.id
+            WHERE 1 = 1 {where}
+            GROUP BY d.name
+            ORDER BY d.name
+        ''', [unknown_label] + params)
+        by_department = [dict(r) for r in cursor.fetchall()]
+
+        cursor.execute(f'''
+            SELECT
+                COALESCE(s.name, c.class_name, ?) AS subject,
+                SUM(r.present_count + r.absent_count) AS total_classes,
+                SUM(r.present_count) AS present_classes,
+                SUM(r.absent_count) AS absent_classes
+            FROM attendance_daily_rollup r
+            LEFT JOIN classes c ON r.class_id = c.id
+            LEFT JOIN subjects s ON r.subject_id = s.id
+            WHERE 1 = 1 {where}
+            GROUP BY COALESCE(s.name, c.class_name)
+            ORDER BY subject
+        ''', [unknown_label] + params)
+        by_subject = [dict(r) for r in cursor.fetchall()]
+
+        # Student totals are all-time, so a ranged summary counts the raw rows
+        if start_date or end_date:
+            student_where, student_params = AttendanceRollupService._range_filter(
+                'DATE(a.attendance_date)', start_date, end_date
+            )
+            student_source = f'''(
+                SELECT
+                    a.student_id,
+                    SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) AS present_count,
+                    SUM(CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END) AS absent_count
+                FROM attendance a
+                WHERE 1 = 1 {student_where}
+                GROUP BY a.student_id
+            )'''
+        else:
+            student_source, student_params = 'attendance_student_rollup', []
+
+        cursor.execute(f'''
+            SELECT
+                u.name AS student_name,
+                s.enrollment_no,
+                SUM(r.present_count + r.absent_count) AS total_classes,
+                SUM(r.present_count) AS present_classes,
+                SUM(r.absent_count) AS absent_classes
+            FROM {student_source} r
+            JOIN students s ON r.student_id = s.id
+            JOIN users u ON s.user_id = u.id
+            GROUP BY s.id
+            HAVING SUM(r.present_count + r.absent_count) > 0
+            ORDER BY u.name ASC
+        ''', student_params)
+        by_student = [dict(r) for r in cursor.fetchall()]
+
+        return {
+            "by_department": by_department,
+            "by_subject": by_subject,
+            "by_student": by_student
+        }
+
+    @staticmethod
+    def weekly(cursor, start_date=None, end_date=None, department_id=None):
+        where, params = AttendanceRollupService._range_filter('week_start', start_date, end_date)
+        if department_id:
+            where += ' AND department_id = ?'
+            params.append(department_id)
+        cursor.execute(f'''
+            SELECT
+                week_start,
+                SUM(present_count) AS present_count,
+                SUM(absent_count) AS absent_count
+            FROM attendance_weekly_rollup
+            WHERE 1 = 1 {where}
+            GROUP BY week_start
+            ORDER BY week_start
+        ''', params)
+        return [dict(r) for r in cursor.fetchall()]
+
+
+class RollupCompactor:
+    """Background thread that periodically re-derives recent rollup days.
+
+    Incremental updates cover normal writes; the compactor picks up rows that
+    were back-filled or edited outside the write paths.
+    """
+
+    def __init__(self, interval_seconds=900, lookback_days=7):
+        self.interval_seconds = interval_seconds
+        self.lookback_days = lookback_days
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        start_date = (datetime.now() - timedelta(days=self.lookback_days)).date().isoformat()
+        return AttendanceRollupService.rebuild(start_date=start_date)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Rollup compaction failed: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='rollup-compactor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
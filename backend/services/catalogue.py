@@ -0,0 +1,111 @@
+import threading
+from models.database import get_db_connection
+from services.etag import table_versions
+
+
+class Catalogue:
+    """Departments, subjects and teacher-subject assignments held in memory.
+
+    The catalogue is loaded with one query per table and grouped in Python,
+    replacing the per-department subject queries of the listing endpoints.
+    Endpoints that add, rename, remove or assign call ``invalidate``. Every
+    read also compares the change counters of the source tables, so writes
+    from other workers or other code paths are never served stale. That
+    keeps bodies in step with the ETags ``conditional`` derives from the
+    same counters.
+    """
+
+    TABLES = ('departments', 'subjects', 'teacher_subjects', 'teacher_profiles', 'users')
+
+    def __init__(self):
+        self._data = None
+        self._versions = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load():
+        conn = get_db_connection()
+        try:
+            departments = [dict(r) for r in conn.execute(
+                'SELECT id, name, created_at FROM departments ORDER BY name ASC'
+            )]
+            subjects = [dict(r) for r in conn.execute('''
+                SELECT s.id, s.name, s.department_id, COALESCE(d.name, 'Unknown') AS department, s.created_at
+                FROM subjects s
+                LEFT JOIN departments d ON s.department_id = d.id
+                ORDER BY s.id ASC
+            ''')]
+            assignments = [dict(r) for r in conn.execute('''
+                SELECT
+                    ts.id,
+                    ts.teacher_id,
+                    ts.subject_id,
+                    ts.department_id,
+                    s.name as subject_name,
+                    d.name as department_name,
+                    u.name as teacher_name,
+                    u.email as teacher_email,
+                    ts.created_at
+                FROM teacher_subjects ts
+                JOIN subjects s ON ts.subject_id = s.id
+                JOIN departments d ON ts.department_id = d.id
+                JOIN teacher_profiles tp ON ts.teacher_id = tp.id
+                JOIN users u ON tp.user_id = u.id
+                ORDER BY ts.created_at DESC, ts.id DESC
+            ''')]
+        finally:
+            conn.close()
+
+        by_department = {}
+        for subject in subjects:
+            by_department.setdefault(subject['department_id'], []).append(subject)
+        by_teacher = {}
+        for assignment in assignments:
+            by_teacher.setdefault(assignment['teacher_id'], []).append(assignment)
+        return {
+            'departments': departments,
+            'subjects': subjects,
+            'assignments': assignments,
+            'by_department': by_department,
+            'by_teacher': by_teacher
+        }
+
+    def _current(self):
+        versions = table_versions(self.TABLES)
+        with self._lock:
+            if self._data is not None and versions is not None and versions == self._versions:
+                return self._data
+        data = self._load()
+        with self._lock:
+            self._data = data
+            self._versions = versions
+        return data
+
+    def departments(self):
+        """Departments by name, each with its subjects ({id, name})"""
+        data = self._current()
+        return [dict(d, subjects=[{'id': s['id'], 'name': s['name']} for s in data['by_department'].get(d['id'], [])])
+                for d in data['departments']]
+
+    def department_summaries(self):
+        """Departments by name with their subject count"""
+        data = self._current()
+        return [dict(d, total_subjects=len(data['by_department'].get(d['id'], [])))
+                for d in data['departments']]
+
+    def subjects(self):
+        """All subjects by id with their department name"""
+        return [dict(s) for s in self._current()['subjects']]
+
+    def assignments(self, teacher_id=None):
+        """Teacher-subject assignments, newest first, optionally for one teacher profile"""
+        data = self._current()
+        rows = data['assignments'] if teacher_id is None else data['by_teacher'].get(teacher_id, [])
+        return [dict(a) for a in rows]
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+
+catalogue = Catalogue()
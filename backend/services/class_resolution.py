@@ -0,0 +1,124 @@
+import threading
+from models.database import get_db_connection
+from services.etag import table_versions
+
+
+def normalize(name):
+    """Case- and whitespace-insensitive lookup key for class and subject names"""
+    return ' '.join(str(name or '').lower().split())
+
+
+class ClassResolver:
+    """Resolve (teacher, subject) from a request form to a class id.
+
+    Attendance requests may name a teacher and a subject instead of a class.
+    The resolver keeps exact-name dictionaries built from classes, subjects,
+    teacher_subjects and enrollment, so resolution is a few dict reads and
+    always picks the same class for the same input:
+
+    1. classes of the teacher whose class or subject name equals ``subject``;
+    2. classes of a subject assigned to the teacher (teacher_subjects) that
+       the student is enrolled in, for co-taught subjects;
+    3. with ``fallback``, any class of the teacher.
+
+    Within each step the student's own enrollments win, then the lowest id.
+    The dictionaries are rebuilt when the change counters of the source
+    tables move.
+    """
+
+    TABLES = ('classes', 'subjects', 'teacher_subjects', 'enrollment')
+
+    def __init__(self):
+        self._index = None
+        self._versions = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build():
+        by_name = {}
+        by_teacher = {}
+        teacher_subjects = {}
+        by_subject = {}
+        enrolled = {}
+        conn = get_db_connection()
+        try:
+            for row in conn.execute('''
+                SELECT c.id, c.teacher_id, c.subject_id, c.class_name, s.name AS subject_name
+                FROM classes c
+                LEFT JOIN subjects s ON c.subject_id = s.id
+                ORDER BY c.id
+            '''):
+                for name in {normalize(row['class_name']), normalize(row['subject_name'])} - {''}:
+                    by_name.setdefault((row['teacher_id'], name), []).append(row['id'])
+                by_teacher.setdefault(row['teacher_id'], []).append(row['id'])
+                by_subject.setdefault(row['subject_id'], []).append(row['id'])
+            for row in conn.execute('''
+                SELECT ts.teacher_id, ts.subject_id, s.name
+                FROM teacher_subjects ts
+                JOIN subjects s ON ts.subject_id = s.id
+            '''):
+                teacher_subjects.setdefault((row['teacher_id'], normalize(row['name'])), set()).add(row['subject_id'])
+            for row in conn.execute('SELECT student_id, class_id FROM enrollment'):
+                enrolled.setdefault(row['student_id'], set()).add(row['class_id'])
+        finally:
+            conn.close()
+        return {
+            'by_name': by_name,
+            'by_teacher': by_teacher,
+            'teacher_subjects': teacher_subjects,
+            'by_subject': by_subject,
+            'enrolled': enrolled
+        }
+
+    def _current(self):
+        versions = table_versions(self.TABLES)
+        with self._lock:
+            if self._index is not None and versions is not None and versions == self._versions:
+                return self._index
+        index = self._build()
+        with self._lock:
+            self._index = index
+            self._versions = versions
+        return index
+
+    def resolve(self, teacher_profile_id, subject, student_id=None, fallback=False):
+        """Class id for the teacher profile and subject/class name, or None"""
+        index = self._current()
+        mine = index['enrolled'].get(_as_int(student_id), set())
+
+        candidates = index['by_name'].get((teacher_profile_id, normalize(subject)), [])
+        if candidates:
+            return _pick(candidates, mine)
+
+        for subject_id in sorted(index['teacher_subjects'].get((teacher_profile_id, normalize(subject)), ())):
+            shared = [c for c in index['by_subject'].get(subject_id, []) if c in mine]
+            if shared:
+                return shared[0]
+
+        if fallback:
+            candidates = index['by_teacher'].get(teacher_profile_id, [])
+            if candidates:
+                return _pick(candidates, mine)
+        return None
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _pick(candidates, enrolled):
+    """First enrolled candidate, else the lowest class id (candidates are sorted)"""
+    for class_id in candidates:
+        if class_id in enrolled:
+            return class_id
+    return candidates[0]
+
+
+class_resolver = ClassResolver()
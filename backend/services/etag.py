@@ -0,0 +1,54 @@
+import hashlib
+import sqlite3
+from functools import wraps
+from flask import current_app, make_response, request
+from models.database import get_db_connection
+
+
+def table_versions(tables):
+    """Current change counters for ``tables`` (None if counters are missing)"""
+    conn = get_db_connection()
+    try:
+        placeholders = ','.join('?' for _ in tables)
+        rows = conn.execute(
+            f'SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})',
+            list(tables)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    versions = {r['table_name']: r['version'] for r in rows}
+    if len(versions) != len(tables):
+        return None
+    return [versions[t] for t in tables]
+
+
+def conditional(*tables):
+    """Strong ETag for a GET view derived from the tables it reads.
+
+    The tag is built from the request path/query and the change counters of
+    ``tables``, so a matching If-None-Match is answered with 304 before the
+    view runs. Views whose counters are unavailable are served normally.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = table_versions(tables)
+            if versions is None:
+                return view(*args, **kwargs)
+
+            stamp = request.full_path + '|' + ','.join(str(v) for v in versions)
+            etag = hashlib.sha1(stamp.encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
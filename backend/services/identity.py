@@ -0,0 +1,158 @@
+import threading
+import time
+from models.database import get_db_connection
+
+# profile table -> the two maps cached for it
+TABLES = {
+    'teacher': 'teacher_profiles',
+    'student': 'students'
+}
+
+
+class IdentityResolver:
+    """Cached user id <-> teacher profile / student id mapping.
+
+    Handlers receive either a users.id or a profile id and used to probe
+    both with one or two queries per request. The resolver keeps the full
+    (id, user_id) pairs of teacher_profiles and students in memory; ids are
+    AUTOINCREMENT so a pair never changes meaning. The maps are dropped by
+    ``invalidate`` when profiles are created or deleted, and reloaded after
+    ``max_age_seconds`` to pick up profiles created by other workers.
+    Ids missing from the maps fall back to one indexed query.
+    """
+
+    def __init__(self, max_age_seconds=300):
+        self.max_age_seconds = max_age_seconds
+        self._maps = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def _snapshot(self):
+        with self._lock:
+            if self._maps is not None and time.time() - self._loaded_at < self.max_age_seconds:
+                return self._maps
+
+        maps = {}
+        conn = get_db_connection()
+        try:
+            for kind, table in TABLES.items():
+                rows = conn.execute(f'SELECT id, user_id FROM {table}').fetchall()
+                maps[kind] = {
+                    'by_user': {r['user_id']: r['id'] for r in rows},
+                    'user_of': {r['id']: r['user_id'] for r in rows}
+                }
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._maps = maps
+            self._loaded_at = time.time()
+        return maps
+
+    def _remember(self, kind, rows):
+        with self._lock:
+            if self._maps is None:
+                return
+            for r in rows:
+                self._maps[kind]['by_user'][r['user_id']] = r['id']
+                self._maps[kind]['user_of'][r['id']] = r['user_id']
+
+    def _fetch(self, kind, ident):
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(
+                f'SELECT id, user_id FROM {TABLES[kind]} WHERE user_id = ? OR id = ?',
+                (ident, ident)
+            ).fetchall()
+        finally:
+            conn.close()
+        self._remember(kind, rows)
+        return rows
+
+    def _resolve(self, kind, ident, prefer_user):
+        ident = int(ident)
+        maps = self._snapshot()[kind]
+        if prefer_user:
+            if ident in maps['by_user']:
+                return maps['by_user'][ident]
+            if ident in maps['user_of']:
+                return ident
+        else:
+            if ident in maps['user_of']:
+                return ident
+            if ident in maps['by_user']:
+                return maps['by_user'][ident]
+
+        rows = self._fetch(kind, ident)
+        by_user = [r['id'] for r in rows if r['user_id'] == ident]
+        by_id = [r['id'] for r in rows if r['id'] == ident]
+        order = (by_user, by_id) if prefer_user else (by_id, by_user)
+        for match in order:
+            if match:
+                return match[0]
+        return None
+
+    def _user_of(self, kind, profile_id):
+        try:
+            profile_id = int(profile_id)
+        except (TypeError, ValueError):
+            return None
+        user_id = self._snapshot()[kind]['user_of'].get(profile_id)
+        if user_id is None:
+            for r in self._fetch(kind, profile_id):
+                if r['id'] == profile_id:
+                    return r['user_id']
+        return user_id
+
+    def resolve_teacher(self, user_or_profile_id, prefer_user=True):
+        """teacher_profiles.id for a users.id or a teacher profile id.
+
+        ``prefer_user`` decides which interpretation wins when the number is
+        both. Returns None when neither matches; raises ValueError for
+        non-numeric ids.
+        """
+        return self._resolve('teacher', user_or_profile_id, prefer_user)
+
+    def resolve_student(self, user_or_student_id, prefer_user=True):
+        """students.id for a users.id or a student id.
+
+        ``prefer_user`` decides which interpretation wins when the number is
+        both. Returns None when neither matches; raises ValueError for
+        non-numeric ids.
+        """
+        return self._resolve('student', user_or_student_id, prefer_user)
+
+    def _by_user(self, kind, user_id):
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        profile_id = self._snapshot()[kind]['by_user'].get(user_id)
+        if profile_id is None:
+            for r in self._fetch(kind, user_id):
+                if r['user_id'] == user_id:
+                    return r['id']
+        return profile_id
+
+    def teacher_profile_id(self, user_id):
+        """teacher_profiles.id for a users.id only (no profile-id fallback), or None"""
+        return self._by_user('teacher', user_id)
+
+    def student_id(self, user_id):
+        """students.id for a users.id only, or None"""
+        return self._by_user('student', user_id)
+
+    def teacher_user_id(self, profile_id):
+        """users.id of a teacher profile, or None"""
+        return self._user_of('teacher', profile_id)
+
+    def student_user_id(self, student_id):
+        """users.id of a student, or None"""
+        return self._user_of('student', student_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._maps = None
+
+
+identity = IdentityResolver()
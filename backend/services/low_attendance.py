@@ -0,0 +1,193 @@
+import threading
+from datetime import datetime, timedelta
+from models.database import get_db_connection
+from services.outbox import Outbox
+from config import Config
+
+# Candidate ids per "IN (...)" lookup when checking earlier warnings
+LOOKUP_CHUNK = 500
+
+
+class LowAttendanceService:
+    """Set-based detection of students below the attendance threshold.
+
+    ``report`` computes per-subject and overall percentages for many students
+    in one grouped query (with window sums for the overall figure) instead of
+    recounting one student's attendance after every mark. ``warn`` queues the
+    resulting warnings in bulk, at most one per student per period.
+    """
+
+    @staticmethod
+    def report(cursor, since_id=None, threshold=None):
+        """Students below ``threshold`` overall and per subject.
+
+        With ``since_id`` only students with attendance rows newer than that
+        id are recomputed (their percentages still cover all their rows).
+        """
+        threshold = Config.LOW_ATTENDANCE_THRESHOLD if threshold is None else threshold
+        scope = ''
+        params = []
+        if since_id is not None:
+            scope = 'WHERE a.student_id IN (SELECT DISTINCT student_id FROM attendance WHERE id > ?)'
+            params.append(since_id)
+
+        cursor.execute(f'''
+            WITH per_subject AS (
+                SELECT
+                    a.student_id,
+                    COALESCE(subj.name, c.class_name) AS subject,
+                    COUNT(*) AS total,
+                    SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) AS present
+                FROM attendance a
+                JOIN classes c ON a.class_id = c.id
+                LEFT JOIN subjects subj ON c.subject_id = subj.id
+                {scope}
+                GROUP BY a.student_id, subject
+            )
+            SELECT
+                ps.student_id,
+                s.user_id,
+                u.name,
+                s.enrollment_no,
+                ps.subject,
+                ps.total,
+                ps.present,
+                SUM(ps.total) OVER (PARTITION BY ps.student_id) AS overall_total,
+                SUM(ps.present) OVER (PARTITION BY ps.student_id) AS overall_present
+            FROM per_subject ps
+            JOIN students s ON ps.student_id = s.id
+            JOIN users u ON s.user_id = u.id
+            ORDER BY ps.student_id, ps.subject
+        ''', params)
+
+        overall = {}
+        by_subject = []
+        for row in cursor.fetchall():
+            student = {
+                'student_id': row['student_id'],
+                'user_id': row['user_id'],
+                'name': row['name'],
+                'enrollment_no': row['enrollment_no']
+            }
+            percentage = round(row['present'] * 100.0 / row['total'], 2)
+            if percentage < threshold:
+                by_subject.append(dict(student, subject=row['subject'], present=row['present'],
+                                       total=row['total'], percentage=percentage))
+            overall_percentage = round(row['overall_present'] * 100.0 / row['overall_total'], 2)
+            if overall_percentage < threshold and row['student_id'] not in overall:
+                overall[row['student_id']] = dict(student, present=row['overall_present'],
+                                                  total=row['overall_total'], percentage=overall_percentage)
+
+        return {
+            'threshold': threshold,
+            'overall': list(overall.values()),
+            'by_subject': by_subject
+        }
+
+    @staticmethod
+    def period(now=None, length=None):
+        """(key, start) of the warning period containing ``now`` (UTC)"""
+        now = now or datetime.utcnow()
+        length = length or Config.LOW_ATTENDANCE_WARNING_PERIOD
+        if length == 'week':
+            start = (now - timedelta(days=now.weekday())).date()
+            year, week, _ = now.isocalendar()
+            return f'{year}-W{week:02d}', start.isoformat()
+        return now.date().isoformat(), now.date().isoformat()
+
+    @staticmethod
+    def warn(cursor, report, now=None):
+        """Queue one warning per low student not yet warned this period; returns count"""
+        key, start = LowAttendanceService.period(now)
+
+        students = {}
+        for row in report['overall']:
+            students.setdefault(row['user_id'], {'overall': None, 'subjects': []})['overall'] = row['percentage']
+        for row in report['by_subject']:
+            students.setdefault(row['user_id'], {'overall': None, 'subjects': []})['subjects'].append(row)
+        if not students:
+            return 0
+
+        user_ids = list(students)
+        warned = set()
+        for i in range(0, len(user_ids), LOOKUP_CHUNK):
+            chunk = user_ids[i:i + LOOKUP_CHUNK]
+            cursor.execute(f'''
+                SELECT DISTINCT user_id FROM notifications
+                WHERE type = 'attendance_warning' AND created_at >= ?
+                  AND user_id IN ({','.join('?' * len(chunk))})
+            ''', [start, *chunk])
+            warned.update(r['user_id'] for r in cursor.fetchall())
+
+        notifications = []
+        keys = []
+        for user_id, found in students.items():
+            if user_id in warned:
+                continue
+            parts = []
+            if found['overall'] is not None:
+                parts.append(f"Your attendance is now {found['overall']:.2f}%.")
+            if found['subjects']:
+                parts.append('Below the requirement in: ' + ', '.join(
+                    f"{s['subject']} ({s['percentage']:.2f}%)" for s in found['subjects']) + '.')
+            parts.append('Please attend regularly to avoid shortage.')
+            notifications.append((user_id, "Low Attendance Warning", ' '.join(parts), 'attendance_warning', None))
+            keys.append(f'attendance_warning:{user_id}:{key}')
+        if not notifications:
+            return 0
+        return Outbox.notify_many(cursor, notifications, keys)
+
+
+class LowAttendanceJob:
+    """Background scan for students whose attendance changed.
+
+    Each run looks at students with attendance rows above the last seen id
+    (all students on the first run), recomputes them with one query and
+    queues warnings in bulk, so neither single marks nor whole sessions pay
+    for the check.
+    """
+
+    def __init__(self, interval_seconds=None):
+        self.interval_seconds = interval_seconds or Config.LOW_ATTENDANCE_SCAN_INTERVAL
+        self.last_id = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def run_once(self):
+        """Scan students changed since the last run; returns warnings queued"""
+        with self._lock:
+            conn = get_db_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute('SELECT COALESCE(MAX(id), 0) AS max_id FROM attendance')
+                max_id = cursor.fetchone()['max_id']
+                if self.last_id is not None and max_id <= self.last_id:
+                    return 0
+                report = LowAttendanceService.report(cursor, since_id=self.last_id)
+                queued = LowAttendanceService.warn(cursor, report)
+                conn.commit()
+                self.last_id = max_id
+                return queued
+            finally:
+                conn.close()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Low attendance scan failed: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='low-attendance', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+low_attendance_job = LowAttendanceJob()
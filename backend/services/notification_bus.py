@@ -0,0 +1,88 @@
+import queue
+import threading
+
+
+class Subscription:
+    def __init__(self, user_id, max_pending):
+        self.user_id = str(user_id)
+        self.events = queue.Queue(maxsize=max_pending)
+        # Set when the client fell too far behind; it is disconnected and
+        # resumes from the database with Last-Event-ID.
+        self.overflowed = False
+
+
+class NotificationBus:
+    """In-process pub/sub feeding the notification SSE stream.
+
+    NotificationService publishes every notification it writes here, keyed
+    by the recipient's user id. Writes made on a caller's connection are
+    held with ``defer`` until the caller commits and calls ``flush`` (or
+    ``discard`` on rollback), so subscribers never see rolled-back rows.
+    """
+
+    def __init__(self, max_connections=1000, max_per_user=3, max_pending=100, heartbeat_seconds=15):
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.max_pending = max_pending
+        self.heartbeat_seconds = heartbeat_seconds
+        self._subscribers = {}
+        self._count = 0
+        self._deferred = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """New subscription, or None when a connection limit is reached"""
+        user_id = str(user_id)
+        with self._lock:
+            subs = self._subscribers.setdefault(user_id, set())
+            if self._count >= self.max_connections or len(subs) >= self.max_per_user:
+                return None
+            sub = Subscription(user_id, self.max_pending)
+            subs.add(sub)
+            self._count += 1
+            return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs and sub in subs:
+                subs.discard(sub)
+                self._count -= 1
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def publish(self, events):
+        """Deliver notification dicts (each with 'id' and 'user_id')"""
+        with self._lock:
+            for event in events:
+                for sub in list(self._subscribers.get(str(event['user_id']), ())):
+                    try:
+                        sub.events.put_nowait(event)
+                    except queue.Full:
+                        sub.overflowed = True
+                        self._subscribers[sub.user_id].discard(sub)
+                        self._count -= 1
+                        if not self._subscribers[sub.user_id]:
+                            del self._subscribers[sub.user_id]
+                            break
+
+    def defer(self, conn, events):
+        with self._lock:
+            self._deferred.setdefault(id(conn), []).extend(events)
+
+    def flush(self, conn):
+        """Publish events written on ``conn`` once its transaction committed"""
+        with self._lock:
+            events = self._deferred.pop(id(conn), [])
+        self.publish(events)
+
+    def discard(self, conn):
+        with self._lock:
+            self._deferred.pop(id(conn), None)
+
+    def stats(self):
+        with self._lock:
+            return {'connections': self._count, 'users': len(self._subscribers)}
+
+
+notification_bus = NotificationBus()
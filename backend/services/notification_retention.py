@@ -0,0 +1,154 @@
+import json
+import threading
+import zlib
+from models.database import get_db_connection
+from config import Config
+
+
+class NotificationRetention:
+    """Archive and compact the notifications table in small batches.
+
+    Read notifications older than ``days`` move to ``notifications_archive``
+    as zlib-compressed JSON (one archive row per user per batch), and older
+    duplicates of the rolling low-attendance warning are dropped in favour of
+    the newest one. Every batch is its own short transaction, so the job never
+    holds the write lock for long.
+    """
+
+    ARCHIVE_COLUMNS = ('id', 'user_id', 'title', 'message', 'type', 'related_id', 'is_read', 'created_at')
+
+    def __init__(self, days=None, batch_size=None):
+        self.days = Config.NOTIFICATION_RETENTION_DAYS if days is None else days
+        self.batch_size = batch_size or Config.NOTIFICATION_RETENTION_BATCH
+
+    def archive_batch(self, conn):
+        """Archive one batch of old read notifications; returns rows moved"""
+        cursor = conn.cursor()
+        # Take the write lock before choosing the batch, so jobs in several
+        # server processes never archive the same rows twice
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(f'''
+            SELECT {', '.join(self.ARCHIVE_COLUMNS)}
+            FROM notifications
+            WHERE is_read = TRUE
+              AND created_at < DATETIME('now', '-' || ? || ' days')
+            ORDER BY id
+            LIMIT ?
+        ''', (self.days, self.batch_size))
+        rows = [dict(r) for r in cursor.fetchall()]
+        if not rows:
+            conn.rollback()
+            return 0
+
+        by_user = {}
+        for row in rows:
+            by_user.setdefault(row['user_id'], []).append(row)
+
+        try:
+            cursor.executemany('''
+                INSERT INTO notifications_archive (user_id, first_id, last_id, row_count, payload)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [
+                (user_id, items[0]['id'], items[-1]['id'], len(items),
+                 zlib.compress(json.dumps(items, default=str).encode()))
+                for user_id, items in by_user.items()
+            ])
+            cursor.executemany('DELETE FROM notifications WHERE id = ?', [(r['id'],) for r in rows])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(rows)
+
+    def collapse_batch(self, conn):
+        """Drop superseded low-attendance warnings, keeping each user's newest"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                DELETE FROM notifications
+                WHERE id IN (
+                    SELECT n.id
+                    FROM notifications n
+                    WHERE n.type = 'attendance_warning'
+                      AND n.id < (
+                          SELECT MAX(m.id) FROM notifications m
+                          WHERE m.user_id = n.user_id AND m.type = 'attendance_warning'
+                      )
+                    LIMIT ?
+                )
+            ''', (self.batch_size,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return cursor.rowcount
+
+    def run(self, max_batches=None):
+        """Run until nothing is left (or ``max_batches``); returns a report"""
+        report = {'archived': 0, 'collapsed': 0, 'batches': 0}
+        conn = get_db_connection()
+        try:
+            for key, step in (('collapsed', self.collapse_batch), ('archived', self.archive_batch)):
+                while max_batches is None or report['batches'] < max_batches:
+                    moved = step(conn)
+                    if not moved:
+                        break
+                    report[key] += moved
+                    report['batches'] += 1
+                    if moved < self.batch_size:
+                        break
+        finally:
+            conn.close()
+        report['reclaimed'] = report['archived'] + report['collapsed']
+        return report
+
+    @staticmethod
+    def archived(user_id, limit=100):
+        """Decompressed archived notifications for a user, newest first"""
+        conn = get_db_connection()
+        try:
+            rows = conn.execute('''
+                SELECT payload FROM notifications_archive
+                WHERE user_id = ?
+                ORDER BY last_id DESC
+            ''', (user_id,))
+            result = []
+            for row in rows:
+                result.extend(reversed(json.loads(zlib.decompress(row['payload']))))
+                if len(result) >= limit:
+                    break
+            return result[:limit]
+        finally:
+            conn.close()
+
+
+class RetentionJob:
+    """Background thread running NotificationRetention periodically"""
+
+    def __init__(self, interval_seconds=3600, **options):
+        self.interval_seconds = interval_seconds
+        self.options = options
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        return NotificationRetention(**self.options).run()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                report = self.run_once()
+                if report['reclaimed']:
+                    print(f"Notification retention reclaimed {report['reclaimed']} rows")
+            except Exception as e:
+                print(f"Notification retention failed: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='notification-retention', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -1,28 +1,100 @@
 from models.database import get_db_connection
+from services.notification_bus import notification_bus
+
+# Columns handed to the SSE stream for every inserted notification
+RETURNING = 'RETURNING id, user_id, title, message, type, related_id, is_read, created_at'
+# Rows per multi-row INSERT (5 parameters each, well under SQLite's limit)
+INSERT_CHUNK = 500
 
 class NotificationService:
     @staticmethod
-    def create_notification(user_id, title, message, notification_type, related_id=None):
-        """Create a new notification"""
+    def _write(conn, work, label, default=None):
+        """Run ``work(cursor)`` on the caller's connection or a fresh one.
+
+        ``work`` returns (result, inserted_rows); the rows are published to
+        the notification bus once they are committed. With ``conn`` the
+        statements join the caller's transaction: nothing is committed here,
+        errors propagate so the caller can roll back, and the caller calls
+        ``notification_bus.flush(conn)`` after its commit.
+        """
+        if conn is not None:
+            result, rows = work(conn.cursor())
+            notification_bus.defer(conn, [dict(r) for r in rows])
+            return result
+
         conn = get_db_connection()
         cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-                INSERT INTO notifications 
-                (user_id, title, message, type, related_id)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, title, message, notification_type, related_id))
-            
+            result, rows = work(cursor)
             conn.commit()
-            return cursor.lastrowid
+            notification_bus.publish([dict(r) for r in rows])
+            return result
         except Exception as e:
             conn.rollback()
-            print(f"Error creating notification: {e}")
-            return None
+            print(f"Error {label}: {e}")
+            return default
         finally:
             conn.close()
 
+    @staticmethod
+    def create_notification(user_id, title, message, notification_type, related_id=None, conn=None):
+        """Create a new notification"""
+        def work(cursor):
+            cursor.execute(f'''
+                INSERT INTO notifications 
+                (user_id, title, message, type, related_id)
+                VALUES (?, ?, ?, ?, ?)
+                {RETURNING}
+            ''', (user_id, title, message, notification_type, related_id))
+            rows = cursor.fetchall()
+            return rows[0]['id'], rows
+
+        return NotificationService._write(conn, work, 'creating notification')
+
+    @staticmethod
+    def create_notifications(notifications, conn=None):
+        """Insert many notifications in a single transaction.
+
+        ``notifications`` is an iterable of
+        (user_id, title, message, notification_type, related_id) tuples,
+        written as multi-row INSERTs of up to INSERT_CHUNK rows.
+        Returns the number of rows inserted.
+        """
+        rows = [tuple(n) for n in notifications]
+        if not rows:
+            return 0
+
+        def work(cursor):
+            inserted = []
+            for i in range(0, len(rows), INSERT_CHUNK):
+                chunk = rows[i:i + INSERT_CHUNK]
+                values = ', '.join(['(?, ?, ?, ?, ?)'] * len(chunk))
+                cursor.execute(f'''
+                    INSERT INTO notifications 
+                    (user_id, title, message, type, related_id)
+                    VALUES {values}
+                    {RETURNING}
+                ''', [v for row in chunk for v in row])
+                inserted += cursor.fetchall()
+            return len(inserted), inserted
+
+        return NotificationService._write(conn, work, 'creating notifications', 0)
+
+    @staticmethod
+    def notify_role(role, title, message, notification_type="system", related_id=None, conn=None):
+        """Notify every user with ``role`` using a single INSERT ... SELECT"""
+        def work(cursor):
+            cursor.execute(f'''
+                INSERT INTO notifications 
+                (user_id, title, message, type, related_id)
+                SELECT id, ?, ?, ?, ? FROM users WHERE role = ?
+                {RETURNING}
+            ''', (title, message, notification_type, related_id, role))
+            inserted = cursor.fetchall()
+            return len(inserted), inserted
+
+        return NotificationService._write(conn, work, f'notifying {role}s', 0)
+
     @staticmethod
     def notify_user(user_id, title, message, notification_type="system", related_id=None):
         """
@@ -37,37 +109,35 @@ class NotificationService:
         )
     
     @staticmethod
-    def notify_class_scheduled(teacher_id, class_schedule_data):
-        """Notify teacher about new class schedule"""
-        title = "New Class Scheduled"
+    def class_scheduled_notification(teacher_id, class_schedule_data):
+        """(user_id, title, message, type, related_id) row for a scheduled class"""
         message = (
             f"Class scheduled for {class_schedule_data['day_of_week']} at "
             f"{class_schedule_data['start_time']} - {class_schedule_data['subject_name']}"
         )
-        
+        return (teacher_id, "New Class Scheduled", message, 'class_scheduled', class_schedule_data.get('id'))
+
+    @staticmethod
+    def notify_class_scheduled(teacher_id, class_schedule_data):
+        """Notify teacher about new class schedule"""
         return NotificationService.create_notification(
-            user_id=teacher_id,
-            title=title,
-            message=message,
-            notification_type='class_scheduled',
-            related_id=class_schedule_data.get('id')
+            *NotificationService.class_scheduled_notification(teacher_id, class_schedule_data)
         )
     
     @staticmethod
-    def notify_attendance_request(teacher_id, request_data):
-        """Notify teacher about new attendance request"""
-        title = "New Attendance Request"
+    def attendance_request_notification(teacher_id, request_data):
+        """(user_id, title, message, type, related_id) row for a new attendance request"""
         message = (
             f"{request_data['student_name']} from {request_data['department']} - "
             f"{request_data['subject']} requests attendance for {request_data['request_date']}"
         )
-        
+        return (teacher_id, "New Attendance Request", message, 'attendance_request', request_data.get('id'))
+
+    @staticmethod
+    def notify_attendance_request(teacher_id, request_data):
+        """Notify teacher about new attendance request"""
         return NotificationService.create_notification(
-            user_id=teacher_id,
-            title=title,
-            message=message,
-            notification_type='attendance_request',
-            related_id=request_data.get('id')
+            *NotificationService.attendance_request_notification(teacher_id, request_data)
         )
 
     @staticmethod
@@ -120,52 +190,14 @@ class NotificationService:
             conn.close()
     
     @staticmethod
-    def notify_admins(title, message, notification_type="system", related_id=None):
-        """Notify all admins by creating a notification per-admin"""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute("SELECT id FROM users WHERE role = 'admin'")
-            admins = cursor.fetchall()
-
-            for admin in admins:
-                NotificationService.create_notification(
-                    user_id=admin['id'],
-                    title=title,
-                    message=message,
-                    notification_type=notification_type,
-                    related_id=related_id
-                )
-
-        except Exception as e:
-            print(f"Error notifying admins: {e}")
-        finally:
-            conn.close()
+    def notify_admins(title, message, notification_type="system", related_id=None, conn=None):
+        """Notify all admins in one write"""
+        return NotificationService.notify_role('admin', title, message, notification_type, related_id, conn)
 
     @staticmethod
-    def notify_all_teachers(title, message, notification_type="system", related_id=None):
-        """Notify all teachers by creating a notification per-teacher"""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute("SELECT DISTINCT u.id FROM users u WHERE u.role = 'teacher'")
-            teachers = cursor.fetchall()
-
-            for teacher in teachers:
-                NotificationService.create_notification(
-                    user_id=teacher['id'],
-                    title=title,
-                    message=message,
-                    notification_type=notification_type,
-                    related_id=related_id
-                )
-
-        except Exception as e:
-            print(f"Error notifying teachers: {e}")
-        finally:
-            conn.close()
+    def notify_all_teachers(title, message, notification_type="system", related_id=None, conn=None):
+        """Notify all teachers in one write"""
+        return NotificationService.notify_role('teacher', title, message, notification_type, related_id, conn)
 
     @staticmethod
     def mark_notification_as_read(notification_id):
@@ -0,0 +1,273 @@
+import json
+import threading
+import uuid
+from models.database import get_db_connection
+from services.notification_service import NotificationService
+from services.notification_bus import notification_bus
+from email_service import send_verification_email
+
+
+class Outbox:
+    """Side effects recorded in the same transaction as the change that causes them.
+
+    Request handlers call ``enqueue`` (or the ``notify*`` helpers) on their own
+    cursor before committing; ``OutboxDispatcher`` delivers the rows later.
+    A rolled-back request therefore never notifies anyone, and handler latency
+    no longer includes notification inserts or SMTP round trips.
+    """
+
+    # kind -> (handler, batch). Batch handlers get every payload of a claimed
+    # batch at once; the others are called per row.
+    handlers = {}
+    # kind -> payload fields removed once the row is delivered; rows of these
+    # kinds are deleted instead of being kept as dead letters
+    secrets = {}
+
+    @staticmethod
+    def handler(kind, batch=False, secret=()):
+        def register(fn):
+            Outbox.handlers[kind] = (fn, batch)
+            if secret:
+                Outbox.secrets[kind] = tuple(secret)
+            return fn
+        return register
+
+    @staticmethod
+    def enqueue(cursor, kind, payload, dedupe_key=None):
+        """Queue one side effect; rows with an already-queued dedupe_key are dropped"""
+        cursor.execute('''
+            INSERT OR IGNORE INTO outbox (kind, payload, dedupe_key)
+            VALUES (?, ?, ?)
+        ''', (kind, json.dumps(payload), dedupe_key))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def notify(cursor, user_id, title, message, notification_type="system", related_id=None, dedupe_key=None):
+        return Outbox.enqueue(cursor, 'notification', {
+            'user_id': user_id,
+            'title': title,
+            'message': message,
+            'type': notification_type,
+            'related_id': related_id
+        }, dedupe_key)
+
+    @staticmethod
+    def notify_many(cursor, notifications, dedupe_keys=None):
+        """Queue (user_id, title, message, type, related_id) tuples with one executemany.
+
+        ``dedupe_keys`` (parallel to ``notifications``) drops rows whose key is
+        already queued, as ``enqueue`` does; returns the number queued.
+        """
+        keys = dedupe_keys or [None] * len(notifications)
+        cursor.executemany('''
+            INSERT OR IGNORE INTO outbox (kind, payload, dedupe_key) VALUES ('notification', ?, ?)
+        ''', [(json.dumps({
+            'user_id': user_id,
+            'title': title,
+            'message': message,
+            'type': notification_type,
+            'related_id': related_id
+        }), key) for (user_id, title, message, notification_type, related_id), key in zip(notifications, keys)])
+        return cursor.rowcount
+
+    @staticmethod
+    def notify_role(cursor, role, title, message, notification_type="system", related_id=None):
+        return Outbox.enqueue(cursor, 'notify_role', {
+            'role': role,
+            'title': title,
+            'message': message,
+            'type': notification_type,
+            'related_id': related_id
+        })
+
+    @staticmethod
+    def stats(cursor):
+        cursor.execute('SELECT status, COUNT(*) AS c FROM outbox GROUP BY status')
+        return {r['status']: r['c'] for r in cursor.fetchall()}
+
+
+# ========== DELIVERY HANDLERS ==========
+@Outbox.handler('notification', batch=True)
+def _deliver_notifications(payloads, conn):
+    NotificationService.create_notifications(
+        [(p['user_id'], p['title'], p['message'], p['type'], p.get('related_id')) for p in payloads],
+        conn=conn
+    )
+
+
+@Outbox.handler('notify_role', batch=True)
+def _deliver_role_notifications(payloads, conn):
+    for p in payloads:
+        NotificationService.notify_role(p['role'], p['title'], p['message'], p['type'], p.get('related_id'), conn=conn)
+
+
+@Outbox.handler('verification_email', secret=('code',))
+def _deliver_verification_email(payload, conn):
+    if not send_verification_email(payload['email'], payload['code']):
+        raise RuntimeError(f"SMTP delivery to {payload['email']} failed")
+
+
+class OutboxDispatcher:
+    """Background thread draining the outbox in batches.
+
+    Rows are claimed with a lease so several dispatchers (threads or worker
+    processes) can run against the same database. Failed rows are retried
+    with exponential backoff and marked 'dead' after ``max_attempts``.
+    """
+
+    def __init__(self, interval_seconds=2, batch_size=100, max_attempts=5,
+                 retry_base_seconds=30, lease_seconds=120, keep_sent_days=7):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.keep_sent_days = keep_sent_days
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _claim(self, conn):
+        token = uuid.uuid4().hex
+        conn.execute('''
+            UPDATE outbox
+            SET status = 'sending',
+                claim_token = ?,
+                next_attempt_at = datetime('now', '+' || ? || ' seconds')
+            WHERE id IN (
+                SELECT id FROM outbox
+                WHERE status IN ('pending', 'sending')
+                  AND next_attempt_at <= datetime('now')
+                ORDER BY id
+                LIMIT ?
+            )
+        ''', (token, self.lease_seconds, self.batch_size))
+        conn.commit()
+        return conn.execute('''
+            SELECT id, kind, payload, attempts FROM outbox
+            WHERE claim_token = ? AND status = 'sending'
+            ORDER BY id
+        ''', (token,)).fetchall()
+
+    def _mark_sent(self, conn, kind, ids):
+        conn.executemany('''
+            UPDATE outbox SET status = 'sent', processed_at = CURRENT_TIMESTAMP, last_error = NULL
+            WHERE id = ?
+        ''', [(i,) for i in ids])
+        secret = Outbox.secrets.get(kind)
+        if secret:
+            # Sent rows are kept for a while; their secrets are not
+            conn.executemany(f'''
+                UPDATE outbox SET payload = json_remove(payload, {', '.join('?' * len(secret))})
+                WHERE id = ?
+            ''', [(*('$.' + field for field in secret), i) for i in ids])
+
+    def _mark_failed(self, conn, row, error):
+        attempts = row['attempts'] + 1
+        if attempts >= self.max_attempts and row['kind'] in Outbox.secrets:
+            # Dead letters are kept indefinitely; drop rows carrying secrets
+            print(f"Outbox delivery {row['id']} ({row['kind']}) dropped after {attempts} attempts: {error}")
+            conn.execute('DELETE FROM outbox WHERE id = ?', (row['id'],))
+        elif attempts >= self.max_attempts:
+            conn.execute('''
+                UPDATE outbox SET status = 'dead', attempts = ?, last_error = ?, processed_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (attempts, str(error), row['id']))
+        else:
+            delay = self.retry_base_seconds * (2 ** (attempts - 1))
+            conn.execute('''
+                UPDATE outbox
+                SET status = 'pending', attempts = ?, last_error = ?,
+                    next_attempt_at = datetime('now', '+' || ? || ' seconds')
+                WHERE id = ?
+            ''', (attempts, str(error), delay, row['id']))
+        conn.commit()
+
+    def _deliver(self, conn, rows):
+        """Deliver rows of one kind; the delivery and the 'sent' mark share a transaction"""
+        fn, batch = Outbox.handlers.get(rows[0]['kind'], (None, False))
+        if fn is None:
+            for row in rows:
+                self._mark_failed(conn, row, f"No handler for outbox kind '{row['kind']}'")
+            return
+
+        if batch and len(rows) > 1:
+            try:
+                fn([json.loads(r['payload']) for r in rows], conn)
+                self._mark_sent(conn, rows[0]['kind'], [r['id'] for r in rows])
+                conn.commit()
+                notification_bus.flush(conn)
+                return
+            except Exception:
+                # Fall back to one row at a time to isolate the bad payload
+                conn.rollback()
+                notification_bus.discard(conn)
+
+        for row in rows:
+            payload = json.loads(row['payload'])
+            try:
+                fn([payload] if batch else payload, conn)
+                self._mark_sent(conn, row['kind'], [row['id']])
+                conn.commit()
+                notification_bus.flush(conn)
+            except Exception as e:
+                conn.rollback()
+                notification_bus.discard(conn)
+                print(f"Outbox delivery {row['id']} ({row['kind']}) failed: {e}")
+                self._mark_failed(conn, row, e)
+
+    def run_once(self):
+        """Claim and deliver one batch; returns the number of rows processed"""
+        conn = get_db_connection()
+        try:
+            rows = self._claim(conn)
+            by_kind = {}
+            for row in rows:
+                by_kind.setdefault(row['kind'], []).append(row)
+            for kind_rows in by_kind.values():
+                self._deliver(conn, kind_rows)
+
+            conn.execute('''
+                DELETE FROM outbox
+                WHERE status = 'sent' AND processed_at < datetime('now', '-' || ? || ' days')
+            ''', (self.keep_sent_days,))
+            conn.commit()
+            return len(rows)
+        finally:
+            notification_bus.discard(conn)
+            conn.close()
+
+    def drain(self):
+        """Deliver everything currently due"""
+        total = 0
+        while True:
+            processed = self.run_once()
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"Outbox dispatch failed: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='outbox-dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == '__main__':
+    # Standalone dispatcher process: python -m services.outbox
+    dispatcher = OutboxDispatcher()
+    print("Outbox dispatcher running (Ctrl+C to stop)")
+    try:
+        dispatcher._loop()
+    except KeyboardInterrupt:
+        pass
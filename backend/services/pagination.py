@@ -0,0 +1,83 @@
+from flask import jsonify, request
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+# Stands in for NULL sort keys: a row value compared with NULL is never
+# true, and this sorts before every number and string, just as NULL does
+NULL_KEY = '-1e308'
+
+
+class Page:
+    """Keyset pagination arguments for a list endpoint.
+
+    Reads ``after_id``, ``limit`` and ``fields`` from the query string. Lists
+    are walked by their existing sort order with the row id as tie-breaker,
+    so ``after_id`` is simply the id of the last row the client received and
+    every page is an index range scan instead of an OFFSET. Clients that send
+    neither ``limit`` nor ``after_id`` get the whole list, as before paging
+    existed; ``after_id`` alone pages with DEFAULT_LIMIT.
+    """
+
+    def __init__(self, args=None):
+        args = request.args if args is None else args
+        self.after_id = args.get('after_id', type=int)
+        limit = args.get('limit', type=int)
+        if limit is None and self.after_id is None:
+            self.limit = None
+        else:
+            self.limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+        fields = args.get('fields')
+        self.fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+        self.next_after_id = None
+
+    def filter(self, table, alias, order_exprs=(), descending=False):
+        """WHERE fragment (starting with AND) placing rows after ``after_id``.
+
+        ``order_exprs`` are the ORDER BY expressions preceding ``alias.id``;
+        they are evaluated for the cursor row with the same alias. If that
+        row has been deleted since the client saw it, paging carries on by
+        id alone rather than returning an empty page.
+        """
+        if not self.after_id:
+            return '', []
+        op = '<' if descending else '>'
+        if not order_exprs:
+            return f' AND {alias}.id {op} ?', [self.after_id]
+        cols = ', '.join(_keys(alias, order_exprs))
+        return (
+            f''' AND CASE WHEN EXISTS (SELECT 1 FROM {table} {alias} WHERE {alias}.id = ?)
+                THEN ({cols}) {op} (SELECT {cols} FROM {table} {alias} WHERE {alias}.id = ?)
+                ELSE {alias}.id {op} ? END''',
+            [self.after_id] * 3
+        )
+
+    def order_by(self, alias, order_exprs=(), descending=False):
+        direction = ' DESC' if descending else ''
+        return ' ORDER BY ' + ', '.join(f'{e}{direction}' for e in _keys(alias, order_exprs))
+
+    def limit_clause(self):
+        if self.limit is None:
+            return ''
+        # One extra row tells us whether there is a next page
+        return f' LIMIT {self.limit + 1}'
+
+    def rows(self, rows, id_key='id'):
+        """Trim the look-ahead row, remember the cursor and project fields"""
+        rows = [dict(r) for r in rows]
+        if self.limit is not None and len(rows) > self.limit:
+            rows = rows[:self.limit]
+            self.next_after_id = rows[-1][id_key]
+        if self.fields:
+            rows = [{k: r[k] for k in self.fields if k in r} for r in rows]
+        return rows
+
+    def response(self, payload):
+        """jsonify ``payload`` and attach the next-page cursor header"""
+        response = jsonify(payload)
+        if self.next_after_id is not None:
+            response.headers['X-Next-After-Id'] = str(self.next_after_id)
+        return response
+
+
+def _keys(alias, order_exprs):
+    return [f'COALESCE({e}, {NULL_KEY})' for e in order_exprs] + [f'{alias}.id']
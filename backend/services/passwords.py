@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class Pbkdf2Hasher:
+    """``pbkdf2_sha256$<iterations>$<salt>$<hash>``"""
+
+    scheme = 'pbkdf2_sha256'
+
+    def __init__(self, iterations=260000):
+        self.iterations = iterations
+
+    def hash(self, password):
+        salt = os.urandom(16)
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, self.iterations)
+        return f'{self.scheme}${self.iterations}${_b64(salt)}${_b64(digest)}'
+
+    def verify(self, password, encoded):
+        _, iterations, salt, digest = encoded.split('$')
+        candidate = hashlib.pbkdf2_hmac('sha256', password.encode(), _unb64(salt), int(iterations))
+        return hmac.compare_digest(candidate, _unb64(digest))
+
+    def needs_rehash(self, encoded):
+        return int(encoded.split('$')[1]) != self.iterations
+
+
+class ScryptHasher:
+    """``scrypt$<n>$<r>$<p>$<salt>$<hash>``"""
+
+    scheme = 'scrypt'
+
+    def __init__(self, n=2 ** 14, r=8, p=1):
+        self.n = n
+        self.r = r
+        self.p = p
+
+    def _derive(self, password, salt, n, r, p):
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+    def hash(self, password):
+        salt = os.urandom(16)
+        digest = self._derive(password, salt, self.n, self.r, self.p)
+        return f'{self.scheme}${self.n}${self.r}${self.p}${_b64(salt)}${_b64(digest)}'
+
+    def verify(self, password, encoded):
+        _, n, r, p, salt, digest = encoded.split('$')
+        candidate = self._derive(password, _unb64(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(candidate, _unb64(digest))
+
+    def needs_rehash(self, encoded):
+        return encoded.split('$')[1:4] != [str(self.n), str(self.r), str(self.p)]
+
+
+class LegacySha256Hasher:
+    """Unsalted hex SHA-256 used before salted hashes; verify-only"""
+
+    scheme = 'legacy'
+
+    def verify(self, password, encoded):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), encoded)
+
+    def needs_rehash(self, encoded):
+        return True
+
+
+class PasswordHasher:
+    """Hashes new passwords with the configured KDF and verifies any known format.
+
+    KDF work runs on a bounded thread pool (hashlib releases the GIL), so a
+    burst of logins queues there instead of occupying every request thread.
+    Successful verifications are remembered for ``cache_seconds`` as a keyed
+    BLAKE2 digest of (stored hash, password), so a user re-entering the same
+    password skips the KDF; a changed hash or password never matches.
+    """
+
+    def __init__(self, default, workers=4, cache_seconds=300, cache_entries=4096):
+        self.default = default
+        self.hashers = {h.scheme: h for h in (Pbkdf2Hasher(), ScryptHasher(), LegacySha256Hasher())}
+        self.hashers[default.scheme] = default
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.cache_seconds = cache_seconds
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()
+        self._cache_key = os.urandom(32)
+        self._lock = threading.Lock()
+
+    def _hasher_for(self, encoded):
+        scheme = encoded.split('$', 1)[0] if '$' in encoded else 'legacy'
+        return self.hashers.get(scheme)
+
+    def _fingerprint(self, password, encoded):
+        return hashlib.blake2b(f'{encoded}\0{password}'.encode(), key=self._cache_key, digest_size=32).digest()
+
+    def _cached(self, fingerprint):
+        with self._lock:
+            expires_at = self._cache.get(fingerprint)
+            if expires_at is None:
+                return False
+            if expires_at < time.time():
+                del self._cache[fingerprint]
+                return False
+            self._cache.move_to_end(fingerprint)
+            return True
+
+    def _remember(self, fingerprint):
+        with self._lock:
+            self._cache[fingerprint] = time.time() + self.cache_seconds
+            self._cache.move_to_end(fingerprint)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def hash(self, password):
+        return self.pool.submit(self.default.hash, password).result()
+
+    def verify(self, password, encoded):
+        if not encoded:
+            return False
+        hasher = self._hasher_for(encoded)
+        if hasher is None:
+            return False
+
+        fingerprint = self._fingerprint(password, encoded)
+        if self._cached(fingerprint):
+            return True
+        try:
+            ok = self.pool.submit(hasher.verify, password, encoded).result()
+        except ValueError:
+            # Malformed stored hash
+            return False
+        if ok:
+            self._remember(fingerprint)
+        return ok
+
+    def needs_rehash(self, encoded):
+        hasher = self._hasher_for(encoded)
+        return hasher is not self.default or hasher.needs_rehash(encoded)
+
+
+def _configured_hasher():
+    if Config.PASSWORD_HASHER == 'pbkdf2':
+        return Pbkdf2Hasher(Config.PBKDF2_ITERATIONS)
+    return ScryptHasher(n=Config.SCRYPT_N)
+
+
+passwords = PasswordHasher(_configured_hasher(), workers=Config.PASSWORD_HASH_WORKERS)
@@ -0,0 +1,281 @@
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request
+from config import Config
+from services.identity import identity
+from services.session import current_principal
+
+
+class ResponseCache:
+    """In-process LRU for read-heavy GET endpoints with tag-based invalidation.
+
+    Every entry remembers the version of each tag it was built under. Writers
+    call ``invalidate(tag, ...)`` which bumps those versions, so any entry
+    built from older data is treated as a miss on its next read. When
+    ``backing_path`` is set, entries and tag versions are also kept in a small
+    SQLite file so several worker processes share fills and invalidations.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=300, backing_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backing_path = backing_path
+        self._entries = OrderedDict()
+        self._tag_versions = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+        if backing_path:
+            self._init_backing()
+
+    # ------------------------------------------------------------------
+    # Shared SQLite backing
+    # ------------------------------------------------------------------
+    def _backing_conn(self):
+        conn = sqlite3.connect(self.backing_path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_backing(self):
+        conn = self._backing_conn()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    tag_versions TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_tags (
+                    tag TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _current_versions(self, tags):
+        if not tags:
+            return {}
+        if not self.backing_path:
+            with self._lock:
+                return {tag: self._tag_versions.get(tag, 0) for tag in tags}
+
+        conn = self._backing_conn()
+        try:
+            placeholders = ','.join('?' for _ in tags)
+            rows = conn.execute(
+                f'SELECT tag, version FROM cache_tags WHERE tag IN ({placeholders})',
+                list(tags)
+            ).fetchall()
+        finally:
+            conn.close()
+        versions = {tag: 0 for tag in tags}
+        versions.update({r['tag']: r['version'] for r in rows})
+        return versions
+
+    # ------------------------------------------------------------------
+    # Core API
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(path, args):
+        return path + '?' + '&'.join(f'{k}={v}' for k, v in sorted(args.items(multi=True)))
+
+    def snapshot(self, tags):
+        """Tag versions to store with a value computed from now on"""
+        return self._current_versions(list(tags))
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        shared = False
+        if entry is None and self.backing_path:
+            conn = self._backing_conn()
+            try:
+                row = conn.execute(
+                    'SELECT value, tag_versions, expires_at FROM cache_entries WHERE key = ?',
+                    (key,)
+                ).fetchone()
+            finally:
+                conn.close()
+            if row:
+                entry = (pickle.loads(row['value']), json.loads(row['tag_versions']), row['expires_at'])
+                shared = True
+
+        if entry is None:
+            self._count('misses')
+            return None
+
+        value, versions, expires_at = entry
+        if expires_at < now or self._current_versions(list(versions)) != versions:
+            with self._lock:
+                self._entries.pop(key, None)
+            self._count('stale')
+            self._count('misses')
+            return None
+
+        if shared:
+            self._store_local(key, entry)
+            self._count('shared_hits')
+        self._count('hits')
+        return value
+
+    def set(self, key, value, versions):
+        entry = (value, versions, time.time() + self.ttl_seconds)
+        self._store_local(key, entry)
+        if self.backing_path:
+            conn = self._backing_conn()
+            try:
+                conn.execute('''
+                    INSERT OR REPLACE INTO cache_entries (key, value, tag_versions, expires_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (key, pickle.dumps(value), json.dumps(versions), entry[2]))
+                conn.commit()
+            finally:
+                conn.close()
+
+    def _store_local(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, *tags):
+        tags = [t for t in tags if t]
+        if not tags:
+            return
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+            self._stats['invalidations'] += len(tags)
+
+        if self.backing_path:
+            conn = self._backing_conn()
+            try:
+                conn.executemany('''
+                    INSERT INTO cache_tags (tag, version) VALUES (?, 1)
+                    ON CONFLICT(tag) DO UPDATE SET version = version + 1
+                ''', [(tag,) for tag in tags])
+                conn.execute('DELETE FROM cache_entries WHERE expires_at < ?', (time.time(),))
+                conn.commit()
+            finally:
+                conn.close()
+
+    def invalidate_class(self, cursor, class_id):
+        """Invalidate everything derived from one class (teacher, department, class)"""
+        tags = ['attendance', f'class:{class_id}']
+        if class_id:
+            cursor.execute('''
+                SELECT tp.user_id AS teacher_user_id, s.department_id
+                FROM classes c
+                LEFT JOIN teacher_profiles tp ON c.teacher_id = tp.id
+                LEFT JOIN subjects s ON c.subject_id = s.id
+                WHERE c.id = ?
+            ''', (class_id,))
+            row = cursor.fetchone()
+            if row:
+                if row['teacher_user_id']:
+                    tags.append(f"teacher:{row['teacher_user_id']}")
+                if row['department_id']:
+                    tags.append(f"department:{row['department_id']}")
+        self.invalidate(*tags)
+
+    def invalidate_classes(self, cursor, class_ids):
+        """``invalidate_class`` for every class in ``class_ids`` (e.g. after enrollment changes)"""
+        for class_id in set(class_ids):
+            self.invalidate_class(cursor, class_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['shared'] = bool(self.backing_path)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Flask view decorator
+    # ------------------------------------------------------------------
+    def cached(self, tags):
+        """Cache a GET view's 200 responses under ``tags``.
+
+        ``tags`` is a list, or a callable receiving the view kwargs and
+        returning one (it can read ``request.args``).
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = self.make_key(request.path, request.args)
+                principal = current_principal()
+                if principal:
+                    # Views may fall back to the session user when ids are omitted
+                    key += f"#{principal['user_id']}"
+                hit = self.get(key)
+                if hit is not None:
+                    body, status, mimetype = hit
+                    response = current_app.response_class(body, status=status, mimetype=mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                entry_tags = tags(**kwargs) if callable(tags) else tags
+                # Versions are captured before the view runs so a write that
+                # lands mid-computation leaves this entry stale.
+                versions = self.snapshot(entry_tags)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    self.set(key, (response.get_data(), response.status_code, response.mimetype), versions)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache(
+    max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.RESPONSE_CACHE_TTL,
+    backing_path=Config.RESPONSE_CACHE_PATH
+)
+
+
+def teacher_tags(**_):
+    """Tags for teacher dashboard views keyed by the teacher's user id"""
+    teacher_id = request.args.get('teacher_id')
+    principal = current_principal()
+    if not teacher_id and principal and principal['role'] == 'teacher':
+        teacher_id = principal['user_id']
+    # Views accept a user id or a profile id; writers invalidate by user id
+    try:
+        teacher_user_id = identity.teacher_user_id(identity.resolve_teacher(teacher_id))
+    except (TypeError, ValueError):
+        teacher_user_id = None
+    return [f"teacher:{teacher_user_id or teacher_id}"]
@@ -0,0 +1,234 @@
+import bisect
+import heapq
+import threading
+from models.database import get_db_connection
+from services.etag import table_versions
+from services.identity import identity
+
+# Resources that cannot be double-booked
+DIMENSIONS = ('teacher', 'room', 'class')
+
+
+def to_minutes(value):
+    """'HH:MM' (or 'HH:MM:SS') -> minutes after midnight; None if unparseable"""
+    try:
+        parts = str(value).strip().split(':')
+        return int(parts[0]) * 60 + int(parts[1])
+    except (ValueError, IndexError):
+        return None
+
+
+def slot_keys(slot):
+    """(dimension, resource, day) keys a slot occupies (teacher_id is a teacher_profiles.id)"""
+    keys = []
+    values = {
+        'teacher': slot.get('teacher_id'),
+        'room': str(slot.get('room_number') or '').strip().lower() or None,
+        'class': slot.get('class_id')
+    }
+    for dimension in DIMENSIONS:
+        if values[dimension] not in (None, ''):
+            keys.append((dimension, str(values[dimension]), slot['day_of_week']))
+    return keys
+
+
+class IntervalIndex:
+    """Intervals of one resource on one day, sorted by start.
+
+    The longest stored duration bounds how far back an overlapping interval
+    can start, so a query is a bisect plus a scan over the few candidates.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.items = []
+        self.max_length = 0
+
+    def add(self, start, end, schedule_id):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.items.insert(i, (start, end, schedule_id))
+        self.max_length = max(self.max_length, end - start)
+
+    def overlapping(self, start, end):
+        """Ids of intervals overlapping [start, end)"""
+        found = []
+        i = bisect.bisect_left(self.starts, end) - 1
+        while i >= 0 and self.starts[i] + self.max_length > start:
+            s, e, schedule_id = self.items[i]
+            if e > start and s < end:
+                found.append(schedule_id)
+            i -= 1
+        return found
+
+
+class ConflictEngine:
+    """Per-teacher, per-room and per-class interval indexes for each weekday"""
+
+    def __init__(self, schedules=()):
+        self.indexes = {}
+        self.schedules = {}
+        for slot in schedules:
+            self.add(slot)
+
+    @staticmethod
+    def load_schedules():
+        conn = get_db_connection()
+        try:
+            rows = conn.execute('''
+                SELECT
+                    cs.id,
+                    COALESCE(cs.teacher_id, c.teacher_id) AS teacher_id,
+                    cs.room_number,
+                    cs.class_id,
+                    cs.day_of_week,
+                    cs.start_time,
+                    cs.end_time
+                FROM class_schedules cs
+                LEFT JOIN classes c ON cs.class_id = c.id
+            ''').fetchall()
+        finally:
+            conn.close()
+        slots = [dict(r) for r in rows]
+        for slot in slots:
+            # Older rows may hold the teacher's users.id; keys use profile ids
+            if slot['teacher_id'] is not None:
+                slot['teacher_id'] = identity.resolve_teacher(slot['teacher_id'], prefer_user=False) or slot['teacher_id']
+        return slots
+
+    def add(self, slot):
+        start, end = to_minutes(slot['start_time']), to_minutes(slot['end_time'])
+        if start is None or end is None or end <= start:
+            return
+        self.schedules[slot['id']] = slot
+        for key in slot_keys(slot):
+            self.indexes.setdefault(key, IntervalIndex()).add(start, end, slot['id'])
+
+    def conflicts_for(self, slot):
+        """Existing schedules a new slot would collide with, per dimension"""
+        start, end = to_minutes(slot['start_time']), to_minutes(slot['end_time'])
+        if start is None or end is None:
+            return []
+        conflicts = []
+        for key in slot_keys(slot):
+            index = self.indexes.get(key)
+            if index:
+                for schedule_id in index.overlapping(start, end):
+                    if schedule_id != slot.get('id'):
+                        conflicts.append(_describe(key, self.schedules[schedule_id]))
+        return conflicts
+
+    def sweep(self, new_slots=None):
+        """Overlapping pairs in one sweep-line pass per resource and day.
+
+        Without ``new_slots`` every conflict among stored schedules is
+        returned. With them (dicts with a unique 'id', e.g. the row number of
+        an upload), only pairs involving at least one new slot are returned,
+        which validates a whole import against the timetable and itself.
+        """
+        groups = {}
+        for slot in list(self.schedules.values()):
+            for key in slot_keys(slot):
+                groups.setdefault(key, []).append((slot, False))
+        for slot in new_slots or ():
+            for key in slot_keys(slot):
+                groups.setdefault(key, []).append((slot, True))
+
+        pairs = []
+        for key, members in groups.items():
+            events = []
+            for slot, is_new in members:
+                start, end = to_minutes(slot['start_time']), to_minutes(slot['end_time'])
+                if start is not None and end is not None and end > start:
+                    events.append((start, end, is_new, slot))
+            events.sort(key=lambda e: (e[0], e[1]))
+
+            active = []  # heap of (end, seq, is_new, slot)
+            for seq, (start, end, is_new, slot) in enumerate(events):
+                while active and active[0][0] <= start:
+                    heapq.heappop(active)
+                for _, _, other_new, other in active:
+                    if new_slots is None or is_new or other_new:
+                        pairs.append({
+                            'dimension': key[0],
+                            'resource': key[1],
+                            'day_of_week': key[2],
+                            'first': _slot_summary(other, other_new),
+                            'second': _slot_summary(slot, is_new)
+                        })
+                heapq.heappush(active, (end, seq, is_new, slot))
+        return pairs
+
+
+def _describe(key, slot):
+    return {
+        'dimension': key[0],
+        'resource': key[1],
+        'day_of_week': key[2],
+        'schedule_id': slot['id'],
+        'start_time': slot['start_time'],
+        'end_time': slot['end_time']
+    }
+
+
+def _slot_summary(slot, is_new):
+    return {
+        ('row' if is_new else 'schedule_id'): slot['id'],
+        'start_time': slot['start_time'],
+        'end_time': slot['end_time']
+    }
+
+
+class ConflictIndex:
+    """ConflictEngine for the current timetable, rebuilt when it changes.
+
+    The change counters of class_schedules and classes (table_versions)
+    tell whether the cached indexes are still current, so checks cost one
+    small query instead of loading every schedule. Writers hand their
+    committed slots to ``add``, which extends the cached engine instead of
+    forcing a reload.
+    """
+
+    TABLES = ('class_schedules', 'classes')
+
+    def __init__(self):
+        self._engine = None
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def engine(self):
+        versions = table_versions(self.TABLES)
+        with self._lock:
+            if self._engine is not None and versions is not None and versions == self._versions:
+                return self._engine
+        engine = ConflictEngine(ConflictEngine.load_schedules())
+        with self._lock:
+            self._engine = engine
+            self._versions = versions
+        return engine
+
+    def add(self, slots):
+        """Add just-committed slots (with their new ids) to the cached engine.
+
+        Only valid when those inserts are the sole changes since the engine
+        was built, i.e. class_schedules moved by ``len(slots)`` and classes
+        did not; otherwise the engine is dropped and the next check reloads.
+        """
+        versions = table_versions(self.TABLES)
+        with self._lock:
+            if self._engine is None:
+                return
+            expected = self._versions and [self._versions[0] + len(slots)] + self._versions[1:]
+            if versions is None or versions != expected:
+                self._engine = None
+                return
+            for slot in slots:
+                self._engine.add(slot)
+            self._versions = versions
+
+    def invalidate(self):
+        with self._lock:
+            self._engine = None
+
+
+conflict_index = ConflictIndex()
@@ -0,0 +1,154 @@
+import csv
+import io
+from services.notification_service import NotificationService
+from services.schedule_conflicts import conflict_index
+
+REQUIRED_FIELDS = ('teacher_id', 'department_id', 'subject_id', 'day_of_week', 'start_time', 'end_time', 'created_by')
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+# Rows per multi-row INSERT (8 parameters each) and ids per IN (...) lookup
+INSERT_CHUNK = 500
+LOOKUP_CHUNK = 500
+
+
+def parse_csv(text):
+    """Schedule dicts from CSV text with a header row of schedule field names"""
+    reader = csv.DictReader(io.StringIO(text))
+    return [{k.strip(): (v or '').strip() for k, v in row.items() if k} for row in reader]
+
+
+class ScheduleImport:
+    """Validate and insert a timetable upload in a handful of statements.
+
+    Referenced teachers, departments and subjects are loaded with one
+    ``IN (...)`` query per table, rows are checked in memory, and valid rows
+    are written with chunked multi-row INSERTs together with their teacher
+    notifications. Rows that double-book a teacher, room or class (against
+    the timetable or earlier rows of the upload) are rejected in one
+    sweep-line pass. With ``atomic`` any invalid row aborts the whole import;
+    otherwise valid rows are committed and invalid ones reported.
+    """
+
+    def __init__(self, schedules, atomic=False):
+        self.schedules = schedules
+        self.atomic = atomic
+        self.errors = []
+        self.valid = []
+        # Inserted rows as conflict slots, for ConflictIndex.add after commit
+        self.slots = []
+
+    @staticmethod
+    def _fetch(cursor, sql, ids):
+        ids = list(ids)
+        found = {}
+        for i in range(0, len(ids), LOOKUP_CHUNK):
+            chunk = ids[i:i + LOOKUP_CHUNK]
+            cursor.execute(sql.format(', '.join('?' * len(chunk))), chunk)
+            found.update({str(r['id']): r for r in cursor.fetchall()})
+        return found
+
+    def _error(self, index, message):
+        self.errors.append({'row': index, 'error': message})
+
+    def validate(self, cursor):
+        def ids(field):
+            return {str(s[field]) for s in self.schedules if isinstance(s, dict) and s.get(field)}
+
+        teachers = self._fetch(cursor, 'SELECT id, user_id FROM teacher_profiles WHERE id IN ({})', ids('teacher_id'))
+        departments = self._fetch(cursor, 'SELECT id, name FROM departments WHERE id IN ({})', ids('department_id'))
+        subjects = self._fetch(cursor, 'SELECT id, name FROM subjects WHERE id IN ({})', ids('subject_id'))
+
+        for index, schedule in enumerate(self.schedules):
+            if not isinstance(schedule, dict):
+                self._error(index, 'Schedule must be an object')
+                continue
+            missing = [f for f in REQUIRED_FIELDS if not schedule.get(f)]
+            if missing:
+                self._error(index, f"Schedule missing fields: {', '.join(missing)}")
+                continue
+            teacher = teachers.get(str(schedule['teacher_id']))
+            if not teacher:
+                self._error(index, f"Teacher not found for ID: {schedule['teacher_id']}")
+                continue
+            department = departments.get(str(schedule['department_id']))
+            if not department:
+                self._error(index, f"Department not found for ID: {schedule['department_id']}")
+                continue
+            subject = subjects.get(str(schedule['subject_id']))
+            if not subject:
+                self._error(index, f"Subject not found for ID: {schedule['subject_id']}")
+                continue
+            if schedule['day_of_week'] not in DAYS:
+                self._error(index, f"Invalid day_of_week: {schedule['day_of_week']}")
+                continue
+
+            self.valid.append((schedule, teacher['user_id'], department['name'], subject['name']))
+
+        self.check_conflicts()
+
+    def check_conflicts(self):
+        invalid = {e['row'] for e in self.errors}
+        rows = [i for i in range(len(self.schedules)) if i not in invalid]
+        slots = [dict(v[0], id=row) for row, v in zip(rows, self.valid)]
+
+        blamed = {}
+        for pair in conflict_index.engine().sweep(slots):
+            first, second = pair['first'], pair['second']
+            # Blame the later upload row; existing schedules are never blamed
+            row = max(first.get('row', -1), second.get('row', -1))
+            other = first if second.get('row') == row else second
+            against = f"row {other['row']}" if 'row' in other else f"schedule {other['schedule_id']}"
+            blamed.setdefault(row, f"{pair['dimension'].capitalize()} conflict on {pair['day_of_week']} "
+                                   f"{other['start_time']}-{other['end_time']} with {against}")
+        if not blamed:
+            return
+        for row, message in blamed.items():
+            self._error(row, message)
+        self.errors.sort(key=lambda e: e['row'])
+        self.valid = [v for row, v in zip(rows, self.valid) if row not in blamed]
+
+    def insert(self, conn):
+        """Insert the valid rows on ``conn`` (not committed); returns created summaries"""
+        cursor = conn.cursor()
+        created = []
+        notifications = []
+        for i in range(0, len(self.valid), INSERT_CHUNK):
+            chunk = self.valid[i:i + INSERT_CHUNK]
+            values = ', '.join(['(?, ?, ?, ?, ?, ?, ?, ?)'] * len(chunk))
+            cursor.execute(f'''
+                INSERT INTO class_schedules
+                (teacher_id, department_id, subject_id, day_of_week, start_time, end_time, room_number, created_by)
+                VALUES {values}
+                RETURNING id
+            ''', [v for s, _, _, _ in chunk for v in (
+                s['teacher_id'], s['department_id'], s['subject_id'], s['day_of_week'],
+                s['start_time'], s['end_time'], s.get('room_number', ''), s['created_by']
+            )])
+            ids = sorted(r['id'] for r in cursor.fetchall())
+
+            for schedule_id, (s, teacher_user_id, department_name, subject_name) in zip(ids, chunk):
+                self.slots.append(dict(s, id=schedule_id, class_id=None, room_number=s.get('room_number', '')))
+                notifications.append((
+                    teacher_user_id,
+                    "New Class Scheduled",
+                    f"Class scheduled for {s['day_of_week']} at {s['start_time']} - {subject_name} ({department_name})",
+                    'class_scheduled',
+                    schedule_id
+                ))
+                created.append({
+                    'schedule_id': schedule_id,
+                    'teacher_id': s['teacher_id'],
+                    'subject': subject_name,
+                    'department': department_name,
+                    'day': s['day_of_week'],
+                    'time': f"{s['start_time']} - {s['end_time']}"
+                })
+
+        NotificationService.create_notifications(notifications, conn=conn)
+        return created
+
+    def run(self, conn):
+        """Validate and insert; returns the created summaries (empty when atomic and invalid)"""
+        self.validate(conn.cursor())
+        if not self.valid or (self.atomic and self.errors):
+            return []
+        return self.insert(conn)
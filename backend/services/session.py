@@ -0,0 +1,117 @@
+import uuid
+from flask import g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from config import Config
+from services.identity import identity
+from services.ttl_store import create_store
+
+# Placeholder shipped in config.py; tokens signed with it could be forged
+DEFAULT_SECRET_KEY = 'your-secret-key-here'
+
+
+class SessionTokens:
+    """Signed, stateless session tokens.
+
+    A token carries the user id, role and resolved profile ids, signed with
+    the app secret. Verifying one is an HMAC check plus a primary-key lookup
+    in the revocation list (a TTL store whose entries expire together with
+    the tokens they revoke), so handlers get the caller's identity without
+    touching users or the profile tables.
+
+    Without a real secret (unset or the config placeholder) no tokens are
+    issued or accepted.
+    """
+
+    def __init__(self, secret_key, max_age_seconds, revoked):
+        self.serializer = URLSafeTimedSerializer(secret_key, salt='smartattend-session')
+        self.max_age_seconds = max_age_seconds
+        self.revoked = revoked
+        self.enabled = bool(secret_key) and secret_key != DEFAULT_SECRET_KEY
+        if not self.enabled:
+            print("SECRET_KEY is not set; session tokens are disabled")
+
+    def issue(self, user):
+        """Token for a user dict as returned by get_user_by_credentials, or None when disabled"""
+        if not self.enabled:
+            return None
+        return self.serializer.dumps({
+            'uid': user['id'],
+            'role': user['role'],
+            'tid': identity.teacher_profile_id(user['id']) if user['role'] == 'teacher' else None,
+            'sid': identity.student_id(user['id']) if user['role'] == 'student' else None,
+            'jti': uuid.uuid4().hex
+        })
+
+    def _load(self, token):
+        if not self.enabled:
+            return None
+        try:
+            return self.serializer.loads(token, max_age=self.max_age_seconds)
+        except BadSignature:
+            # Also covers SignatureExpired
+            return None
+
+    def verify(self, token):
+        """Principal dict for a valid, unrevoked token, or None"""
+        data = self._load(token)
+        if data is None or self.revoked.get(data['jti']) is not None:
+            return None
+        return {
+            'user_id': data['uid'],
+            'role': data['role'],
+            'teacher_profile_id': data.get('tid'),
+            'student_id': data.get('sid'),
+            'jti': data['jti']
+        }
+
+    def revoke(self, token):
+        data = self._load(token)
+        if data is None:
+            return False
+        self.revoked.set(data['jti'], {'uid': data['uid']}, self.max_age_seconds)
+        return True
+
+
+sessions = SessionTokens(
+    Config.SECRET_KEY,
+    Config.SESSION_TOKEN_MAX_AGE,
+    create_store('revoked_sessions')
+)
+
+
+def request_token():
+    """Token from ``Authorization: Bearer <token>`` or ``X-Session-Token``"""
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        return auth[7:].strip()
+    return request.headers.get('X-Session-Token')
+
+
+def current_principal():
+    """Principal of the request's session token, or None.
+
+    The token is verified (including the revocation lookup) the first time a
+    request asks for it, so endpoints that never use the session pay nothing.
+    """
+    if 'principal' not in g:
+        token = request_token()
+        g.principal = sessions.verify(token) if token else None
+    return g.principal
+
+
+def user_id_or_principal(value, role):
+    """``value`` if given, else the signed-in user's id when they have ``role``"""
+    if value:
+        return value
+    principal = current_principal()
+    if principal and principal['role'] == role:
+        return principal['user_id']
+    return None
+
+
+def teacher_profile_for(teacher_user_id):
+    """teacher_profiles.id for a teacher's user id, taken from the session when it is theirs"""
+    principal = current_principal()
+    if principal and principal['teacher_profile_id'] and str(principal['user_id']) == str(teacher_user_id):
+        return principal['teacher_profile_id']
+    return identity.teacher_profile_id(teacher_user_id)
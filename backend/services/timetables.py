@@ -0,0 +1,192 @@
+import json
+from models.database import get_db_connection
+from services.etag import table_versions
+
+# Tables a timetable document is derived from; any write to them (counted in
+# table_versions) makes stored documents stale.
+SOURCE_TABLES = ('class_schedules', 'classes', 'departments', 'enrollment', 'subjects', 'teacher_subjects')
+
+DAY_ORDER = '''
+    CASE cs.day_of_week
+        WHEN 'Monday' THEN 1
+        WHEN 'Tuesday' THEN 2
+        WHEN 'Wednesday' THEN 3
+        WHEN 'Thursday' THEN 4
+        WHEN 'Friday' THEN 5
+        WHEN 'Saturday' THEN 6
+        WHEN 'Sunday' THEN 7
+    END
+'''
+
+
+class Timetables:
+    """Materialized weekly timetables stored as JSON rows.
+
+    A document is keyed by (kind, owner_id) and stamped with the change
+    counters of SOURCE_TABLES it was built from. ``get`` is one indexed
+    statement that only returns the document while the stamp is current;
+    otherwise the document is rebuilt with the registered builder and
+    stored, so the multi-join queries run once per change, not per view.
+    """
+
+    builders = {}
+
+    @staticmethod
+    def builder(kind):
+        def register(fn):
+            Timetables.builders[kind] = fn
+            return fn
+        return register
+
+    @staticmethod
+    def _stamp():
+        versions = table_versions(SOURCE_TABLES)
+        return '.'.join(str(v) for v in versions) if versions else None
+
+    @staticmethod
+    def get(kind, owner_id):
+        conn = get_db_connection()
+        try:
+            placeholders = ','.join('?' for _ in SOURCE_TABLES)
+            row = conn.execute(f'''
+                SELECT document FROM timetables
+                WHERE kind = ? AND owner_id = ?
+                  AND stamp = (
+                      SELECT group_concat(version, '.') FROM (
+                          SELECT version FROM table_versions
+                          WHERE table_name IN ({placeholders})
+                          ORDER BY CASE table_name {' '.join(f"WHEN '{t}' THEN {i}" for i, t in enumerate(SOURCE_TABLES))} END
+                      )
+                  )
+            ''', (kind, owner_id, *SOURCE_TABLES)).fetchone()
+            if row:
+                return json.loads(row['document'])
+
+            # Stamp first: a write landing during the build leaves the row stale
+            stamp = Timetables._stamp()
+            document = Timetables.builders[kind](conn.cursor(), owner_id)
+            conn.execute('''
+                INSERT INTO timetables (kind, owner_id, document, stamp, built_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(kind, owner_id) DO UPDATE SET
+                    document = excluded.document,
+                    stamp = excluded.stamp,
+                    built_at = excluded.built_at
+            ''', (kind, owner_id, json.dumps(document), stamp))
+            conn.commit()
+            return document
+        finally:
+            conn.close()
+
+
+# ========== BUILDERS ==========
+@Timetables.builder('teacher_week')
+def _teacher_week(cursor, teacher_profile_id):
+    """Teacher dashboard grid: scheduled slots, then classes without a slot"""
+    cursor.execute(f'''
+        SELECT
+            cs.day_of_week as day,
+            cs.start_time,
+            cs.end_time,
+            COALESCE(c.room, 'TBA') as room,
+            COALESCE(s.name, '') as subject,
+            COALESCE(d.name, '') as department
+        FROM class_schedules cs
+        JOIN classes c ON cs.class_id = c.id
+        LEFT JOIN subjects s ON c.subject_id = s.id
+        LEFT JOIN departments d ON s.department_id = d.id
+        WHERE c.teacher_id = ?
+        ORDER BY {DAY_ORDER}, cs.start_time
+    ''', (teacher_profile_id,))
+
+    schedule = [{
+        'id': f"schedule_{row['day']}_{row['start_time']}",
+        'day': row['day'],
+        'time': f"{row['start_time']} - {row['end_time']}",
+        'subject': row['subject'],
+        'room': row['room'],
+        'department': row['department'],
+        'dept': row['department']  # Add dept alias for consistency
+    } for row in cursor.fetchall()]
+
+    cursor.execute('''
+        SELECT
+            c.id as id,
+            c.class_name as subject,
+            COALESCE(c.room, 'TBA') as room
+        FROM classes c
+        WHERE c.teacher_id = ?
+        AND NOT EXISTS (
+            SELECT 1 FROM class_schedules cs
+            WHERE cs.class_id = c.id
+        )
+    ''', (teacher_profile_id,))
+
+    for cls in cursor.fetchall():
+        schedule.append({
+            'id': f"class_{cls['id']}",
+            'day': 'Not Scheduled',
+            'time': 'TBA',
+            'subject': cls['subject'],
+            'room': cls['room'],
+            'department': 'Computer Science',
+            'dept': 'Computer Science'
+        })
+
+    return {'schedule': schedule, 'count': len(schedule)}
+
+
+@Timetables.builder('teacher_slots')
+def _teacher_slots(cursor, teacher_id):
+    """Admin-created slots assigned to a teacher (class_schedules.teacher_id)"""
+    cursor.execute(f'''
+        SELECT
+            cs.id,
+            cs.day_of_week,
+            cs.start_time,
+            cs.end_time,
+            cs.room_number,
+            d.name as department_name,
+            s.name as subject_name
+        FROM class_schedules cs
+        JOIN departments d ON cs.department_id = d.id
+        JOIN subjects s ON cs.subject_id = s.id
+        WHERE cs.teacher_id = ?
+        ORDER BY {DAY_ORDER}, cs.start_time
+    ''', (teacher_id,))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+@Timetables.builder('student_week')
+def _student_week(cursor, student_id):
+    """Slots of every class the student is enrolled in"""
+    cursor.execute(f'''
+        SELECT DISTINCT
+            cs.id,
+            cs.day_of_week as day,
+            cs.start_time,
+            cs.end_time,
+            c.id as class_id,
+            COALESCE(NULLIF(cs.room_number, ''), c.room, 'TBA') as room,
+            COALESCE(s.name, c.class_name) as subject,
+            COALESCE(d.name, '') as department
+        FROM enrollment e
+        JOIN classes c ON e.class_id = c.id
+        JOIN class_schedules cs ON cs.class_id = c.id
+            OR (cs.class_id IS NULL AND cs.teacher_id = c.teacher_id AND cs.subject_id = c.subject_id)
+        LEFT JOIN subjects s ON s.id = COALESCE(cs.subject_id, c.subject_id)
+        LEFT JOIN departments d ON s.department_id = d.id
+        WHERE e.student_id = ?
+        ORDER BY {DAY_ORDER}, cs.start_time
+    ''', (student_id,))
+
+    schedule = [{
+        'id': row['id'],
+        'day': row['day'],
+        'time': f"{row['start_time']} - {row['end_time']}",
+        'class_id': row['class_id'],
+        'subject': row['subject'],
+        'room': row['room'],
+        'department': row['department']
+    } for row in cursor.fetchall()]
+    return {'schedule': schedule, 'count': len(schedule)}
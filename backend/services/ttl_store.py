@@ -0,0 +1,199 @@
+import json
+from abc import ABC, abstractmethod
+import threading
+import time
+from config import Config
+from models.database import get_db_connection
+
+
+class TTLStore(ABC):
+    """Key/value store whose entries expire after a time-to-live.
+
+    Values are JSON-serialisable dicts. Each entry also carries an attempt
+    counter that ``incr_attempts`` bumps atomically, so limits like "three
+    wrong codes" hold even when requests land on different workers.
+    """
+
+    @abstractmethod
+    def get(self, key):
+        """(value, attempts) for a live entry, or None"""
+
+    @abstractmethod
+    def set(self, key, value, ttl_seconds):
+        """Store ``value`` and reset its attempt counter"""
+
+    @abstractmethod
+    def update(self, key, value):
+        """Replace the value of a live entry, keeping its expiry and attempts"""
+
+    @abstractmethod
+    def incr_attempts(self, key):
+        """Increment and return the attempt counter, or None if the entry is gone"""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remove the entry if present"""
+
+    @abstractmethod
+    def sweep(self):
+        """Drop expired entries; returns how many were removed"""
+
+
+class MemoryTTLStore(TTLStore):
+    """Per-process store, for tests and single-worker development"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._entries.get(key)
+        if entry and entry['expires_at'] <= time.time():
+            del self._entries[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return (dict(entry['value']), entry['attempts']) if entry else None
+
+    def set(self, key, value, ttl_seconds):
+        with self._lock:
+            self._entries[key] = {
+                'value': dict(value),
+                'attempts': 0,
+                'expires_at': time.time() + ttl_seconds
+            }
+
+    def update(self, key, value):
+        with self._lock:
+            entry = self._live(key)
+            if not entry:
+                return False
+            entry['value'] = dict(value)
+            return True
+
+    def incr_attempts(self, key):
+        with self._lock:
+            entry = self._live(key)
+            if not entry:
+                return None
+            entry['attempts'] += 1
+            return entry['attempts']
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            expired = [k for k, e in self._entries.items() if e['expires_at'] <= now]
+            for key in expired:
+                del self._entries[key]
+            return len(expired)
+
+
+class SQLiteTTLStore(TTLStore):
+    """Store backed by the ttl_store table, shared by every worker process.
+
+    Each call is a single statement, so reads and attempt increments are
+    atomic without holding locks across requests.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def _execute(self, sql, params):
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(sql, params)
+            rows = cursor.fetchall()
+            conn.commit()
+            return rows, cursor.rowcount
+        finally:
+            conn.close()
+
+    def get(self, key):
+        rows, _ = self._execute('''
+            SELECT value, attempts FROM ttl_store
+            WHERE namespace = ? AND key = ? AND expires_at > ?
+        ''', (self.namespace, key, time.time()))
+        return (json.loads(rows[0]['value']), rows[0]['attempts']) if rows else None
+
+    def set(self, key, value, ttl_seconds):
+        self._execute('''
+            INSERT INTO ttl_store (namespace, key, value, attempts, expires_at)
+            VALUES (?, ?, ?, 0, ?)
+            ON CONFLICT(namespace, key) DO UPDATE SET
+                value = excluded.value,
+                attempts = 0,
+                expires_at = excluded.expires_at
+        ''', (self.namespace, key, json.dumps(value), time.time() + ttl_seconds))
+
+    def update(self, key, value):
+        _, count = self._execute('''
+            UPDATE ttl_store SET value = ?
+            WHERE namespace = ? AND key = ? AND expires_at > ?
+        ''', (json.dumps(value), self.namespace, key, time.time()))
+        return count > 0
+
+    def incr_attempts(self, key):
+        rows, _ = self._execute('''
+            UPDATE ttl_store SET attempts = attempts + 1
+            WHERE namespace = ? AND key = ? AND expires_at > ?
+            RETURNING attempts
+        ''', (self.namespace, key, time.time()))
+        return rows[0]['attempts'] if rows else None
+
+    def delete(self, key):
+        _, count = self._execute(
+            'DELETE FROM ttl_store WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        )
+        return count > 0
+
+    def sweep(self):
+        _, count = self._execute(
+            'DELETE FROM ttl_store WHERE namespace = ? AND expires_at <= ?',
+            (self.namespace, time.time())
+        )
+        return count
+
+
+def create_store(namespace):
+    """Store for ``namespace`` using the backend chosen by TTL_STORE_BACKEND"""
+    if Config.TTL_STORE_BACKEND == 'memory':
+        return MemoryTTLStore()
+    return SQLiteTTLStore(namespace)
+
+
+class TTLSweeper:
+    """Background thread removing expired entries from the given stores"""
+
+    def __init__(self, stores, interval_seconds=None):
+        self.stores = list(stores)
+        self.interval_seconds = interval_seconds or Config.TTL_SWEEP_INTERVAL
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        return sum(store.sweep() for store in self.stores)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"TTL sweep failed: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='ttl-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
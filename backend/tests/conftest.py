@@ -0,0 +1,34 @@
+import os
+import shutil
+import pytest
+
+# Session tokens are disabled under the placeholder secret in config.py
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+# Tests drive the outbox and other jobs explicitly
+os.environ.setdefault('BACKGROUND_WORKERS', '0')
+
+import models.database as database
+from services.response_cache import response_cache
+from services.identity import identity
+from services.schedule_conflicts import conflict_index
+from services.active_slots import active_slots
+from services.class_resolution import class_resolver
+from services.catalogue import catalogue
+from services.analytics import analytics
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Run against a migrated copy of the bundled development database"""
+    db_path = tmp_path / 'smartattend.db'
+    shutil.copy(database.DB_PATH, db_path)
+    monkeypatch.setattr(database, 'DB_PATH', str(db_path))
+    database.init_db()
+    response_cache.clear()
+    identity.invalidate()
+    conflict_index.invalidate()
+    active_slots.invalidate()
+    class_resolver.invalidate()
+    catalogue.invalidate()
+    analytics.invalidate()
+    return str(db_path)
@@ -0,0 +1,23 @@
+# Kiosk lookup of the slot running now in a room
+from app import app
+from models.database import get_db_connection
+
+
+def test_active_slot_by_room(temp_db):
+    client = app.test_client()
+    conn = get_db_connection()
+    conn.execute('''INSERT INTO class_schedules (class_id, day_of_week, start_time, end_time, room_number, created_by)
+                    VALUES (1, 'Friday', '09:50', '11:05', 'Lab-7', 1)''')
+    enrolled = sorted(r[0] for r in conn.execute('SELECT student_id FROM enrollment WHERE class_id = 1'))
+    conn.commit()
+    conn.close()
+
+    # 2026-10-23 is a Friday
+    r = client.get('/api/schedules/active?room=lab-7&at=2026-10-23T11:04')
+    active = r.get_json()['active']
+    assert len(active) == 1
+    assert active[0]['class_id'] == 1 and active[0]['student_ids'] == enrolled
+
+    assert client.get('/api/schedules/active?room=lab-7&at=2026-10-23T11:05').get_json()['active'] == []
+    assert client.get('/api/schedules/active?room=lab-7&at=2026-10-22T10:00').get_json()['active'] == []
+    assert client.get('/api/schedules/active').status_code == 400
@@ -0,0 +1,66 @@
+# Vectorized analytics must agree with the grouped SQL they replace
+from app import app
+from models.database import get_db_connection
+
+
+def _sql(teacher_profile_id):
+    conn = get_db_connection()
+    subjects = conn.execute('''
+        SELECT
+            COALESCE(s.name, c.class_name) as subject_name,
+            COALESCE(d.name, '') as department_name,
+            COUNT(*) as total,
+            SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) as present_count
+        FROM attendance a
+        JOIN classes c ON a.class_id = c.id
+        LEFT JOIN subjects s ON c.subject_id = s.id
+        LEFT JOIN departments d ON s.department_id = d.id
+        WHERE c.teacher_id = ?
+        GROUP BY subject_name, department_name
+    ''', (teacher_profile_id,)).fetchall()
+    daily = conn.execute('''
+        SELECT date(a.attendance_date) as date, COALESCE(s.name, c.class_name) as subject_name,
+               COUNT(*) as total, SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) as present_count
+        FROM attendance a
+        JOIN classes c ON a.class_id = c.id
+        LEFT JOIN subjects s ON c.subject_id = s.id
+        WHERE c.teacher_id = ? AND date(a.attendance_date) IS NOT NULL
+        GROUP BY date(a.attendance_date), subject_name
+    ''', (teacher_profile_id,)).fetchall()
+    conn.close()
+    return ({(r['subject_name'], r['department_name'], r['total'], r['present_count']) for r in subjects},
+            {(r['date'], r['subject_name'], r['total'], r['present_count']) for r in daily})
+
+
+def test_teacher_analytics_matches_sql(temp_db):
+    client = app.test_client()
+    data = client.get('/api/attendance/analytics?teacher_id=2').json
+    subjects, daily = _sql(1)
+    assert {(s['subject_name'], s['department_name'], s['total'], s['present_count'])
+            for s in data['subject_wise']} == subjects
+    assert {(d['date'], d['subject_name'], d['total'], d['present_count']) for d in data['daily']} == daily
+    assert data['overall']['total_records'] == sum(s[2] for s in subjects)
+    dates = [d['date'] for d in data['daily']]
+    assert dates == sorted(dates, reverse=True)
+    assert [t['date'] for t in data['trend']] == sorted(set(dates))
+
+
+def test_distribution_and_trend(temp_db):
+    client = app.test_client()
+    conn = get_db_connection()
+    rates = [r[0] for r in conn.execute('''
+        SELECT ROUND(SUM(a.status = 'present') * 100.0 / COUNT(*), 1)
+        FROM attendance a JOIN classes c ON a.class_id = c.id JOIN students s ON a.student_id = s.id
+        GROUP BY a.student_id
+    ''')]
+    conn.close()
+    data = client.get('/api/admin/attendance-distribution').json
+    assert data['students'] == len(rates)
+    assert data['above_75'] == round(sum(r >= 75 for r in rates) * 100 / len(rates), 1)
+    assert sum(b['students'] for b in data['histogram']) == len(rates)
+
+    report = client.get('/api/admin/attendance/analytics?window=3').json
+    trend = report['trend']
+    expected = sum(t['rate'] for t in trend[-3:]) / 3
+    assert abs(trend[-1]['moving_average'] - expected) < 0.2
+    assert sum(d['total'] for d in report['departments']) == sum(t['total'] for t in trend)
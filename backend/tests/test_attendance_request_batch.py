@@ -0,0 +1,58 @@
+# Batch approve/reject must match the single-request endpoints' effects
+from app import app
+from models.database import get_db_connection
+from services.attendance_rollup import AttendanceRollupService
+
+
+def _rollups():
+    conn = get_db_connection()
+    rows = (conn.execute('SELECT * FROM attendance_daily_rollup ORDER BY attendance_date, class_id').fetchall(),
+            conn.execute('SELECT * FROM attendance_student_rollup ORDER BY student_id, class_id').fetchall())
+    conn.close()
+    return [[tuple(r) for r in t] for t in rows]
+
+
+def test_batch_approve_reports_each_id(temp_db):
+    AttendanceRollupService.rebuild()
+    client = app.test_client()
+
+    r = client.post('/api/attendance-requests/requests/batch', json={
+        'action': 'approve', 'request_ids': [5, 6, 1, 999], 'teacher_id': 2
+    })
+    assert r.status_code == 200
+    results = {x['id']: x for x in r.json['results']}
+    assert results[5]['status'] == results[6]['status'] == 'approved'
+    assert results[1]['error'] == 'Request already processed'
+    assert results[999]['error'] == 'Request not found'
+    assert r.json['processed'] == 2
+
+    conn = get_db_connection()
+    marked = conn.execute("SELECT request_id FROM attendance WHERE request_id IN (5, 6) AND status = 'present'").fetchall()
+    queued = conn.execute("SELECT COUNT(*) FROM outbox WHERE kind = 'notification' AND payload LIKE '%Approved%'").fetchone()[0]
+    processors = conn.execute("SELECT processed_by_user_id FROM attendance_requests WHERE id IN (5, 6)").fetchall()
+    conn.close()
+    assert sorted(m[0] for m in marked) == [5, 6]
+    assert [p[0] for p in processors] == [2, 2]
+    assert queued >= 2
+
+    incremental = _rollups()
+    AttendanceRollupService.rebuild()
+    assert _rollups() == incremental
+
+
+def test_batch_reject_scoped_to_teacher(temp_db):
+    client = app.test_client()
+    # Request 6 is for class 2 (teacher user 2); teacher user 3 may not touch it
+    r = client.post('/api/attendance-requests/requests/batch', json={
+        'action': 'reject', 'request_ids': [6], 'teacher_id': 3
+    })
+    assert r.json['results'][0]['status'] == 'error'
+
+    r = client.post('/api/attendance-requests/requests/batch', json={
+        'action': 'reject', 'request_ids': [7, 8], 'teacher_id': 2
+    })
+    assert [x['status'] for x in r.json['results']] == ['rejected', 'rejected']
+    assert client.post('/api/attendance-requests/requests/batch', json={'action': 'x', 'request_ids': [7]}).status_code == 400
+    assert client.post('/api/attendance-requests/requests/batch', json={
+        'action': 'approve', 'request_ids': [5]
+    }).status_code == 400
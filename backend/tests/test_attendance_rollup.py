@@ -0,0 +1,54 @@
+# Rollup counters must agree with a full recount of the attendance table
+from app import app
+from models.database import get_db_connection
+from services.attendance_rollup import AttendanceRollupService
+
+
+def _snapshot():
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute('SELECT * FROM attendance_daily_rollup ORDER BY attendance_date, class_id')
+    daily = [tuple(r) for r in cur.fetchall()]
+    cur.execute('SELECT * FROM attendance_student_rollup ORDER BY student_id, class_id')
+    students = [tuple(r) for r in cur.fetchall()]
+    conn.close()
+    return daily, students
+
+
+def test_incremental_rollup_matches_rebuild(temp_db):
+    AttendanceRollupService.rebuild()
+    client = app.test_client()
+
+    r = client.post('/api/attendance/', json={'student_id': 1, 'class_id': 1, 'status': 'present', 'marked_by': 2})
+    assert r.status_code == 201
+    r = client.post('/api/teacher-dashboard/mark-attendance', json={
+        'class_id': 2,
+        'date': '2026-02-02',
+        'teacher_id': 2,
+        'attendance': [{'student_id': 3, 'status': 'present'}]
+    })
+    assert r.status_code == 200
+
+    incremental = _snapshot()
+    AttendanceRollupService.rebuild()
+    assert _snapshot() == incremental
+
+
+def test_summary_and_range_filters(temp_db):
+    AttendanceRollupService.rebuild()
+    client = app.test_client()
+
+    summary = client.get('/api/admin/attendance/summary').json
+    conn = get_db_connection()
+    total = conn.execute('SELECT COUNT(*) FROM attendance').fetchone()[0]
+    conn.close()
+    assert sum(d['total_classes'] for d in summary['by_department']) == total
+
+    empty = client.get('/api/admin/attendance/summary?start_date=2999-01-01').json
+    assert empty['by_department'] == []
+    assert client.get('/api/admin/department-attendance').status_code == 200
+    assert empty['by_student'] == []
+
+    ranged = client.get('/api/admin/attendance/summary?start_date=2026-01-01&end_date=2026-01-31').json
+    assert sum(s['total_classes'] for s in ranged['by_student']) == \
+        sum(d['total_classes'] for d in ranged['by_department']) == 2
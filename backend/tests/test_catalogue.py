@@ -0,0 +1,45 @@
+# Catalogue listings are served from memory and follow add/remove/assign writes
+from app import app
+from models.database import get_db_connection
+
+
+def test_listings_agree_and_follow_writes(temp_db):
+    client = app.test_client()
+    departments = client.get('/api/departments/').json
+    conn = get_db_connection()
+    for dept in departments:
+        expected = {r['id'] for r in conn.execute('SELECT id FROM subjects WHERE department_id = ?', (dept['id'],))}
+        assert {s['id'] for s in dept['subjects']} == expected
+    conn.close()
+
+    summaries = {d['name']: d['total_subjects'] for d in client.get('/api/admin/departments').json}
+    assert summaries == {d['name']: len(d['subjects']) for d in departments}
+
+    assert client.post('/api/departments/add', json={'name': 'Catalogue Dept'}).status_code == 201
+    assert client.post('/api/departments/Catalogue Dept/subjects/add', json={'subject': 'Cataloguing'}).status_code == 201
+    added = [d for d in client.get('/api/departments/').json if d['name'] == 'Catalogue Dept']
+    assert [s['name'] for s in added[0]['subjects']] == ['Cataloguing']
+
+    before = len(client.get('/api/teacher-subjects').json)
+    r = client.post('/api/teacher-subjects', json={
+        'teacher_id': 3, 'subject_id': added[0]['subjects'][0]['id'], 'department_id': added[0]['id']
+    })
+    assert r.status_code == 201
+    assert len(client.get('/api/teacher-subjects').json) == before + 1
+    assert any(a['subject_name'] == 'Cataloguing' for a in client.get('/api/teacher-subjects/teacher/3').json)
+
+
+def test_body_matches_etag_after_unannounced_write(temp_db):
+    client = app.test_client()
+    first = client.get('/api/departments/')
+
+    # A write path that does not call catalogue.invalidate()
+    conn = get_db_connection()
+    conn.execute("INSERT INTO departments (name) VALUES ('Implicit Dept')")
+    conn.commit()
+    conn.close()
+
+    second = client.get('/api/departments/', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert len(second.json) == len(first.json) + 1
+    assert client.get('/api/departments/', headers={'If-None-Match': second.headers['ETag']}).status_code == 304
@@ -0,0 +1,25 @@
+# Teacher + subject name must resolve to one class deterministically
+from models.database import get_db_connection
+from services.class_resolution import class_resolver
+
+
+def test_exact_lookup_prefers_enrollment(temp_db):
+    # Teacher profile 1 teaches "Data Structures" as classes 2 and 4
+    assert class_resolver.resolve(1, 'data  structures') == 2
+    assert class_resolver.resolve(1, 'Data Structures', student_id=7) == 4
+    assert class_resolver.resolve(1, 'DS - A') == 4
+    # No substring matching; the fallback is opt-in
+    assert class_resolver.resolve(1, 'Data') is None
+    assert class_resolver.resolve(1, 'Data', student_id=7, fallback=True) == 4
+    assert class_resolver.resolve(999, 'Data Structures', fallback=True) is None
+
+
+def test_index_follows_class_changes(temp_db):
+    assert class_resolver.resolve(2, 'Advanced Topics') is None
+    conn = get_db_connection()
+    class_id = conn.execute(
+        "INSERT INTO classes (class_name, teacher_id, subject_id) VALUES ('Advanced Topics', 2, 1)"
+    ).lastrowid
+    conn.commit()
+    conn.close()
+    assert class_resolver.resolve(2, 'advanced topics') == class_id
@@ -0,0 +1,47 @@
+# Queued mailer against the in-memory SMTP stand-in
+import smtplib
+from email_service import Mailer, MemorySMTP, build_verification_message
+
+
+def test_batch_reuses_one_connection():
+    smtp = MemorySMTP.factory()
+    mailer = Mailer(connect=smtp, batch_size=10)
+
+    futures = [mailer.submit(build_verification_message(f'user{i}@example.com', '123456', 'noreply@example.com'))
+               for i in range(25)]
+    assert all(f.result(timeout=5) for f in futures)
+
+    assert len(smtp.sent) == 25
+    assert smtp.connections == 1
+    assert '123456' in smtp.sent[0].as_string()
+
+
+def test_dropped_connection_is_reopened():
+    smtp = MemorySMTP.factory()
+    mailer = Mailer(connect=smtp, max_retries=1)
+
+    assert mailer.send(build_verification_message('a@example.com', '111111', 'noreply@example.com'), timeout=5)
+    smtp.fail_next = 1
+    assert mailer.send(build_verification_message('b@example.com', '222222', 'noreply@example.com'), timeout=5)
+
+    assert [m['To'] for m in smtp.sent] == ['a@example.com', 'b@example.com']
+    assert smtp.connections == 2
+
+    smtp.fail_next = 2
+    future = mailer.submit(build_verification_message('c@example.com', '333333', 'noreply@example.com'))
+    assert future.exception(timeout=5) is not None
+    assert mailer.stats()['failed'] == 1
+
+
+class RefusingSMTP(MemorySMTP):
+    def send_message(self, msg):
+        raise smtplib.SMTPRecipientsRefused({msg['To']: (550, b'No such user')})
+
+
+def test_permanent_errors_are_not_retried():
+    smtp = MemorySMTP.factory()
+    mailer = Mailer(connect=lambda: RefusingSMTP(smtp), max_retries=3)
+
+    future = mailer.submit(build_verification_message('x@example.com', '444444', 'noreply@example.com'))
+    assert isinstance(future.exception(timeout=5), smtplib.SMTPRecipientsRefused)
+    assert mailer.stats() == {'sent': 0, 'failed': 1, 'batches': 1, 'reconnects': 1}
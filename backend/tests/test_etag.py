@@ -0,0 +1,26 @@
+# List endpoints answer If-None-Match with 304 until their tables change
+from app import app
+
+
+def test_departments_etag_round_trip(temp_db):
+    client = app.test_client()
+
+    first = client.get('/api/departments/')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag
+
+    cached = client.get('/api/departments/', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    assert client.post('/api/departments/add', json={'name': 'Etag Test Dept'}).status_code == 201
+    changed = client.get('/api/departments/', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_etag_varies_by_query(temp_db):
+    client = app.test_client()
+    a = client.get('/api/notifications?user_id=2').headers['ETag']
+    b = client.get('/api/notifications?user_id=3').headers['ETag']
+    assert a != b
@@ -0,0 +1,41 @@
+# Streaming exports must contain every matching row in both formats
+import csv
+import io
+import json
+from app import app
+from models.database import get_db_connection
+
+
+def test_attendance_export_formats_and_filters(temp_db, monkeypatch):
+    import routes.export_routes as export_routes
+    monkeypatch.setattr(export_routes, 'CHUNK_SIZE', 3)
+    client = app.test_client()
+
+    conn = get_db_connection()
+    total = conn.execute('SELECT COUNT(*) FROM attendance').fetchone()[0]
+    in_class = conn.execute('SELECT COUNT(*) FROM attendance WHERE class_id = 1').fetchone()[0]
+    conn.close()
+
+    r = client.get('/api/export/attendance')
+    lines = [json.loads(l) for l in r.data.decode().splitlines()]
+    assert r.mimetype == 'application/x-ndjson'
+    assert len(lines) == total
+
+    r = client.get('/api/export/attendance?format=csv&class_id=1')
+    rows = list(csv.reader(io.StringIO(r.data.decode())))
+    assert rows[0][0] == 'id'
+    assert len(rows) - 1 == in_class
+
+    assert client.get('/api/export/attendance?format=xml').status_code == 400
+
+
+def test_course_summary_matches_rollup_totals(temp_db):
+    from services.attendance_rollup import AttendanceRollupService
+    AttendanceRollupService.rebuild()
+    client = app.test_client()
+
+    lines = [json.loads(l) for l in client.get('/api/export/course-summary').data.decode().splitlines()]
+    conn = get_db_connection()
+    total = conn.execute('SELECT COUNT(*) FROM attendance a JOIN classes c ON a.class_id = c.id').fetchone()[0]
+    conn.close()
+    assert sum(l['present_count'] + l['absent_count'] for l in lines) == total
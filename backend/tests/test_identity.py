@@ -0,0 +1,30 @@
+# user id <-> profile id resolution is served from the in-process cache
+from app import app
+from models.database import get_db_connection
+from services.identity import identity
+
+
+def test_resolves_user_or_profile_ids(temp_db):
+    conn = get_db_connection()
+    tp = conn.execute('SELECT id, user_id FROM teacher_profiles ORDER BY id LIMIT 1').fetchone()
+    st = conn.execute('SELECT id, user_id FROM students ORDER BY id LIMIT 1').fetchone()
+    conn.close()
+
+    assert identity.resolve_teacher(tp['user_id']) == tp['id']
+    assert identity.teacher_user_id(tp['id']) == tp['user_id']
+    assert identity.teacher_profile_id(st['user_id']) is None
+    assert identity.resolve_student(st['user_id']) == st['id']
+    assert identity.student_user_id(st['id']) == st['user_id']
+    assert identity.resolve_teacher(999999) is None
+
+
+def test_cache_invalidated_on_delete(temp_db):
+    client = app.test_client()
+    conn = get_db_connection()
+    st = conn.execute('SELECT id, user_id FROM students ORDER BY id DESC LIMIT 1').fetchone()
+    conn.close()
+
+    assert identity.student_user_id(st['id']) == st['user_id']
+    r = client.delete(f"/api/admin/students/{st['id']}")
+    assert r.status_code == 200
+    assert identity.student_user_id(st['id']) is None
@@ -0,0 +1,48 @@
+# The batch scan must flag the same students a per-student recount would
+from datetime import datetime
+from app import app
+from models.database import get_db_connection
+from services.low_attendance import LowAttendanceService, LowAttendanceJob
+
+
+def test_report_matches_per_student_recount(temp_db):
+    conn = get_db_connection()
+    report = LowAttendanceService.report(conn.cursor(), threshold=101)
+    for row in report['overall']:
+        present, total = conn.execute('''
+            SELECT SUM(a.status = 'present'), COUNT(*) FROM attendance a
+            JOIN classes c ON a.class_id = c.id WHERE a.student_id = ?
+        ''', (row['student_id'],)).fetchone()
+        assert (row['present'], row['total']) == (present, total)
+    flagged = {r['student_id'] for r in report['overall']}
+    with_rows = {r[0] for r in conn.execute('SELECT DISTINCT a.student_id FROM attendance a JOIN classes c ON a.class_id = c.id')}
+    conn.close()
+    assert flagged == with_rows
+    assert report['by_subject']
+
+
+def test_job_warns_once_per_period(temp_db):
+    job = LowAttendanceJob()
+    conn = get_db_connection()
+    for _ in range(5):
+        conn.execute("INSERT INTO attendance (student_id, class_id, attendance_date, status) VALUES (6, 3, '2026-03-02', 'absent')")
+    conn.commit()
+    conn.close()
+
+    assert job.run_once() >= 1
+    assert job.run_once() == 0
+
+    # A new mark re-scans the student, but the period's warning already exists
+    conn = get_db_connection()
+    conn.execute("INSERT INTO attendance (student_id, class_id, attendance_date, status) VALUES (6, 3, '2026-03-03', 'absent')")
+    conn.commit()
+    cur = conn.cursor()
+    assert LowAttendanceService.warn(cur, LowAttendanceService.report(cur, since_id=job.last_id - 1)) == 0
+    queued = conn.execute('''
+        SELECT COUNT(*) FROM outbox WHERE dedupe_key = ?
+    ''', (f"attendance_warning:9:{LowAttendanceService.period(datetime.utcnow())[0]}",)).fetchone()[0]
+    conn.close()
+    assert queued == 1
+
+    r = app.test_client().get('/api/admin/low-attendance')
+    assert any(row['student_id'] == 6 for row in r.json['overall'])
@@ -0,0 +1,42 @@
+# Trigger-maintained unread counters must match a COUNT over notifications
+from app import app
+from models.database import get_db_connection
+from services.notification_service import NotificationService
+
+
+def _expected(user_id):
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT type, COUNT(*) AS c FROM notifications
+        WHERE user_id = ? AND is_read = FALSE
+        GROUP BY type
+    ''', (user_id,)).fetchall()
+    conn.close()
+    return {r['type']: r['c'] for r in rows}
+
+
+def test_counters_follow_every_write_path(temp_db):
+    client = app.test_client()
+    user_id = 2
+
+    def check():
+        stats = client.get(f'/api/notifications/stats?user_id={user_id}').json
+        expected = _expected(user_id)
+        assert stats['type_stats'] == expected
+        assert stats['unread_count'] == sum(expected.values())
+
+    check()
+    first = NotificationService.notify_user(user_id, 'One', 'x', 'alert')
+    second = NotificationService.notify_user(user_id, 'Two', 'x', 'system')
+    check()
+
+    client.post(f'/api/notifications/{first}/read')
+    client.post(f'/api/notifications/{first}/read')
+    check()
+
+    client.delete(f'/api/notifications/{second}')
+    check()
+
+    client.post('/api/notifications/read-all', json={'user_id': user_id})
+    check()
+    assert client.get(f'/api/notifications/stats?user_id={user_id}').json['unread_count'] == 0
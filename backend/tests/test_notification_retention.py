@@ -0,0 +1,37 @@
+# Retention archives old read rows and keeps only the newest warning per user
+from app import app
+from models.database import get_db_connection
+from services.notification_retention import NotificationRetention
+
+
+def _seed(conn, user_id, type_, is_read, created_at):
+    conn.execute('''
+        INSERT INTO notifications (user_id, title, message, type, is_read, created_at)
+        VALUES (?, 'seed', 'seed', ?, ?, ?)
+    ''', (user_id, type_, is_read, created_at))
+
+
+def test_archive_and_collapse_in_batches(temp_db):
+    conn = get_db_connection()
+    conn.execute('DELETE FROM notifications')
+    for _ in range(5):
+        _seed(conn, 2, 'system', True, '2020-01-01 00:00:00')
+    _seed(conn, 2, 'system', False, '2020-01-01 00:00:00')   # unread: kept
+    _seed(conn, 2, 'system', True, '2999-01-01 00:00:00')    # recent: kept
+    for _ in range(3):
+        _seed(conn, 4, 'attendance_warning', False, '2999-01-01 00:00:00')
+    conn.commit()
+    newest_warning = conn.execute("SELECT MAX(id) FROM notifications WHERE type = 'attendance_warning'").fetchone()[0]
+    conn.close()
+
+    report = NotificationRetention(days=30, batch_size=2).run()
+    assert report == {'archived': 5, 'collapsed': 2, 'batches': 4, 'reclaimed': 7}
+
+    conn = get_db_connection()
+    left = conn.execute('SELECT id, user_id, type FROM notifications ORDER BY id').fetchall()
+    conn.close()
+    assert len(left) == 3
+    assert [r['id'] for r in left if r['type'] == 'attendance_warning'] == [newest_warning]
+
+    archived = app.test_client().get('/api/notifications/archive?user_id=2').json
+    assert len(archived) == 5 and archived[0]['id'] > archived[-1]['id']
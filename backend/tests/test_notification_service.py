@@ -0,0 +1,32 @@
+# Bulk notification writes: one statement per fan-out, optional caller transaction
+from models.database import get_db_connection
+from services.notification_service import NotificationService
+
+
+def _count(where, params=()):
+    conn = get_db_connection()
+    n = conn.execute(f'SELECT COUNT(*) FROM notifications WHERE {where}', params).fetchone()[0]
+    conn.close()
+    return n
+
+
+def test_fan_out_reaches_every_teacher(temp_db):
+    conn = get_db_connection()
+    teachers = conn.execute("SELECT COUNT(*) FROM users WHERE role = 'teacher'").fetchone()[0]
+    conn.close()
+
+    assert NotificationService.notify_all_teachers('Broadcast', 'hello') == teachers
+    assert _count("title = 'Broadcast'") == teachers
+
+
+def test_bulk_insert_joins_caller_transaction(temp_db):
+    rows = [(2, 'Batch', f'message {i}', 'system', None) for i in range(5)]
+
+    conn = get_db_connection()
+    assert NotificationService.create_notifications(rows, conn=conn) == 5
+    conn.rollback()
+    conn.close()
+    assert _count("title = 'Batch'") == 0
+
+    assert NotificationService.create_notifications(rows) == 5
+    assert _count("title = 'Batch'") == 5
@@ -0,0 +1,66 @@
+# SSE stream: live events from the bus, Last-Event-ID replay, connection limits
+import json
+from app import app
+from models.database import get_db_connection
+from services.notification_bus import notification_bus
+from services.notification_service import NotificationService
+
+
+def _last_id(user_id):
+    conn = get_db_connection()
+    last = conn.execute('SELECT COALESCE(MAX(id), 0) FROM notifications WHERE user_id = ?', (user_id,)).fetchone()[0]
+    conn.close()
+    return last
+
+
+def _events(chunks, n):
+    out = []
+    while len(out) < n:
+        chunk = next(chunks).decode()
+        if chunk.startswith('id:'):
+            out.append(json.loads(chunk.split('data: ', 1)[1]))
+    return out
+
+
+def test_live_event_and_resume(temp_db, monkeypatch):
+    monkeypatch.setattr(notification_bus, 'heartbeat_seconds', 0.05)
+    client = app.test_client()
+    start = _last_id(2)
+
+    response = client.get(f'/api/notifications/stream?user_id=2&last_event_id={start}', buffered=False)
+    chunks = iter(response.response)
+    assert next(chunks).decode().startswith('retry:')
+
+    new_id = NotificationService.notify_user(2, 'Live', 'pushed')
+    assert _events(chunks, 1)[0]['id'] == new_id
+    response.close()
+    assert notification_bus.stats()['connections'] == 0
+
+    resumed = client.get('/api/notifications/stream?user_id=2', headers={'Last-Event-ID': str(start)}, buffered=False)
+    assert [e['title'] for e in _events(iter(resumed.response), 1)] == ['Live']
+    resumed.close()
+
+
+def test_per_user_connection_limit(temp_db, monkeypatch):
+    monkeypatch.setattr(notification_bus, 'max_per_user', 2)
+    client = app.test_client()
+
+    streams = [client.get('/api/notifications/stream?user_id=5', buffered=False) for _ in range(2)]
+    assert all(s.status_code == 200 for s in streams)
+    assert client.get('/api/notifications/stream?user_id=5').status_code == 429
+    for s in streams:
+        s.close()
+    assert notification_bus.stats()['connections'] == 0
+
+
+def test_schedule_notification_is_pushed(temp_db, monkeypatch):
+    published = []
+    monkeypatch.setattr(notification_bus, 'publish', published.extend)
+
+    response = app.test_client().post('/api/schedules', json={
+        'teacher_id': 1, 'department_id': 11, 'subject_id': 1, 'day_of_week': 'Friday',
+        'start_time': '08:00', 'end_time': '09:00', 'room_number': '404', 'created_by': 1,
+    })
+    assert response.status_code == 200
+    schedule_id = response.get_json()['schedule_id']
+    assert [(e['user_id'], e['type'], e['related_id']) for e in published] == [(2, 'class_scheduled', schedule_id)]
@@ -0,0 +1,77 @@
+# Outbox rows commit with the business change and are delivered by the dispatcher
+import json
+from app import app
+from models.database import get_db_connection
+from services.outbox import Outbox, OutboxDispatcher
+
+
+def _rows(sql, params=()):
+    conn = get_db_connection()
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+
+def test_request_notifications_delivered_by_dispatcher(temp_db):
+    client = app.test_client()
+    conn = get_db_connection()
+    conn.execute("DELETE FROM attendance_requests WHERE student_id = 1 AND class_id = 1")
+    conn.commit()
+    conn.close()
+
+    before = _rows('SELECT COUNT(*) FROM notifications')[0][0]
+    r = client.post('/api/attendance-requests/requests', json={
+        'student_id': 1, 'class_id': 1, 'request_date': '2026-03-03', 'reason': 'sick'
+    })
+    assert r.status_code == 201
+    assert _rows('SELECT COUNT(*) FROM notifications')[0][0] == before
+
+    assert OutboxDispatcher().drain() == 3
+    staff = _rows("SELECT COUNT(*) FROM users WHERE role IN ('teacher', 'admin')")[0][0]
+    assert _rows('SELECT COUNT(*) FROM notifications')[0][0] == before + 1 + staff
+
+
+def test_failures_retry_then_dead_letter(temp_db):
+    calls = []
+
+    @Outbox.handler('test_flaky')
+    def flaky(payload, conn):
+        calls.append(payload)
+        raise RuntimeError('boom')
+
+    conn = get_db_connection()
+    Outbox.enqueue(conn.cursor(), 'test_flaky', {'n': 1})
+    assert Outbox.enqueue(conn.cursor(), 'notification', {}, dedupe_key='k')
+    assert not Outbox.enqueue(conn.cursor(), 'notification', {}, dedupe_key='k')
+    conn.execute("DELETE FROM outbox WHERE dedupe_key = 'k'")
+    conn.commit()
+    conn.close()
+
+    dispatcher = OutboxDispatcher(max_attempts=2, retry_base_seconds=0)
+    dispatcher.drain()
+    dispatcher.drain()
+    del Outbox.handlers['test_flaky']
+
+    row = _rows("SELECT status, attempts, last_error FROM outbox WHERE kind = 'test_flaky'")[0]
+    assert len(calls) == 2
+    assert (row['status'], row['attempts'], row['last_error']) == ('dead', 2, 'boom')
+
+
+def test_secrets_scrubbed_when_sent_and_not_dead_lettered(temp_db):
+    @Outbox.handler('test_secret', secret=('code',))
+    def deliver(payload, conn):
+        if payload['email'] == 'bad@example.com':
+            raise RuntimeError('boom')
+
+    conn = get_db_connection()
+    Outbox.enqueue(conn.cursor(), 'test_secret', {'email': 'ok@example.com', 'code': '123456'})
+    Outbox.enqueue(conn.cursor(), 'test_secret', {'email': 'bad@example.com', 'code': '654321'})
+    conn.commit()
+    conn.close()
+
+    OutboxDispatcher(max_attempts=1).drain()
+    del Outbox.handlers['test_secret']
+    del Outbox.secrets['test_secret']
+
+    rows = _rows("SELECT status, payload FROM outbox WHERE kind = 'test_secret'")
+    assert [(r['status'], json.loads(r['payload'])) for r in rows] == [('sent', {'email': 'ok@example.com'})]
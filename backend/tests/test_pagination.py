@@ -0,0 +1,70 @@
+# Walking a list with after_id/limit must return the same rows as one big page
+from app import app
+from models.database import get_db_connection
+
+
+def _walk(client, url, key=None):
+    rows, after_id = [], None
+    while True:
+        sep = '&' if '?' in url else '?'
+        page_url = f'{url}{sep}limit=2' + (f'&after_id={after_id}' if after_id else '')
+        r = client.get(page_url)
+        assert r.status_code == 200
+        body = r.json[key] if key else r.json
+        assert len(body) <= 2
+        rows += body
+        after_id = r.headers.get('X-Next-After-Id')
+        if not after_id:
+            return rows
+
+
+def test_keyset_pages_match_full_listing(temp_db):
+    client = app.test_client()
+    for url, key in [
+        ('/api/admin/students', None),
+        ('/api/attendance/student/1', 'attendances'),
+        ('/api/attendance-requests/requests/processed', None),
+        ('/api/schedules/schedules', None),
+    ]:
+        full = client.get(f'{url}?limit=500').json
+        full = full[key] if key else full
+        assert _walk(client, url, key) == full
+
+
+def test_fields_projection(temp_db):
+    client = app.test_client()
+    rows = client.get('/api/admin/students?fields=id,name').json
+    assert rows and all(set(r) == {'id', 'name'} for r in rows)
+
+
+def test_unpaged_request_returns_everything(temp_db):
+    client = app.test_client()
+    conn = get_db_connection()
+    for day in range(150):
+        conn.execute("INSERT INTO attendance (student_id, class_id, attendance_date, status) VALUES (1, 1, DATE('2020-01-01', ? || ' days'), 'present')", (str(day),))
+    total = conn.execute('SELECT COUNT(*) FROM attendance WHERE student_id = 1').fetchone()[0]
+    conn.commit()
+    conn.close()
+
+    r = client.get('/api/attendance/student/1')
+    assert len(r.json['attendances']) == total
+    assert 'X-Next-After-Id' not in r.headers
+    assert len(client.get('/api/attendance/student/1?limit=100').json['attendances']) == 100
+
+
+def test_null_sort_keys_and_deleted_cursor_row(temp_db):
+    client = app.test_client()
+    conn = get_db_connection()
+    conn.execute("UPDATE attendance_requests SET responded_at = NULL WHERE id IN (2, 9, 12)")
+    conn.commit()
+    url = '/api/attendance-requests/requests/processed'
+    full = client.get(f'{url}?limit=500').json
+    assert _walk(client, url) == full
+
+    first = client.get(f'{url}?limit=2')
+    after_id = int(first.headers['X-Next-After-Id'])
+    conn.execute('DELETE FROM attendance_requests WHERE id = ?', (after_id,))
+    conn.commit()
+    conn.close()
+    rest = client.get(f'{url}?limit=500&after_id={after_id}').json
+    assert rest and all(r['id'] < after_id for r in rest)
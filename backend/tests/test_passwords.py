@@ -0,0 +1,36 @@
+# Legacy SHA-256 hashes are upgraded to the configured KDF on login
+from models.database import get_db_connection
+from models.users import get_user_by_credentials
+from services.passwords import Pbkdf2Hasher, passwords
+
+
+def _stored(user_id):
+    conn = get_db_connection()
+    value = conn.execute('SELECT password_hash FROM users WHERE id = ?', (user_id,)).fetchone()[0]
+    conn.close()
+    return value
+
+
+def test_legacy_hash_upgraded_on_login(temp_db):
+    assert '$' not in _stored(2)
+    assert get_user_by_credentials('teacher@smartattend.com', 'wrong', 'teacher') is None
+    assert '$' not in _stored(2)
+
+    user = get_user_by_credentials('teacher@smartattend.com', 'teacher123', 'teacher')
+    assert user['id'] == 2 and 'password_hash' not in user
+    upgraded = _stored(2)
+    assert upgraded.startswith(passwords.default.scheme + '$')
+    assert not passwords.needs_rehash(upgraded)
+
+    passwords._cache.clear()
+    assert get_user_by_credentials('teacher@smartattend.com', 'teacher123', 'teacher')['id'] == 2
+    assert _stored(2) == upgraded
+
+
+def test_hashers_round_trip():
+    hasher = Pbkdf2Hasher(iterations=1000)
+    encoded = hasher.hash('secret')
+    assert hasher.verify('secret', encoded) and not hasher.verify('other', encoded)
+    assert passwords.verify('secret', encoded)
+    assert passwords.needs_rehash(encoded)
+    assert not passwords.verify('secret', 'unknown$format')
@@ -0,0 +1,61 @@
+# Cached dashboard responses must be dropped by the writes that change them
+from app import app
+from services.response_cache import ResponseCache
+
+
+def test_admin_stats_invalidated_by_attendance_write(temp_db):
+    client = app.test_client()
+
+    assert client.get('/api/admin/stats').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/admin/stats').headers['X-Cache'] == 'HIT'
+
+    r = client.post('/api/attendance/', json={'student_id': 1, 'class_id': 1, 'status': 'present', 'marked_by': 2})
+    assert r.status_code == 201
+    assert client.get('/api/admin/stats').headers['X-Cache'] == 'MISS'
+
+
+def test_teacher_stats_keyed_and_invalidated_per_teacher(temp_db):
+    client = app.test_client()
+    # class 2 is taught by teacher profile 1 (user 2)
+    for teacher_id in (2, 3):
+        client.get(f'/api/teacher-dashboard/stats?teacher_id={teacher_id}')
+
+    r = client.post('/api/teacher-dashboard/mark-attendance', json={
+        'class_id': 2,
+        'date': '2026-02-02',
+        'teacher_id': 2,
+        'attendance': [{'student_id': 3, 'status': 'present'}]
+    })
+    assert r.status_code == 200
+
+    assert client.get('/api/teacher-dashboard/stats?teacher_id=2').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/teacher-dashboard/stats?teacher_id=3').headers['X-Cache'] == 'HIT'
+
+
+def test_shared_backing_between_workers(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    worker_a = ResponseCache(backing_path=path)
+    worker_b = ResponseCache(backing_path=path)
+
+    worker_a.set('k', 'v', worker_a.snapshot(['teacher:1']))
+    assert worker_b.get('k') == 'v'
+
+    worker_a.invalidate('teacher:1')
+    assert worker_b.get('k') is None
+    assert worker_b.stats()['shared_hits'] == 1
+
+
+def test_teacher_courses_follow_enrollment_changes(temp_db):
+    client = app.test_client()
+    # Dashboard of user 2 (teacher profile 1); class 2 lacks student 7
+    url = '/api/teacher-dashboard/my-courses?teacher_id=2'
+    assert client.get(url).headers['X-Cache'] == 'MISS'
+    assert client.get(url).headers['X-Cache'] == 'HIT'
+
+    # Approving request 6 auto-enrolls student 7 into class 2
+    assert client.post('/api/attendance-requests/requests/6/approve').status_code == 200
+    assert client.get(url).headers['X-Cache'] == 'MISS'
+
+    assert client.get(url).headers['X-Cache'] == 'HIT'
+    assert client.delete('/api/admin/students/7').status_code == 200
+    assert client.get(url).headers['X-Cache'] == 'MISS'
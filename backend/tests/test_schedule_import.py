@@ -0,0 +1,118 @@
+# Bulk timetable import: prefetch validation, chunked inserts, atomic/partial modes
+from app import app
+from models.database import get_db_connection
+from services.schedule_conflicts import conflict_index
+
+
+def _count(sql):
+    conn = get_db_connection()
+    value = conn.execute(sql).fetchone()[0]
+    conn.close()
+    return value
+
+
+def _row(**overrides):
+    conn = get_db_connection()
+    dept = conn.execute('SELECT id FROM departments ORDER BY id LIMIT 1').fetchone()[0]
+    subj = conn.execute('SELECT id FROM subjects ORDER BY id LIMIT 1').fetchone()[0]
+    conn.close()
+    row = {'teacher_id': 1, 'department_id': dept, 'subject_id': subj, 'day_of_week': 'Monday',
+           'start_time': '08:00', 'end_time': '09:00', 'room_number': 'R1', 'created_by': 1}
+    row.update(overrides)
+    return row
+
+
+def test_partial_import_reports_bad_rows(temp_db):
+    client = app.test_client()
+    before = _count('SELECT COUNT(*) FROM class_schedules')
+    notes = _count("SELECT COUNT(*) FROM notifications WHERE type = 'class_scheduled'")
+
+    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    rows = [_row(teacher_id=4, room_number=f'B{i}', day_of_week=days[i % 7],
+                 start_time=f'{i // 7 // 6:02d}:{i // 7 % 6 * 10:02d}',
+                 end_time=f'{i // 7 // 6:02d}:{i // 7 % 6 * 10 + 9:02d}') for i in range(600)]
+    rows[5] = _row(teacher_id=99999)
+    rows[7] = _row(day_of_week='Funday')
+    r = client.post('/api/schedules/bulk', json={'schedules': rows})
+    body = r.get_json()
+
+    assert r.status_code == 200
+    assert body['total_created'] == 598
+    assert [e['row'] for e in body['row_errors']] == [5, 7]
+    assert _count('SELECT COUNT(*) FROM class_schedules') == before + 598
+    assert _count("SELECT COUNT(*) FROM notifications WHERE type = 'class_scheduled'") == notes + 598
+    ids = [c['schedule_id'] for c in body['created_schedules']]
+    assert ids == sorted(ids) and len(set(ids)) == 598
+
+
+def test_atomic_csv_import(temp_db):
+    client = app.test_client()
+    before = _count('SELECT COUNT(*) FROM class_schedules')
+    good = _row()
+    header = ','.join(good)
+    line = ','.join(str(v) for v in good.values())
+
+    r = client.post('/api/schedules/bulk?mode=atomic', data=f'{header}\n{line}\n{line.replace("Monday", "")}\n',
+                    content_type='text/csv')
+    assert r.status_code == 400
+    assert r.get_json()['row_errors'][0]['row'] == 1
+    assert _count('SELECT COUNT(*) FROM class_schedules') == before
+
+    r = client.post('/api/schedules/bulk?mode=atomic', data=f'{header}\n{line}\n', content_type='text/csv')
+    assert r.status_code == 200 and r.get_json()['total_created'] == 1
+
+
+def test_conflicts_rejected_and_reported(temp_db):
+    client = app.test_client()
+    rows = [
+        _row(start_time='06:00', end_time='07:00', room_number='X1'),
+        _row(teacher_id=2, start_time='06:30', end_time='07:30', room_number='x1'),
+        _row(teacher_id=2, start_time='07:30', end_time='08:00', room_number='X2'),
+    ]
+    body = client.post('/api/schedules/bulk', json={'schedules': rows}).get_json()
+    assert body['total_created'] == 2
+    assert body['row_errors'] == [{'row': 1, 'error': 'Room conflict on Monday 06:00-07:00 with row 0'}]
+
+    r = client.post('/api/schedules', json=dict(_row(teacher_id=2, start_time='07:45', end_time='08:30')))
+    assert r.status_code == 400
+    assert r.get_json()['conflicts'][0]['dimension'] == 'teacher'
+
+    conn = get_db_connection()
+    conn.execute('''INSERT INTO class_schedules (teacher_id, day_of_week, start_time, end_time, room_number, created_by)
+                    VALUES (3, 'Monday', '06:15', '06:45', 'X1', 1)''')
+    conn.commit()
+    conn.close()
+    report = client.get('/api/schedules/conflicts?dimension=room').get_json()
+    assert report['total'] == 1 and report['conflicts'][0]['resource'] == 'x1'
+
+
+def test_writers_share_teacher_profile_keys(temp_db):
+    client = app.test_client()
+    r = client.post('/api/schedules', json=_row(start_time='18:00', end_time='19:00', room_number='Y1'))
+    assert r.status_code == 200
+    engine = conflict_index.engine()
+
+    # The schedules blueprint takes user ids: user 2 owns teacher profile 1
+    r = client.post('/api/schedules/schedules', json=_row(teacher_id=2, start_time='18:30', end_time='19:30',
+                                                          room_number='Y2'))
+    assert r.status_code == 400 and r.get_json()['conflicts'][0]['dimension'] == 'teacher'
+    r = client.post('/api/schedules/schedules', json=_row(teacher_id=2, start_time='19:00', end_time='20:00',
+                                                          room_number='Y2'))
+    assert r.status_code == 201 and r.get_json()['teacher_email'] == 'teacher@smartattend.com'
+
+    # Committed slots extend the cached engine instead of reloading it
+    assert conflict_index.engine() is engine
+    assert engine.schedules[max(engine.schedules)]['teacher_id'] == 1
+
+
+def test_update_checks_conflicts_except_itself(temp_db):
+    client = app.test_client()
+    # Schedule 8 (Monday 09:00-10:00) belongs to the same teacher as schedule 1 (Monday 10:00-11:00)
+    r = client.put('/api/schedules/schedules/8', json={'start_time': '09:30', 'end_time': '10:30'})
+    assert r.status_code == 400
+    assert [c['schedule_id'] for c in r.get_json()['conflicts']] == [1]
+
+    assert client.put('/api/schedules/schedules/8', json={'room_number': '104'}).status_code == 200
+    assert client.put('/api/schedules/schedules/8', json={'day_of_week': 'Friday', 'start_time': '10:00', 'end_time': '11:00'}).status_code == 200
+    moved = conflict_index.engine().conflicts_for(_row(teacher_id=1, day_of_week='Friday', start_time='10:30', end_time='11:30'))
+    assert [c['schedule_id'] for c in moved] == [8]
@@ -0,0 +1,46 @@
+# Login issues a signed session token, verified once per request on first use
+from app import app
+from itsdangerous import URLSafeTimedSerializer
+from services.session import DEFAULT_SECRET_KEY, SessionTokens
+from services.ttl_store import MemoryTTLStore
+
+
+def _login(client):
+    r = client.post('/api/auth/login', json={
+        'email': 'teacher@smartattend.com', 'password': 'teacher123', 'role': 'teacher'
+    })
+    assert r.status_code == 200
+    return r.get_json()['token']
+
+
+def test_token_identifies_teacher(temp_db):
+    client = app.test_client()
+    token = _login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    me = client.get('/api/auth/me', headers=headers).get_json()
+    assert me['user_id'] == 2 and me['role'] == 'teacher' and me['teacher_profile_id'] == 1
+
+    with_param = client.get('/api/teacher-dashboard/my-courses?teacher_id=2').get_json()
+    with_token = client.get('/api/teacher-dashboard/my-courses', headers=headers).get_json()
+    assert with_token == with_param
+    assert client.get('/api/teacher-dashboard/my-courses').status_code == 400
+
+
+def test_logout_revokes_token(temp_db):
+    client = app.test_client()
+    token = _login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    assert client.get('/api/auth/me', headers=headers).status_code == 401
+    assert client.get('/api/auth/me', headers={'Authorization': 'Bearer forged'}).status_code == 401
+
+
+def test_placeholder_secret_disables_tokens(temp_db):
+    placeholder = SessionTokens(DEFAULT_SECRET_KEY, 60, MemoryTTLStore())
+    assert placeholder.issue({'id': 2, 'role': 'teacher'}) is None
+
+    forged = URLSafeTimedSerializer(DEFAULT_SECRET_KEY, salt='smartattend-session').dumps(
+        {'uid': 1, 'role': 'admin', 'jti': 'x'})
+    assert placeholder.verify(forged) is None
@@ -0,0 +1,27 @@
+# The consolidated dashboard must agree with the per-subject percent endpoint
+from app import app
+
+
+def test_dashboard_matches_subject_percent(temp_db):
+    client = app.test_client()
+    r = client.get('/api/student/dashboard/4')
+    assert r.status_code == 200
+    data = r.json
+    assert data['profile']['student_id'] == 1
+    assert {c['class_id'] for c in data['classes']} == {1, 2}
+
+    for subject in data['attendance_summary']:
+        single = client.get('/api/attendance/student-percent',
+                            query_string={'student_id': 1, 'subject': subject['subject']}).json
+        assert subject['present_classes'] == single['present']
+        assert subject['total_classes'] == single['total']
+        assert subject['low_attendance'] == (subject['percentage'] < data['low_attendance_threshold'])
+
+    assert data['overall']['total_classes'] == sum(s['total_classes'] for s in data['attendance_summary'])
+    assert client.get('/api/student/dashboard/2').status_code == 404
+
+
+def test_dashboard_etag(temp_db):
+    client = app.test_client()
+    etag = client.get('/api/student/dashboard/4').headers['ETag']
+    assert client.get('/api/student/dashboard/4', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,38 @@
+# Weekly timetables are served from materialized documents until sources change
+from app import app
+from models.database import get_db_connection
+
+
+def _rows(sql, params=()):
+    conn = get_db_connection()
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+
+def test_teacher_and_student_timetables(temp_db):
+    client = app.test_client()
+    first = client.get('/api/teacher-dashboard/weekly-schedule?teacher_id=2').get_json()
+    assert first['count'] == len(first['schedule']) > 0
+    stamp = _rows("SELECT stamp FROM timetables WHERE kind = 'teacher_week' AND owner_id = 1")[0][0]
+
+    student_user = _rows('SELECT s.user_id FROM students s JOIN enrollment e ON e.student_id = s.id '
+                         'WHERE e.class_id = 1 LIMIT 1')[0][0]
+    before = client.get(f'/api/student/timetable/{student_user}').get_json()
+
+    conn = get_db_connection()
+    conn.execute('''INSERT INTO class_schedules (class_id, day_of_week, start_time, end_time, created_by)
+                    VALUES (1, 'Saturday', '07:00', '08:00', 1)''')
+    conn.commit()
+    conn.close()
+
+    second = client.get('/api/teacher-dashboard/weekly-schedule?teacher_id=3')
+    assert second.status_code == 200
+    after = client.get(f'/api/student/timetable/{student_user}').get_json()
+    assert after['count'] == before['count'] + 1
+    assert any(s['day'] == 'Saturday' and s['class_id'] == 1 for s in after['schedule'])
+
+    # The teacher document is rebuilt lazily on its next read
+    assert _rows("SELECT stamp FROM timetables WHERE kind = 'teacher_week' AND owner_id = 1")[0][0] == stamp
+    client.get('/api/teacher-dashboard/weekly-schedule?teacher_id=2&fresh=1')
+    assert _rows("SELECT stamp FROM timetables WHERE kind = 'teacher_week' AND owner_id = 1")[0][0] != stamp
@@ -0,0 +1,45 @@
+# Verification codes live in a TTL store shared by all workers
+import time
+from app import app
+from routes import auth
+from services.ttl_store import MemoryTTLStore, SQLiteTTLStore
+
+
+def test_sqlite_store_expiry_and_attempts(temp_db):
+    store = SQLiteTTLStore('test')
+    store.set('a', {'code': '1'}, 60)
+    store.set('b', {'code': '2'}, 60)
+    assert store.get('a') == ({'code': '1'}, 0)
+
+    assert [store.incr_attempts('a') for _ in range(3)] == [1, 2, 3]
+    assert store.update('a', {'code': '1', 'verified': True})
+    assert store.get('a') == ({'code': '1', 'verified': True}, 3)
+
+    store.set('b', {'code': '2'}, -1)
+    assert store.get('b') is None
+    assert store.incr_attempts('b') is None
+    assert store.sweep() == 1
+
+    memory = MemoryTTLStore()
+    memory.set('x', {}, 0.01)
+    time.sleep(0.02)
+    assert memory.sweep() == 1
+
+
+def test_reset_flow_across_store(temp_db, monkeypatch):
+    monkeypatch.setattr(auth, 'verification_codes', SQLiteTTLStore('verification_codes'))
+    client = app.test_client()
+    email = 'student1@example.com'
+    auth.verification_codes.set(email, {'code': '123456', 'verified': False}, 600)
+
+    for _ in range(auth.MAX_CODE_ATTEMPTS):
+        r = client.post('/api/auth/verify-code', json={'email': email, 'code': '000000'})
+        assert r.get_json()['error'] == 'Invalid verification code'
+    r = client.post('/api/auth/verify-code', json={'email': email, 'code': '123456'})
+    assert 'Too many' in r.get_json()['error']
+    assert auth.verification_codes.get(email) is None
+
+    auth.verification_codes.set(email, {'code': '123456', 'verified': False}, 600)
+    r = client.post('/api/auth/verify-code', json={'email': email, 'code': '123456'})
+    assert r.status_code == 200
+    assert auth.verification_codes.get(email)[0]['verified'] is True
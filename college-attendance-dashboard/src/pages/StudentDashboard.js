@@ -50,9 +50,8 @@ export default function StudentDashboard() {
         setAttendanceSummary(data.attendance_summary || []);
         setLeaveRequests(data.leave_requests || []);
 
-        // ---- FETCH ENROLLED CLASSES (for dropdown) ----
-        const classesRes = await api.get(`/student/enrolled-classes/${userId}`);
-        const classes = classesRes.data.classes || [];
+        // ---- ENROLLED CLASSES (for dropdown) come with the dashboard ----
+        const classes = data.classes || [];
         setEnrolledClasses(classes);
 
         // ---- FETCH ALL DEPARTMENTS & SUBJECTS ----